@@ -9,18 +9,12 @@ from domains.utils import get_chat_model
 from domains.agents.models import QueryRequest
 
 from langchain_core.documents import Document
-from langgraph.graph.message import add_messages
-
-from langgraph.graph import END, START, StateGraph
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage
 
 from fastapi import APIRouter, BackgroundTasks
 
 from domains.utils import get_chat_model
 from domains.agents.models import QueryRequest, OverallState
-from domains.agents.tools import qna_tool, information_extraction_tool, summarize_content_tool
 from domains.agents.models import QueryRequest as QueryRequestModel
 
 
@@ -29,6 +23,11 @@ router = APIRouter(tags=["run-agents"])
 
 @router.post("/run_agents")
 async def react_orchestrator(query: str, id: str):
+    # langgraph and the tools (Tavily, summarisation graph) load on the first agent run
+    from langgraph.checkpoint.memory import MemorySaver
+    from langgraph.prebuilt import create_react_agent
+    from domains.agents.tools import qna_tool, information_extraction_tool, summarize_content_tool
+
     # Create the tools
     tools = [qna_tool, information_extraction_tool, summarize_content_tool]
 
@@ -1,7 +1,3 @@
-import asyncio
-
-from langchain_community.tools.tavily_search import TavilySearchResults
-
 import asyncio
 from typing import List, Tuple
 from loguru import logger
@@ -99,6 +95,8 @@ async def information_extraction_tool(query: str) -> List[Document]:
         if not query or not query.strip():
             raise ValueError("Query string cannot be empty")
 
+        from langchain_community.tools.tavily_search import TavilySearchResults
+
         # Initialize search tool with configuration
         tavily_tool = TavilySearchResults(
             max_results=2,
@@ -157,7 +155,8 @@ async def summarize_content_tool(content: List[Document]) -> str:
     async def collapse_summaries(state: OverallState):
         try:
             logger.info("Collapsing summaries")
-            doc_lists = split_list_of_docs(
+            doc_lists = await asyncio.to_thread(
+                split_list_of_docs,
                 state["collapsed_summaries"], length_function, config_settings.MAX_TOKENS
             )
             results = []
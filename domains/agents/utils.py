@@ -1,3 +1,5 @@
+import asyncio
+
 from langgraph.constants import Send
 from langgraph.graph import END, START, StateGraph
 from loguru import logger
@@ -5,6 +7,7 @@ from typing import List, Literal
 from langchain_core.documents import Document
 from domains.utils import get_chat_model
 from domains.settings import config_settings
+from domains.tokenizer import token_counts
 from langchain_core.prompts import ChatPromptTemplate
 from domains.agents.models import OverallState
 from domains.agents.prompt import DOC_PARSER_PROMPT, DISTILL_SUMMARY_PROMPT
@@ -13,9 +16,10 @@ from langchain_core.output_parsers import StrOutputParser
 
 def length_function(documents: List[Document]) -> int:
     """Get number of tokens for input contents."""
-    total_number_of_tokens = sum(get_chat_model(
-        model_key=config_settings.LLMS.get("OPENAI_CHAT")
-    ).get_num_tokens(doc.page_content) for doc in documents)
+    total_number_of_tokens = sum(token_counts(
+        [doc.page_content for doc in documents],
+        model_name=config_settings.LLMS.get("OPENAI_CHAT"),
+    ))
 
     logger.info("Total number of tokens: {}".format(total_number_of_tokens))
     return total_number_of_tokens
@@ -51,10 +55,11 @@ def collect_summaries(state: OverallState):
         "collapsed_summaries": [Document(summary) for summary in state["summaries"]]
     }
 
-def should_collapse(
+async def should_collapse(
     state: OverallState,
 ) -> Literal["collapse_summaries", "generate_final_summary"]:
-    num_tokens = length_function(state["collapsed_summaries"])
+    # off the event loop: token counting is CPU-bound
+    num_tokens = await asyncio.to_thread(length_function, state["collapsed_summaries"])
     if num_tokens > config_settings.MAX_TOKEN_LIMIT:
         return "collapse_summaries"
     else:
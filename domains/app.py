@@ -0,0 +1,135 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict
+
+from fastapi import FastAPI
+from loguru import logger
+
+from domains.settings import config_settings
+
+# first import of this module, i.e. close to process start for service.py
+_PROCESS_STARTED = time.perf_counter()
+
+
+class StartupState:
+    """Per-phase status and timing of background warmup, reported by /ready."""
+
+    def __init__(self):
+        self.phases: Dict[str, dict] = {}
+        self.warmup_done = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.warmup_done.is_set() and all(
+            phase["status"] == "done" for phase in self.phases.values()
+        )
+
+    def as_dict(self) -> dict:
+        return {"ready": self.ready, "phases": self.phases}
+
+    async def run_phase(self, name: str, phase: Callable[[], Awaitable]) -> None:
+        self.phases[name] = {"status": "running", "seconds": None}
+        started = time.perf_counter()
+        try:
+            await phase()
+            self.phases[name]["status"] = "done"
+        except asyncio.CancelledError:
+            self.phases[name]["status"] = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Startup phase {name} failed: {e}")
+            self.phases[name] |= {"status": "failed", "error": str(e)}
+        finally:
+            self.phases[name]["seconds"] = round(time.perf_counter() - started, 3)
+            logger.info(f"Startup phase {name} {self.phases[name]['status']} in {self.phases[name]['seconds']}s")
+
+
+startup_state = StartupState()
+
+
+async def _validate_vector_index() -> None:
+    from domains.injestion import start_injestion
+
+    await asyncio.to_thread(start_injestion)
+
+
+async def _warm_retrieval_index() -> None:
+    from domains.retreival.pinecone_doc_retreival.utils import load_index
+
+    await asyncio.to_thread(load_index, config_settings.PINECONE_INDEX_NAME)
+
+
+async def _warm_tokenizer() -> None:
+    from domains.tokenizer import get_encoding
+
+    await asyncio.to_thread(get_encoding, config_settings.LLMS.get("OPENAI_EMBEDDING_MODEL_NAME"))
+
+
+async def _warm_llm_clients() -> None:
+    from domains.utils import get_chat_model, get_streaming_chat_model
+
+    await asyncio.to_thread(get_chat_model, "OPTIMIZED_QUESTION_MODEL")
+    await asyncio.to_thread(get_streaming_chat_model, config_settings.LLMS.get("OPENAI_CHAT"))
+
+
+async def _compile_prompt_chains() -> None:
+    from domains.retreival.chain_registry import chain_registry
+
+    await asyncio.to_thread(chain_registry.compile)
+
+
+async def _warmup() -> None:
+    started = time.perf_counter()
+    await asyncio.gather(
+        startup_state.run_phase("vector_index", _validate_vector_index),
+        startup_state.run_phase("retrieval_index", _warm_retrieval_index),
+        startup_state.run_phase("tokenizer", _warm_tokenizer),
+        startup_state.run_phase("llm_clients", _warm_llm_clients),
+        startup_state.run_phase("prompt_chains", _compile_prompt_chains),
+    )
+    startup_state.warmup_done.set()
+    logger.info(
+        f"Warmup finished in {time.perf_counter() - started:.3f}s, "
+        f"{time.perf_counter() - _PROCESS_STARTED:.3f}s after process start; ready={startup_state.ready}"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the ingestion job queue and status client, then serve while warmup runs.
+
+    Index validation and client warmup run concurrently in a background task so
+    uvicorn accepts connections immediately; /ready reports when they are done.
+    """
+    from domains.injestion.job_queue import job_queue
+    from domains.llm_clients import close_http_clients, keep_warm
+    from domains.retreival.chain_registry import chain_registry
+    from domains.retreival.semantic_cache import invalidate_on_ingestion
+    from domains.retreival.sessions import session_manager
+    from domains.status_util import status_client
+
+    if invalidate_on_ingestion not in job_queue.completion_hooks:
+        job_queue.completion_hooks.append(invalidate_on_ingestion)
+
+    await startup_state.run_phase("status_client", status_client.start)
+    await startup_state.run_phase("job_queue", job_queue.start)
+    await startup_state.run_phase("chat_sessions", session_manager.start)
+    background = [asyncio.create_task(_warmup(), name="startup-warmup")]
+    if float(config_settings.LLM_KEEP_WARM_INTERVAL_SECONDS) > 0:
+        background.append(asyncio.create_task(keep_warm(), name="llm-keep-warm"))
+    logger.info(f"Serving {time.perf_counter() - _PROCESS_STARTED:.3f}s after process start")
+
+    try:
+        yield
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await job_queue.stop()
+        await session_manager.stop()
+        await status_client.stop()
+        await close_http_clients()
+        # compiled chains hold the chat clients whose HTTP pools were just closed
+        chain_registry.clear()
@@ -1,15 +1,16 @@
-from domains.injestion.vector_db_utils import validate_and_create_index
 from domains.settings import config_settings
 from loguru import logger
 
 def start_injestion():
+    """Validate (and create if missing) the Pinecone index; run from the app lifespan."""
+    if config_settings.VECTOR_DATABASE_TO_USE != "pinecone":
+        logger.info(f"Skipping Pinecone index validation for {config_settings.VECTOR_DATABASE_TO_USE}")
+        return
+
+    from domains.injestion.vector_db_utils import validate_and_create_index
+
     validate_and_create_index(
         config_settings.PINECONE_INDEX_NAME,
         config_settings.PINECONE_DROP_INDEX_NAME_STATUS
     )
 
-
-try:
-    start_injestion()
-except Exception as e:
-    logger.error(f"Error occurred during injestion: {e}")
\ No newline at end of file
@@ -0,0 +1,383 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from domains.injestion.local_vector_store import file_stamp
+from domains.settings import config_settings
+
+TERMS_FILE_NAME = "terms.txt"
+DOCS_FILE_NAME = "docs.jsonl"
+DOC_OFFSETS_FILE_NAME = "doc_offsets.u64"
+DOC_LENGTHS_FILE_NAME = "doc_lengths.u32"
+META_FILE_NAME = "meta.json"
+LOCK_FILE_NAME = ".lock"
+
+# words joined by - . @ stay one token, so "A-1234", "3.5" and e-mail addresses match exactly
+_TOKEN = re.compile(r"\w+(?:[-.@]\w+)*")
+
+# postings for these would cover most chunks while adding almost nothing to the score
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its "
+    "of on or our she so than that the their them then there these they this to was "
+    "we were what when where which who will with you your".split()
+)
+
+MAX_TERM_FREQUENCY = np.iinfo(np.uint16).max
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+class PostingsSegment:
+    """
+    Immutable CSR block of postings: the postings of term t are
+    doc_ids[offsets[t]:offsets[t + 1]] with matching term frequencies in tfs.
+
+    Terms added after the segment was written are simply past the end of `offsets`.
+    """
+
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+
+    @property
+    def terms(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def postings(self) -> int:
+        return len(self.doc_ids)
+
+    def document_frequencies(self, terms: int) -> np.ndarray:
+        frequencies = np.zeros(terms, dtype=np.int64)
+        frequencies[: self.terms] = np.diff(self.offsets)
+        return frequencies
+
+    def postings_of(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term_id >= self.terms:
+            return self.doc_ids[:0], self.tfs[:0]
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def triples(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        term_ids = np.repeat(np.arange(self.terms, dtype=np.uint32), np.diff(self.offsets))
+        return term_ids, np.asarray(self.doc_ids), np.asarray(self.tfs)
+
+    @staticmethod
+    def write(path: str, terms: int, term_ids: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray) -> None:
+        """Write postings given as parallel (term id, doc id, tf) arrays already sorted by doc id."""
+        order = np.argsort(term_ids, kind="stable")
+        offsets = np.zeros(terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=terms), out=offsets[1:])
+
+        tmp_path = f"{path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "offsets.npy"), offsets)
+        np.save(os.path.join(tmp_path, "doc_ids.npy"), doc_ids[order].astype(np.uint32))
+        np.save(os.path.join(tmp_path, "tfs.npy"), tfs[order].astype(np.uint16))
+        os.replace(tmp_path, path)
+
+
+class BM25Index:
+    """
+    Append-only BM25 keyword index for one namespace, shared by ingestion workers
+    (writers) and the API process (reader) through the filesystem.
+
+    On disk a namespace is a directory holding:
+        - terms.txt: the vocabulary, one term per line in term-id order
+        - docs.jsonl: one {"id", "page_content", "metadata"} record per chunk,
+          located through the byte offsets in doc_offsets.u64
+        - doc_lengths.u32: token count of every chunk
+        - seg-<n>/: postings segments (see PostingsSegment)
+        - meta.json: counts, committed byte sizes and live segments, replaced atomically
+
+    Chunks are buffered in the instance by `add` and written as one new segment per
+    `commit`, so each ingestion job writes through an instance of its own. The last
+    two segments are merged while the newer one is at least as large as the older,
+    which keeps the segment count logarithmic in the number of chunks. IDF and the
+    per-chunk length normalisation are precomputed whenever the index changes, so a
+    query only touches the postings of its own terms.
+    """
+
+    def __init__(self, path: str, k1: float = None, b: float = None):
+        self.path = path
+        self.k1 = float(k1 or config_settings.BM25_K1)
+        self.b = float(b if b is not None else config_settings.BM25_B)
+        self.count = 0
+        self.total_length = 0
+        self._generation = -1
+        self._meta_stamp = None
+        self._meta = {}
+        self._vocabulary: Dict[str, int] = {}
+        self._segments: List[PostingsSegment] = []
+        self._doc_offsets: Optional[np.ndarray] = None
+        self._doc_lengths: Optional[np.ndarray] = None
+        self._docs_fd: Optional[int] = None
+        self._idf = np.empty(0, dtype=np.float32)
+        self._length_norm = np.empty(0, dtype=np.float32)
+        self._pending_ids: List[str] = []
+        self._pending_records: List[bytes] = []
+        self._pending_counts: List[Counter] = []
+        self._lock = threading.RLock()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def __len__(self) -> int:
+        self._refresh()
+        return self.count
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._file(META_FILE_NAME)) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return {}
+
+    def _refresh(self) -> None:
+        """Pick up segments committed by any process since the last look."""
+        with self._lock:
+            # meta.json is replaced on every commit, so an unchanged stamp means nothing to parse
+            stamp = file_stamp(self._file(META_FILE_NAME))
+            if stamp is not None and stamp == self._meta_stamp:
+                return
+            meta = self._read_meta()
+            if meta.get("generation", -1) == self._generation:
+                self._meta_stamp = stamp
+                return
+
+            committed_bytes = self._meta.get("terms_bytes", 0)
+            if meta.get("terms_bytes", 0) > committed_bytes:
+                with open(self._file(TERMS_FILE_NAME), "rb") as terms_file:
+                    terms_file.seek(committed_bytes)
+                    new_terms = terms_file.read(meta["terms_bytes"] - committed_bytes)
+                for term in new_terms.decode("utf-8").splitlines():
+                    self._vocabulary[term] = len(self._vocabulary)
+
+            try:
+                segments = [PostingsSegment(self._file(name)) for name in meta.get("segments", [])]
+            except FileNotFoundError:
+                # a writer merged these segments away after we read meta.json; try again
+                self._meta = {**meta, "segments": []}
+                self._generation = -1
+                return self._refresh()
+
+            self.count = meta.get("count", 0)
+            self.total_length = meta.get("total_length", 0)
+            self._segments = segments
+            if self.count:
+                self._doc_offsets = np.memmap(
+                    self._file(DOC_OFFSETS_FILE_NAME), dtype=np.uint64, mode="r", shape=(self.count,)
+                )
+                self._doc_lengths = np.memmap(
+                    self._file(DOC_LENGTHS_FILE_NAME), dtype=np.uint32, mode="r", shape=(self.count,)
+                )
+            self._precompute()
+            self._meta = meta
+            self._meta_stamp = stamp
+            self._generation = meta.get("generation", -1)
+            logger.debug(f"Loaded BM25 index {self.path}: {self.count} chunks, {len(self._vocabulary)} terms")
+
+    def _precompute(self) -> None:
+        terms = len(self._vocabulary)
+        frequencies = np.zeros(terms, dtype=np.int64)
+        for segment in self._segments:
+            frequencies += segment.document_frequencies(terms)
+        self._idf = np.log1p((self.count - frequencies + 0.5) / (frequencies + 0.5)).astype(np.float32)
+
+        if self.count:
+            average_length = self.total_length / self.count
+            lengths = np.asarray(self._doc_lengths, dtype=np.float32)
+            self._length_norm = (self.k1 * (1 - self.b + self.b * lengths / average_length)).astype(np.float32)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(self._file(LOCK_FILE_NAME), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add(self, ids: List[str], texts: List[str], metadatas: Optional[List[dict]] = None) -> None:
+        metadatas = metadatas or [{} for _ in texts]
+        counts = [Counter(tokenize(text)) for text in texts]
+        records = [
+            json.dumps({"id": _id, "page_content": text, "metadata": metadata}, default=str).encode("utf-8") + b"\n"
+            for _id, text, metadata in zip(ids, texts, metadatas)
+        ]
+        with self._lock:
+            self._pending_ids.extend(ids)
+            self._pending_counts.extend(counts)
+            self._pending_records.extend(records)
+            pending = len(self._pending_ids)
+        if pending >= int(config_settings.BM25_COMMIT_EVERY):
+            self.commit()
+
+    def commit(self) -> None:
+        with self._lock:
+            if not self._pending_ids:
+                return
+            started = time.perf_counter()
+            with self._write_lock():
+                self._write_pending()
+                self._merge_segments()
+                self._refresh()
+            logger.info(
+                f"Committed BM25 index {self.path}: {self.count} chunks, "
+                f"{len(self._segments)} segments in {time.perf_counter() - started:.2f}s"
+            )
+
+    def _write_pending(self) -> None:
+        meta = dict(self._meta) or {"count": 0, "terms": 0, "terms_bytes": 0, "docs_bytes": 0,
+                                     "total_length": 0, "segments": [], "generation": 0, "next_segment": 0}
+
+        # new terms get ids after the committed vocabulary; _refresh reads them back from terms.txt
+        new_terms: Dict[str, int] = {}
+        vocabulary = self._vocabulary
+        term_ids, tfs, unique_terms, lengths = [], [], [], []
+        for counts in self._pending_counts:
+            for term in counts:
+                if term not in vocabulary and term not in new_terms:
+                    new_terms[term] = len(vocabulary) + len(new_terms)
+            term_ids.extend([vocabulary[term] if term in vocabulary else new_terms[term] for term in counts])
+            tfs.extend(counts.values())
+            unique_terms.append(len(counts))
+            lengths.append(counts.total())
+        doc_ids = np.repeat(np.arange(meta["count"], meta["count"] + len(unique_terms)), unique_terms)
+
+        terms_payload = "".join(f"{term}\n" for term in new_terms).encode("utf-8")
+        docs_payload = b"".join(self._pending_records)
+        offsets = meta["docs_bytes"] + np.cumsum([0] + [len(record) for record in self._pending_records[:-1]])
+
+        # trailing bytes past the committed sizes are left over from a crashed writer
+        for name, committed, payload in (
+                (TERMS_FILE_NAME, meta["terms_bytes"], terms_payload),
+                (DOCS_FILE_NAME, meta["docs_bytes"], docs_payload),
+                (DOC_OFFSETS_FILE_NAME, meta["count"] * 8, offsets.astype(np.uint64).tobytes()),
+                (DOC_LENGTHS_FILE_NAME, meta["count"] * 4, np.asarray(lengths, dtype=np.uint32).tobytes()),
+        ):
+            with open(self._file(name), "ab") as append_file:
+                append_file.truncate(committed)
+                append_file.write(payload)
+
+        segment_name = f"seg-{meta['next_segment']:06d}"
+        PostingsSegment.write(
+            self._file(segment_name),
+            len(self._vocabulary) + len(new_terms),
+            np.asarray(term_ids, dtype=np.uint32),
+            doc_ids.astype(np.uint32),
+            np.minimum(tfs, MAX_TERM_FREQUENCY).astype(np.uint16),
+        )
+
+        meta.update(
+            count=meta["count"] + len(self._pending_ids),
+            terms=len(self._vocabulary) + len(new_terms),
+            terms_bytes=meta["terms_bytes"] + len(terms_payload),
+            docs_bytes=meta["docs_bytes"] + len(docs_payload),
+            total_length=meta["total_length"] + sum(lengths),
+            segments=meta["segments"] + [segment_name],
+            next_segment=meta["next_segment"] + 1,
+        )
+        self._write_meta(meta)
+        self._pending_ids, self._pending_counts, self._pending_records = [], [], []
+
+    def _merge_segments(self) -> None:
+        meta = self._read_meta()
+        segments = [PostingsSegment(self._file(name)) for name in meta["segments"]]
+        merged = []
+        while len(segments) > 1 and segments[-1].postings >= segments[-2].postings:
+            older, newer = segments[-2], segments.pop()
+            parts = list(zip(older.triples(), newer.triples()))
+            segment_name = f"seg-{meta['next_segment']:06d}"
+            PostingsSegment.write(
+                self._file(segment_name),
+                meta["terms"],
+                *(np.concatenate(part) for part in parts),
+            )
+            segments[-1] = PostingsSegment(self._file(segment_name))
+            meta["next_segment"] += 1
+            merged.extend([older.name, newer.name])
+
+        if merged:
+            meta["segments"] = [segment.name for segment in segments]
+            self._write_meta(meta)
+            # readers still holding a merged segment keep their mapping until they refresh
+            for name in merged:
+                shutil.rmtree(self._file(name), ignore_errors=True)
+
+    def _write_meta(self, meta: dict) -> None:
+        meta["generation"] = meta.get("generation", 0) + 1
+        tmp_path = f"{self._file(META_FILE_NAME)}.tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, self._file(META_FILE_NAME))
+
+    def document(self, row: int) -> Document:
+        # docs.jsonl is only ever appended to, so one descriptor stays valid for the index's lifetime
+        with self._lock:
+            if self._docs_fd is None:
+                self._docs_fd = os.open(self._file(DOCS_FILE_NAME), os.O_RDONLY)
+            docs_fd, offsets, docs_bytes = self._docs_fd, self._doc_offsets, self._meta["docs_bytes"]
+        start = int(offsets[row])
+        end = int(offsets[row + 1]) if row + 1 < len(offsets) else docs_bytes
+        record = json.loads(os.pread(docs_fd, end - start, start))
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """Top `k` chunks by BM25 score; the work is proportional to the query terms' postings."""
+        self._refresh()
+        with self._lock:
+            term_ids = {self._vocabulary[term] for term in tokenize(query) if term in self._vocabulary}
+            segments, idf, length_norm = self._segments, self._idf, self._length_norm
+
+        rows, contributions = [], []
+        for term_id in term_ids:
+            for segment in segments:
+                doc_ids, tfs = segment.postings_of(term_id)
+                if len(doc_ids):
+                    tfs = tfs.astype(np.float32)
+                    rows.append(doc_ids)
+                    contributions.append(idf[term_id] * tfs * (self.k1 + 1) / (tfs + length_norm[doc_ids]))
+        if not rows:
+            return []
+
+        candidates, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        k = min(k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(self.document(int(candidates[i])), float(scores[i])) for i in best]
+
+
+def bm25_index_path(index_name: str, namespace: Optional[str] = None) -> str:
+    namespace = namespace or config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
+    return os.path.join(config_settings.BM25_INDEX_PATH, index_name, namespace)
+
+
+@lru_cache(maxsize=64)
+def get_bm25_index(index_name: str, namespace: Optional[str] = None) -> BM25Index:
+    """
+    Process-wide index for searching. Writers use their own BM25Index per job, so
+    chunks buffered by a job that fails are dropped with it instead of being
+    committed by the next job.
+    """
+    return BM25Index(bm25_index_path(index_name, namespace))
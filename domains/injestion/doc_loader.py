@@ -1,11 +1,5 @@
 import os
 import pprint
-from os.path import expanduser, isfile
-from langchain_community.document_loaders import (
-    TextLoader,
-    PyMuPDFLoader,
-    UnstructuredWordDocumentLoader
-)
 
 from loguru import logger
 from langchain_core.document_loaders import BaseLoader
@@ -13,94 +7,25 @@ from langchain_core.documents import Document
 from domains.settings import config_settings
 
 from domains.injestion.models import FILE_TYPE
-from langchain.chains import RetrievalQA, LLMChain
 from typing import Any, Callable, IO, Dict, Iterator, get_args, Tuple, Callable
 
-from urllib.parse import urlparse
-from tempfile import NamedTemporaryFile
-from os import remove
+from domains.injestion.downloader import resolve_file_path
 from domains.injestion.utils import split_text
 
+# loader classes pull in langchain_community and PyMuPDF; import them on first use
+_LAZY_LOADERS = {
+    "URLDownloaderMixin",
+    "PDFLoaderExtended",
+    "DocLoaderExtended",
+}
 
-class URLDownloaderMixin:
-    @staticmethod
-    def _is_valid_url(url: str) -> bool:
-        parsed = urlparse(url)
-        return bool(parsed.netloc) and bool(parsed.scheme)
-
-    def __init__(self, file_path=None, *args: Any, **kwargs: Any) -> None:
-        self._temp_file: IO[bytes] | None = None
-        self.file_path = str(file_path)
-        if isinstance(self, PyMuPDFLoader):
-            if file_path is None:
-                raise TypeError("string argument file_path is needed for pdf loader")
-            self.file_path = file_path
-            self.web_path = None
-            self.headers = kwargs.pop("headers", None)
-            self.extract_images = kwargs.pop("extract_images", True)
-            self.text_kwargs = kwargs
-
-        if "~" in self.file_path:
-            self.file_path = expanduser(self.file_path)
-
-        if isfile(self.file_path):
-            return
-
-        if self._is_valid_url(self.file_path):
-            self.web_path = self.file_path
-            self._temp_file = NamedTemporaryFile(delete=False)
-            self.file_path = self._temp_file.name
-            return
-
-        raise ValueError(f"File path {self.file_path} is not a valid file or url")
-
-    def __del__(self) -> None:
-        if self._temp_file:
-            self._temp_file.close()
-            remove(self._temp_file.name)
-
-
-class PDFLoaderExtended(URLDownloaderMixin, PyMuPDFLoader):
-    def __init__(
-            self,
-            file_path: str,
-            *,
-            headers: dict[Any, Any] | None = None,
-            extract_images: bool = True,
-            **kwargs: Any,
-    ):
-        super().__init__(
-            file_path=file_path,
-            headers=headers,
-            extract_images=extract_images,
-            **kwargs,
-        )
-
-class DocLoaderExtended(URLDownloaderMixin, UnstructuredWordDocumentLoader):
-    def __init__(
-            self,
-            file_path: str,
-            *,
-            headers: dict[Any, Any] | None = None,
-            mode: str = "single",
-            **unstructured_kwargs: Any,
-    ):
-        URLDownloaderMixin.__init__(self, file_path)
-        self.file_path = self.file_path
-        self.mode = mode
-        self.unstructured_kwargs = unstructured_kwargs or {}
 
-        if self.mode == "single":
-            self.strategy = "fast"
-        if self.mode == "elements":
-            self.strategy = "accurate"
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_LOADERS:
+        from domains.injestion import file_loaders
 
-        self.unstructured_kwargs["strategy"] = self.strategy
-        self.post_processors = []
-        self.languages = None
-        self.include_metadata = True
-        self.metadata_filename = None
-        self.metadata_last_modified = None
+        return getattr(file_loaders, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class FileLoader(BaseLoader):
@@ -114,36 +39,43 @@ class FileLoader(BaseLoader):
         if self.process_type not in valid_types:
             raise ValueError(f"Invalid process type: {self.process_type}. Supported types are: {', '.join(valid_types)}")
 
-    def _validate_file_path(self) -> None:
-        if not os.path.isfile(self.file_path):
-            raise FileNotFoundError(f"File not found: {self.file_path}")
+    @staticmethod
+    def _validate_file_path(file_path: str) -> None:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+
+    def _get_loader(self, file_path: str) -> BaseLoader:
+        from langchain_community.document_loaders import TextLoader
+        from domains.injestion.file_loaders import DocLoaderExtended, PDFLoaderExtended
+
+        if self.process_type == "text":
+            return TextLoader(file_path=file_path)
+        elif self.process_type == "pdf":
+            return PDFLoaderExtended(file_path=file_path, extract_images=False)
+        elif self.process_type == "docx":
+            return DocLoaderExtended(file_path=file_path, extract_images=False)
+        raise ValueError(f"Unsupported process type: {self.process_type}")
+
+    def lazy_load(self) -> Iterator[Document]:
+        """
+        Yield the file one page (or element) at a time instead of materialising it.
+
+        URLs are downloaded first; the local copy is removed once the iterator finishes or is closed.
+        """
+        logger.info(f"{self.__class__.__name__}.lazy_load(): Streaming file from {self.file_path}")
+        with resolve_file_path(self.file_path) as file_path:
+            self._validate_file_path(file_path)
+            yield from self._get_loader(file_path).lazy_load()
 
     def load(self) -> list[Document] | str:
         try:
             logger.info(f"{self.__class__.__name__}.load(): Attempting to load file from {self.file_path}")
-            self._validate_file_path()
-
-            if self.process_type == "text":
-                text_loader = TextLoader(file_path=self.file_path)
-                file_contents = text_loader.load()
+            with resolve_file_path(self.file_path) as file_path:
+                self._validate_file_path(file_path)
+                file_contents = self._get_loader(file_path).load()
                 logger.info(f"Successfully loaded file from {self.file_path} and total pages in file is {len(file_contents)}")
                 return file_contents
 
-            elif self.process_type == "pdf":
-                pdf_loader = PDFLoaderExtended(file_path=self.file_path, extract_images=False)
-                file_contents = pdf_loader.load()
-                logger.info(f"Successfully loaded file from {self.file_path} and total pages in file is {len(file_contents)}")
-                return file_contents
-
-            elif self.process_type == "docx":
-                doc_loader = DocLoaderExtended(file_path=self.file_path, extract_images=False)
-                file_contents = doc_loader.load()
-                logger.info(f"Successfully loaded file from {self.file_path} and total pages in file is {len(file_contents)}")
-                return file_contents
-
-            else:
-                raise ValueError(f"Unsupported process type: {self.process_type}")
-
         except FileNotFoundError as fnf_error:
             logger.error(f"{self.__class__.__name__}.load(): File not found - {fnf_error}")
             return "Error: File does not exist."
@@ -156,16 +88,7 @@ class FileLoader(BaseLoader):
             return "Error: An unexpected error occurred while loading the file."
 
 
-def file_loader(
-    pre_signed_url: str,
-    file_name: str,
-    original_file_name: str,
-    file_type: str,
-    process_type: str,
-    params: dict[str, Any],
-    metadata: list[dict[str, str]] = [{}],
-) -> Tuple[list[Document], Any]:
-
+def _get_file_loader(file_type: str, process_type: str, pre_signed_url: str) -> BaseLoader:
     if file_type not in FILE_TYPE:
         raise Exception(f"{file_type} is not a supported file type")
 
@@ -178,21 +101,16 @@ def file_loader(
     if (loader := loaders.get(process_type)) is None:
         raise FileNotFoundError("Unsupported process_type")
 
-    loaded_documents = loader().load()
-    logger.info(f"documents loaded {len(loaded_documents)}")
+    return loader()
 
-    parsed_documents: list[Document] = []
-    tags = params.get("tags") or []
-    synonyms = params.get("synonyms") or []
-
-    parsed_documents = split_text(
-        text=loaded_documents,
-        CHUNK_SIZE=config_settings.CHUNK_SIZE,
-        CHUNK_OVERLAP=config_settings.CHUNK_OVERLAP
-    )
-
-    logger.info(f"Total number of document chunks {len(parsed_documents)}")
 
+def _build_additional_metadata(
+    file_name: str,
+    original_file_name: str,
+    file_type: str,
+    process_type: str,
+    metadata: list[dict[str, str]],
+) -> dict[str, Any]:
     additional_metadata = {
         "original_file_name": original_file_name,
         "file_name": file_name,
@@ -204,9 +122,102 @@ def file_loader(
         for i in metadata:
             additional_metadata.update(i)
 
-    for document in parsed_documents:
+    return additional_metadata
+
+
+def _apply_metadata(
+    documents: list[Document],
+    additional_metadata: dict[str, Any],
+    original_file_name: str,
+) -> list[Document]:
+    for document in documents:
         document.metadata |= additional_metadata | {
             "title": document.metadata.get("title") or original_file_name
         }
+    return documents
+
+
+class ChunkStream:
+    """
+    Iterates a file's chunks, loading and splitting one page at a time.
+
+    `pages` counts the pages consumed so far, so it holds the total once the
+    stream is exhausted.
+    """
+
+    def __init__(
+        self,
+        loader: BaseLoader,
+        additional_metadata: dict[str, Any],
+        original_file_name: str,
+    ):
+        self.loader = loader
+        self.additional_metadata = additional_metadata
+        self.original_file_name = original_file_name
+        self.pages = 0
+        self.chunks = 0
+
+    def __iter__(self) -> Iterator[Document]:
+        for page in self.loader.lazy_load():
+            self.pages += 1
+            chunks = split_text(
+                text=[page],
+                CHUNK_SIZE=config_settings.CHUNK_SIZE,
+                CHUNK_OVERLAP=config_settings.CHUNK_OVERLAP
+            )
+            self.chunks += len(chunks)
+            yield from _apply_metadata(chunks, self.additional_metadata, self.original_file_name)
+
+        logger.info(f"Streamed {self.pages} pages into {self.chunks} document chunks")
+
+
+def file_loader_stream(
+    pre_signed_url: str,
+    file_name: str,
+    original_file_name: str,
+    file_type: str,
+    process_type: str,
+    params: dict[str, Any],
+    metadata: list[dict[str, str]] = [{}],
+) -> ChunkStream:
+    """Streaming counterpart of `file_loader`: nothing is loaded until the stream is iterated."""
+    return ChunkStream(
+        loader=_get_file_loader(file_type, process_type, pre_signed_url),
+        additional_metadata=_build_additional_metadata(
+            file_name, original_file_name, file_type, process_type, metadata
+        ),
+        original_file_name=original_file_name,
+    )
+
+
+def file_loader(
+    pre_signed_url: str,
+    file_name: str,
+    original_file_name: str,
+    file_type: str,
+    process_type: str,
+    params: dict[str, Any],
+    metadata: list[dict[str, str]] = [{}],
+) -> Tuple[list[Document], Any]:
+
+    loaded_documents = _get_file_loader(file_type, process_type, pre_signed_url).load()
+    logger.info(f"documents loaded {len(loaded_documents)}")
+
+    parsed_documents: list[Document] = []
+    tags = params.get("tags") or []
+    synonyms = params.get("synonyms") or []
+
+    parsed_documents = split_text(
+        text=loaded_documents,
+        CHUNK_SIZE=config_settings.CHUNK_SIZE,
+        CHUNK_OVERLAP=config_settings.CHUNK_OVERLAP
+    )
+
+    logger.info(f"Total number of document chunks {len(parsed_documents)}")
+
+    additional_metadata = _build_additional_metadata(
+        file_name, original_file_name, file_type, process_type, metadata
+    )
+    _apply_metadata(parsed_documents, additional_metadata, original_file_name)
 
-    return parsed_documents, loaded_documents
\ No newline at end of file
+    return parsed_documents, loaded_documents
@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from os.path import expanduser, isfile
+from typing import AsyncIterator, Iterator, Optional
+from urllib.parse import unquote, urlparse, urlunparse
+
+import aiohttp
+from loguru import logger
+
+from domains.settings import config_settings
+
+_MD5_ETAG = re.compile(r"^[0-9a-f]{32}$")
+
+
+class DownloadError(Exception):
+    """Raised when a download fails or does not match its Content-Length / ETag."""
+    pass
+
+
+def is_url(path: str) -> bool:
+    parsed = urlparse(path)
+    return bool(parsed.netloc) and bool(parsed.scheme)
+
+
+def cache_key(url: str, etag: str) -> str:
+    """Pre-signed URLs differ per request only in their query string, so it is dropped."""
+    parsed = urlparse(url)
+    return f"{urlunparse(parsed._replace(query='', fragment=''))}#{etag}"
+
+
+def _file_name(url: str) -> str:
+    name = os.path.basename(unquote(urlparse(url).path)) or "download"
+    return re.sub(r"[^\w.\-]", "_", name)
+
+
+class DownloadCache:
+    """
+    Content-addressed store of downloaded files with size-bounded LRU eviction.
+
+    Bodies live under `objects/<sha256>`; a SQLite index maps (url without query, ETag)
+    to the object. Callers never read objects directly: `link` hard-links the object
+    into a private `lease` directory that is removed on exit, so eviction by this or
+    another process never pulls a file out from under a running parser. Another process
+    can still evict an object between a lookup and the link; `link` then raises
+    FileNotFoundError and the caller fetches again.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.partial_dir = os.path.join(root, "partial")
+        self.leases_dir = os.path.join(root, "leases")
+        for directory in (self.objects_dir, self.partial_dir, self.leases_dir):
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS downloads (
+                key TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._connection.commit()
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256)
+
+    def partial_path(self) -> str:
+        return os.path.join(self.partial_dir, uuid.uuid4().hex)
+
+    def lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT sha256 FROM downloads WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not isfile(self.object_path(row[0])):
+                self._connection.execute("DELETE FROM downloads WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            self._connection.execute(
+                "UPDATE downloads SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._connection.commit()
+            return row[0]
+
+    def store(self, partial_path: str, sha256: str, size: int, key: Optional[str]) -> None:
+        """
+        Move a verified download into the object store and index it under `key`.
+
+        Without a usable ETag there is no key a later request could look up, but the
+        object is still indexed under its content hash so that it counts towards
+        `max_bytes` and is evicted like any other.
+        """
+        key = key or f"sha256:{sha256}"
+        os.replace(partial_path, self.object_path(sha256))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO downloads (key, sha256, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, sha256, size, time.time()),
+            )
+            self._connection.commit()
+        self.evict(keep=sha256)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used objects until the cache fits, sparing `keep`."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT sha256, size, MAX(last_access) FROM downloads GROUP BY sha256 ORDER BY MAX(last_access)"
+            ).fetchall()
+            total = sum(size for _, size, _ in rows)
+            for sha256, size, _ in rows:
+                if total <= self.max_bytes:
+                    break
+                if sha256 == keep:
+                    continue
+                self._connection.execute("DELETE FROM downloads WHERE sha256 = ?", (sha256,))
+                try:
+                    os.remove(self.object_path(sha256))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                logger.debug(f"Evicted {sha256} ({size} bytes) from the download cache")
+            self._connection.commit()
+
+    @contextmanager
+    def lease(self) -> Iterator[str]:
+        """A private directory for `link`ed files, removed with its contents on exit."""
+        lease_dir = os.path.join(self.leases_dir, uuid.uuid4().hex)
+        os.makedirs(lease_dir)
+        try:
+            yield lease_dir
+        finally:
+            shutil.rmtree(lease_dir, ignore_errors=True)
+
+    def link(self, sha256: str, path: str) -> str:
+        """Hard-link (or copy) an object to `path`; FileNotFoundError if it was evicted."""
+        try:
+            os.link(self.object_path(sha256), path)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            shutil.copyfile(self.object_path(sha256), path)
+        return path
+
+
+class Downloader:
+    """
+    Streams URLs to disk with aiohttp in fixed-size chunks.
+
+    The response's Content-Length is always checked; a plain MD5 ETag (single-part S3
+    uploads) is checked against the body. A file already cached for the same URL and
+    ETag is served without reading the body, so retries of a job do not re-download.
+    """
+
+    def __init__(
+            self,
+            cache: DownloadCache,
+            chunk_size: int,
+            timeout: float,
+            retries: int = 3,
+    ):
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> str:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            etag = response.headers.get("ETag", "").strip()
+            key = cache_key(url, etag) if etag and not etag.startswith("W/") else None
+
+            if key and (sha256 := await asyncio.to_thread(self.cache.lookup, key)):
+                logger.info(f"Download cache hit for {_file_name(url)} ({sha256})")
+                response.close()
+                return sha256
+
+            expected_size = response.content_length
+            expected_md5 = etag.strip('"').lower()
+            sha256, md5, size = hashlib.sha256(), hashlib.md5(), 0
+            partial_path = self.cache.partial_path()
+            try:
+                with open(partial_path, "wb") as file:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        file.write(chunk)
+                        sha256.update(chunk)
+                        md5.update(chunk)
+                        size += len(chunk)
+
+                if expected_size is not None and size != expected_size:
+                    raise DownloadError(f"Expected {expected_size} bytes, received {size}")
+                if _MD5_ETAG.match(expected_md5) and md5.hexdigest() != expected_md5:
+                    raise DownloadError(f"Body does not match ETag {etag}")
+
+                digest = sha256.hexdigest()
+                await asyncio.to_thread(self.cache.store, partial_path, digest, size, key)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        logger.info(f"Downloaded {_file_name(url)}: {size} bytes")
+        return digest
+
+    async def fetch(self, url: str) -> str:
+        """Download `url` into the cache (or find it there) and return its sha256."""
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            for attempt in range(1, self.retries + 1):
+                try:
+                    return await self._fetch(session, url)
+                except (aiohttp.ClientError, asyncio.TimeoutError, DownloadError) as e:
+                    logger.warning(f"Download attempt {attempt} of {_file_name(url)} failed: {e}")
+                    if attempt == self.retries:
+                        raise DownloadError(f"Failed to download {_file_name(url)}: {e}") from e
+                    await asyncio.sleep(2 ** (attempt - 1))
+
+    async def fetch_into(self, url: str, lease_dir: str) -> str:
+        """Fetch `url` and link it into `lease_dir`, fetching again if it is evicted in between."""
+        path = os.path.join(lease_dir, _file_name(url))
+        for attempt in range(1, self.retries + 1):
+            sha256 = await self.fetch(url)
+            try:
+                return await asyncio.to_thread(self.cache.link, sha256, path)
+            except FileNotFoundError:
+                logger.warning(f"{_file_name(url)} was evicted before it could be leased (attempt {attempt})")
+        raise DownloadError(f"{_file_name(url)} was evicted from the download cache on every attempt")
+
+    @asynccontextmanager
+    async def open(self, url: str) -> AsyncIterator[str]:
+        with self.cache.lease() as lease_dir:
+            yield await self.fetch_into(url, lease_dir)
+
+
+_downloader: Optional[Downloader] = None
+_downloader_lock = threading.Lock()
+
+
+def get_downloader() -> Downloader:
+    global _downloader
+    with _downloader_lock:
+        if _downloader is None:
+            _downloader = Downloader(
+                cache=DownloadCache(
+                    root=config_settings.DOWNLOAD_CACHE_DIR,
+                    max_bytes=int(config_settings.DOWNLOAD_CACHE_MAX_BYTES),
+                ),
+                chunk_size=int(config_settings.DOWNLOAD_CHUNK_SIZE),
+                timeout=float(config_settings.DOWNLOAD_TIMEOUT_SECONDS),
+            )
+        return _downloader
+
+
+@contextmanager
+def resolve_file_path(file_path: str) -> Iterator[str]:
+    """
+    Yield a local path for `file_path`, downloading it first if it is a URL.
+
+    Downloaded files are removed when the block exits. Blocking; do not call from a coroutine.
+    """
+    if "~" in file_path:
+        file_path = expanduser(file_path)
+    if isfile(file_path) or not is_url(file_path):
+        yield file_path
+        return
+
+    downloader = get_downloader()
+    with downloader.cache.lease() as lease_dir:
+        yield asyncio.run(downloader.fetch_into(file_path, lease_dir))
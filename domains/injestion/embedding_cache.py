@@ -0,0 +1,340 @@
+import asyncio
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+SQLITE_MAX_PARAMS = 500
+
+STAT_COUNTERS = (
+    "query_lru_hits",
+    "store_hits",
+    "misses",
+    "saved_characters",
+    "embedded_characters",
+    "embedding_seconds",
+)
+
+
+def text_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCacheStore:
+    """
+    SQLite table of float32 embedding blobs keyed by (model, sha256(text)), plus
+    per-model hit/miss counters summed over every process using the file.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS embedding_cache_stats (
+                model TEXT PRIMARY KEY,
+                {", ".join(
+                    f"{name} {'REAL' if name == 'embedding_seconds' else 'INTEGER'} NOT NULL DEFAULT 0"
+                    for name in STAT_COUNTERS
+                )}
+            )
+            """
+        )
+        self._connection.commit()
+
+    def add_stats(self, model: str, increments: Dict[str, float]) -> None:
+        names = [name for name in STAT_COUNTERS if increments.get(name)]
+        if not names:
+            return
+        with self._lock:
+            self._connection.execute(
+                f"""
+                INSERT INTO embedding_cache_stats (model, {", ".join(names)})
+                VALUES (?, {", ".join("?" * len(names))})
+                ON CONFLICT (model) DO UPDATE SET
+                    {", ".join(f"{name} = {name} + excluded.{name}" for name in names)}
+                """,
+                [model, *(increments[name] for name in names)],
+            )
+            self._connection.commit()
+
+    def read_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT model, {', '.join(STAT_COUNTERS)} FROM embedding_cache_stats"
+            ).fetchall()
+        return {row[0]: dict(zip(STAT_COUNTERS, row[1:])) for row in rows}
+
+    def get_many(self, model: str, hashes: List[bytes]) -> Dict[bytes, List[float]]:
+        found: Dict[bytes, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(hashes), SQLITE_MAX_PARAMS):
+                batch = hashes[start:start + SQLITE_MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[bytes, List[float]]) -> None:
+        rows = [
+            (model, key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._connection.commit()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that only calls the underlying model for texts it has not seen.
+
+    Documents are looked up in the persistent store in one batched query, so ingestion
+    embeds cache misses only. Query strings additionally go through an in-memory LRU
+    in front of the store. Counters are accumulated in memory and added to the store's
+    shared totals every `stats_flush_every` lookups, once `stats_flush_seconds` have
+    passed since the last write, when stats are read and at interpreter exit, so stats
+    cover the ingestion worker processes as well as the API process without a write
+    per lookup.
+    """
+
+    def __init__(
+            self,
+            underlying: Embeddings,
+            model_name: str,
+            store: EmbeddingCacheStore,
+            query_cache_size: int = 1024,
+            stats_flush_every: int = 200,
+            stats_flush_seconds: float = 30.0,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = store
+        self.query_cache_size = query_cache_size
+        self.stats_flush_every = stats_flush_every
+        self.stats_flush_seconds = stats_flush_seconds
+        self._query_cache: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._unflushed = dict.fromkeys(STAT_COUNTERS, 0)
+        self._unflushed_lookups = 0
+        self._flushed_at = time.monotonic()
+
+    def _record(self, lookups: int = 0, **increments) -> None:
+        with self._lock:
+            for key, value in increments.items():
+                self._unflushed[key] += value
+            self._unflushed_lookups += lookups
+            due = (
+                self._unflushed_lookups >= self.stats_flush_every
+                or time.monotonic() - self._flushed_at >= self.stats_flush_seconds
+            )
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self) -> None:
+        with self._lock:
+            increments, self._unflushed = self._unflushed, dict.fromkeys(STAT_COUNTERS, 0)
+            self._unflushed_lookups = 0
+            self._flushed_at = time.monotonic()
+        self.store.add_stats(self.model_name, increments)
+
+    def stats(self) -> dict:
+        self.flush_stats()
+        return summarise_stats(
+            self.model_name, self.store.read_stats().get(self.model_name, dict.fromkeys(STAT_COUNTERS, 0))
+        )
+
+    def _split_hits(self, texts: List[str]):
+        hashes = [text_hash(text) for text in texts]
+        cached = self.store.get_many(self.model_name, list(set(hashes)))
+
+        missing: Dict[bytes, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        self._record(
+            lookups=len(texts) - len(missing),
+            store_hits=len(texts) - sum(1 for key in hashes if key not in cached),
+            saved_characters=sum(len(t) for k, t in zip(hashes, texts) if k in cached),
+        )
+        return hashes, cached, missing
+
+    def _store_misses(self, missing: Dict[bytes, str], vectors: List[List[float]], elapsed: float):
+        computed = dict(zip(missing, vectors))
+        self.store.put_many(self.model_name, computed)
+        self._record(
+            lookups=len(missing),
+            misses=len(missing),
+            embedded_characters=sum(len(text) for text in missing.values()),
+            embedding_seconds=elapsed,
+        )
+        return computed
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = self._split_hits(texts)
+        if missing:
+            started = time.perf_counter()
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            cached.update(self._store_misses(missing, vectors, time.perf_counter() - started))
+        return [cached[key] for key in hashes]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, cached, missing = await asyncio.to_thread(self._split_hits, texts)
+        if missing:
+            started = time.perf_counter()
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            cached.update(
+                await asyncio.to_thread(
+                    self._store_misses, missing, vectors, time.perf_counter() - started
+                )
+            )
+        return [cached[key] for key in hashes]
+
+    def _query_lru_get(self, key: bytes) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._query_cache.get(key)
+            if vector is not None:
+                self._query_cache.move_to_end(key)
+            return vector
+
+    def _query_lru_put(self, key: bytes, vector: List[float]) -> None:
+        with self._lock:
+            self._query_cache[key] = vector
+            self._query_cache.move_to_end(key)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        vector = self._query_lru_get(key)
+        if vector is not None:
+            self._record(lookups=1, query_lru_hits=1, saved_characters=len(text))
+            return vector
+        vector = self.embed_documents([text])[0]
+        self._query_lru_put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        vector = self._query_lru_get(key)
+        if vector is not None:
+            self._record(lookups=1, query_lru_hits=1, saved_characters=len(text))
+            return vector
+        vector = (await self.aembed_documents([text]))[0]
+        self._query_lru_put(key, vector)
+        return vector
+
+
+def summarise_stats(model_name: str, counters: Dict[str, float]) -> dict:
+    stats = {name: counters[name] for name in STAT_COUNTERS}
+    hits = stats["query_lru_hits"] + stats["store_hits"]
+    lookups = hits + stats["misses"]
+    seconds_per_char = (
+        stats["embedding_seconds"] / stats["embedded_characters"]
+        if stats["embedded_characters"] else 0.0
+    )
+    stats.update(
+        model=model_name,
+        hits=hits,
+        hit_rate=hits / lookups if lookups else 0.0,
+        estimated_seconds_saved=stats["saved_characters"] * seconds_per_char,
+    )
+    return stats
+
+
+_stores: Dict[str, EmbeddingCacheStore] = {}
+_cached_embeddings: Dict[str, CachedEmbeddings] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_store(path: str) -> EmbeddingCacheStore:
+    with _registry_lock:
+        if path not in _stores:
+            _stores[path] = EmbeddingCacheStore(path)
+        return _stores[path]
+
+
+def wrap_with_cache(
+        make_underlying: Callable[[], Embeddings],
+        model_name: str,
+        path: str,
+        query_cache_size: int,
+        stats_flush_every: int = 200,
+        stats_flush_seconds: float = 30.0,
+) -> CachedEmbeddings:
+    """
+    Return the process-wide cache wrapper for `model_name`. The underlying client is
+    only built, by `make_underlying`, when the wrapper does not exist yet.
+    """
+    with _registry_lock:
+        embeddings = _cached_embeddings.get(model_name)
+    if embeddings is not None:
+        return embeddings
+
+    store = _get_store(path)
+    with _registry_lock:
+        if model_name not in _cached_embeddings:
+            logger.info(f"Initialising embedding cache for {model_name} at {path}")
+            _cached_embeddings[model_name] = CachedEmbeddings(
+                underlying=make_underlying(),
+                model_name=model_name,
+                store=store,
+                query_cache_size=query_cache_size,
+                stats_flush_every=stats_flush_every,
+                stats_flush_seconds=stats_flush_seconds,
+            )
+        return _cached_embeddings[model_name]
+
+
+@atexit.register
+def flush_all_stats() -> None:
+    """Write the counters still held in memory, e.g. when a worker process exits."""
+    for embeddings in list(_cached_embeddings.values()):
+        try:
+            embeddings.flush_stats()
+        except Exception as e:
+            logger.error(f"Failed to flush embedding cache stats for {embeddings.model_name}: {e}")
+
+
+def get_embedding_cache_stats(path: str) -> List[dict]:
+    """Totals per model across every process sharing the cache file at `path`."""
+    for embeddings in list(_cached_embeddings.values()):
+        if embeddings.store.path == path:
+            embeddings.flush_stats()
+    return [
+        summarise_stats(model_name, counters)
+        for model_name, counters in _get_store(path).read_stats().items()
+    ]
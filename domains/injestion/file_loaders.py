@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from os.path import isfile
+from typing import Any, Iterator
+
+from langchain_community.document_loaders import PyMuPDFLoader, UnstructuredWordDocumentLoader
+from langchain_core.documents import Document
+from loguru import logger
+
+from domains.injestion.downloader import is_url, resolve_file_path
+from domains.settings import config_settings
+
+
+class URLDownloaderMixin:
+    """
+    Lets a file loader take a URL: the file is fetched through the download cache.
+
+    The downloaded copy lives until `close()` (or the end of a `with` block), not until
+    the loader happens to be garbage collected.
+    """
+
+    def __init__(self, file_path=None, *args: Any, **kwargs: Any) -> None:
+        self._exit_stack = ExitStack()
+        self.file_path = str(file_path)
+        if isinstance(self, PyMuPDFLoader):
+            if file_path is None:
+                raise TypeError("string argument file_path is needed for pdf loader")
+            self.web_path = None
+            self.headers = kwargs.pop("headers", None)
+            self.extract_images = kwargs.pop("extract_images", True)
+            self.text_kwargs = kwargs
+
+        if is_url(self.file_path):
+            self.web_path = self.file_path
+        self.file_path = self._exit_stack.enter_context(resolve_file_path(self.file_path))
+
+        if not isfile(self.file_path):
+            self.close()
+            raise ValueError(f"File path {self.file_path} is not a valid file or url")
+
+    def close(self) -> None:
+        self._exit_stack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _parse_pdf_page_range(
+        file_path: str,
+        start: int,
+        stop: int,
+        text_kwargs: dict[str, Any],
+) -> list[tuple[str, dict[str, Any]]]:
+    """
+    Process-pool worker: open the PDF independently and extract pages [start, stop).
+
+    Returns plain (text, metadata) pairs shaped like PyMuPDFLoader's documents, so
+    only strings and dicts cross the process boundary.
+    """
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        base_metadata = {
+            "source": file_path,
+            "file_path": file_path,
+            "total_pages": len(doc),
+        } | {k: v for k, v in doc.metadata.items() if type(v) in [str, int]}
+
+        return [
+            (doc[page].get_text(**text_kwargs), base_metadata | {"page": page})
+            for page in range(start, stop)
+        ]
+
+
+def _pdf_parsing_workers() -> int:
+    """
+    Processes per parsing pool. Each of the INGESTION_WORKERS job processes owns a pool,
+    so by default they split the cores between them rather than each taking all of them.
+    """
+    if int(config_settings.PDF_SHARDING_WORKERS):
+        return int(config_settings.PDF_SHARDING_WORKERS)
+    return max(1, (os.cpu_count() or 1) // max(1, int(config_settings.INGESTION_WORKERS)))
+
+
+@lru_cache(maxsize=1)
+def _get_pdf_parsing_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=_pdf_parsing_workers(),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+class PDFLoaderExtended(URLDownloaderMixin, PyMuPDFLoader):
+    def __init__(
+            self,
+            file_path: str,
+            *,
+            headers: dict[Any, Any] | None = None,
+            extract_images: bool = True,
+            **kwargs: Any,
+    ):
+        super().__init__(
+            file_path=file_path,
+            headers=headers,
+            extract_images=extract_images,
+            **kwargs,
+        )
+
+    def _page_count(self) -> int:
+        import fitz
+
+        with fitz.open(self.file_path) as doc:
+            return len(doc)
+
+    def lazy_load(self) -> Iterator[Document]:
+        """
+        Parse pages on one core for small files, or shard page ranges across a process pool.
+
+        Sharding kicks in at PDF_SHARDING_PAGE_THRESHOLD pages. Each worker opens the file
+        itself; shards are yielded in page order with at most two shards per worker in
+        flight, so streaming ingestion keeps its memory bound.
+        """
+        total_pages = self._page_count()
+        if self.extract_images or total_pages < config_settings.PDF_SHARDING_PAGE_THRESHOLD:
+            yield from super().lazy_load()
+            return
+
+        pool = _get_pdf_parsing_pool()
+        shard_size = int(config_settings.PDF_SHARD_SIZE)
+        max_in_flight = 2 * _pdf_parsing_workers()
+        logger.info(
+            f"Sharding {total_pages} pages of {self.file_path} into ranges of {shard_size} "
+            f"across {_pdf_parsing_workers()} processes"
+        )
+
+        in_flight: deque[Future] = deque()
+        ranges = iter(range(0, total_pages, shard_size))
+        try:
+            while True:
+                while len(in_flight) < max_in_flight and (start := next(ranges, None)) is not None:
+                    in_flight.append(pool.submit(
+                        _parse_pdf_page_range,
+                        self.file_path,
+                        start,
+                        min(start + shard_size, total_pages),
+                        self.text_kwargs,
+                    ))
+                if not in_flight:
+                    break
+                for text, metadata in in_flight.popleft().result():
+                    yield Document(page_content=text, metadata=metadata)
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def load(self, **kwargs: Any) -> list[Document]:
+        if kwargs:
+            return super().load(**kwargs)
+        return list(self.lazy_load())
+
+class DocLoaderExtended(URLDownloaderMixin, UnstructuredWordDocumentLoader):
+    def __init__(
+            self,
+            file_path: str,
+            *,
+            headers: dict[Any, Any] | None = None,
+            mode: str = "single",
+            **unstructured_kwargs: Any,
+    ):
+        URLDownloaderMixin.__init__(self, file_path)
+        self.file_path = self.file_path
+        self.mode = mode
+        self.unstructured_kwargs = unstructured_kwargs or {}
+
+        if self.mode == "single":
+            self.strategy = "fast"
+        if self.mode == "elements":
+            self.strategy = "accurate"
+
+        self.unstructured_kwargs["strategy"] = self.strategy
+        self.post_processors = []
+        self.languages = None
+        self.include_metadata = True
+        self.metadata_filename = None
+        self.metadata_last_modified = None
@@ -0,0 +1,522 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import hnswlib
+import numpy as np
+from langchain_core.documents import Document
+from loguru import logger
+
+from domains.injestion.local_vector_store import (
+    LOCK_FILE_NAME,
+    META_FILE_NAME,
+    LocalVectorStore,
+    file_stamp,
+    normalise_vectors,
+)
+from domains.settings import config_settings
+
+INDEX_FILE_NAME = "index.hnsw"
+
+
+class _ReadWriteLock:
+    """Any number of readers or one writer; waiting writers go before new readers."""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._changed:
+            self._changed.wait_for(lambda: not self._writing and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._changed:
+                self._readers -= 1
+                self._changed.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._changed:
+            self._writers_waiting += 1
+            self._changed.wait_for(lambda: not self._writing and not self._readers)
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._changed:
+                self._writing = False
+                self._changed.notify_all()
+
+
+class HnswNamespaceIndex:
+    """
+    Persistent HNSW index for one namespace.
+
+    Inserts go straight into the graph; deletes are tombstones (`mark_deleted`) and
+    a background thread rebuilds the graph once the tombstoned share of labels passes
+    HNSW_COMPACTION_RATIO. Changes live in memory until `persist()` saves the graph,
+    appends the new records to the docs file and replaces meta.json. The docs file is
+    rewritten, without deleted records, only on the first persist after a compaction.
+    Records are read from the docs file by offset when a hit needs them.
+
+    k-NN queries run outside the instance lock under the shared side of a read/write
+    lock, so searches overlap each other and only wait for graph writes.
+
+    Several processes may write the same namespace. `persist()` holds an exclusive
+    flock on .lock; if another process persisted since this one loaded, the saved
+    state is reloaded and this process's inserts and deletes since its last persist
+    are replayed on top of it before anything is written.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            m: Optional[int] = None,
+            ef_construction: Optional[int] = None,
+            ef_search: Optional[int] = None,
+    ):
+        self.path = path
+        self.m = int(m or config_settings.HNSW_M)
+        self.ef_construction = int(ef_construction or config_settings.HNSW_EF_CONSTRUCTION)
+        self.ef_search = int(ef_search or config_settings.HNSW_EF_SEARCH)
+        self._lock = threading.RLock()
+        self._graph_lock = _ReadWriteLock()
+        self._compaction: Optional[threading.Thread] = None
+        self._added_during_compaction: List[int] = []
+        self._deleted_during_compaction: List[int] = []
+        self._meta_stamp: Optional[Tuple[int, int]] = None
+        self._docs_fd: Optional[int] = None
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.dimension: Optional[int] = None
+        self.next_label = 0
+        self.generation = 0
+        self._index: Optional[hnswlib.Index] = None
+        self._labels_by_id: Dict[str, int] = {}
+        self._deleted: set[int] = set()
+        # (start, end) of every persisted live record in the docs file
+        self._offsets: Dict[int, Tuple[int, int]] = {}
+        self._docs_file: Optional[str] = None
+        self._docs_bytes = 0
+        self._compacted = False
+        if self._docs_fd is not None:
+            os.close(self._docs_fd)
+            self._docs_fd = None
+        # changes not yet persisted, replayed onto the saved state if another process persisted first
+        self._pending_ids: Dict[str, int] = {}
+        self._pending_deletes: set[str] = set()
+        self._pending_records: Dict[int, dict] = {}
+
+    @property
+    def count(self) -> int:
+        return len(self._labels_by_id)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def _index_path(self) -> str:
+        return self._file(INDEX_FILE_NAME)
+
+    @property
+    def _meta_path(self) -> str:
+        return self._file(META_FILE_NAME)
+
+    def _new_index(self, capacity: int) -> hnswlib.Index:
+        index = hnswlib.Index(space="cosine", dim=self.dimension)
+        index.init_index(
+            max_elements=max(capacity, config_settings.HNSW_INITIAL_CAPACITY),
+            ef_construction=self.ef_construction,
+            M=self.m,
+            allow_replace_deleted=False,
+        )
+        index.set_ef(self.ef_search)
+        return index
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._meta_path) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return {}
+
+    @contextmanager
+    def _flock(self, operation: int) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(LOCK_FILE_NAME), "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, write_locked: bool = False) -> None:
+        if not os.path.isfile(self._meta_path):
+            self._meta_stamp = None
+            return
+        if not write_locked:
+            # a shared flock keeps a persist from replacing the files halfway through
+            with self._flock(fcntl.LOCK_SH):
+                return self._load(write_locked=True)
+
+        self._meta_stamp = file_stamp(self._meta_path)
+        meta = self._read_meta()
+        self.dimension = meta["dimension"]
+        self.next_label = meta["next_label"]
+        self.generation = meta["generation"]
+        self._deleted = set(meta["deleted"])
+        self._docs_file = meta["docs_file"]
+        self._docs_bytes = meta["docs_bytes"]
+
+        # bytes past docs_bytes are records of a persist that never committed
+        with open(self._file(self._docs_file), "rb") as docs_file:
+            start = 0
+            while start < self._docs_bytes:
+                line = docs_file.readline()
+                end = start + len(line)
+                record = json.loads(line)
+                if record["label"] not in self._deleted:
+                    self._offsets[record["label"]] = (start, end)
+                    self._labels_by_id[record["id"]] = record["label"]
+                start = end
+        self._docs_fd = os.open(self._file(self._docs_file), os.O_RDONLY)
+
+        self._index = hnswlib.Index(space="cosine", dim=self.dimension)
+        self._index.load_index(self._index_path, max_elements=meta["max_elements"])
+        self._index.set_ef(self.ef_search)
+        logger.info(f"Loaded HNSW index with {self.count} live vectors from {self.path}")
+
+    def refresh_if_changed(self) -> None:
+        """Reload if another process persisted since the last look, unless this one has unpersisted changes."""
+        if file_stamp(self._meta_path) == self._meta_stamp:
+            return
+        with self._lock:
+            if self._pending_ids or self._pending_deletes:
+                # persist() merges the saved state in before writing
+                return
+            stamp = file_stamp(self._meta_path)
+            if self._read_meta().get("generation", 0) == self.generation:
+                self._meta_stamp = stamp
+                return
+            self._reset()
+            self._load()
+
+    def add(self, ids: List[str], vectors: Any, documents: List[Document]) -> None:
+        matrix = normalise_vectors(vectors)
+        if len(ids) != matrix.shape[0] or len(documents) != matrix.shape[0]:
+            raise ValueError("ids, vectors and documents must have the same length")
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match "
+                    f"namespace dimension {self.dimension}"
+                )
+            if self._index is None:
+                self._index = self._new_index(matrix.shape[0])
+
+            # re-inserting an id replaces the previous vector
+            self._mark_deleted([_id for _id in ids if _id in self._labels_by_id])
+
+            labels = list(range(self.next_label, self.next_label + matrix.shape[0]))
+            required = self.next_label + matrix.shape[0]
+            with self._graph_lock.write():
+                if required > self._index.get_max_elements():
+                    self._index.resize_index(max(required, 2 * self._index.get_max_elements()))
+                self._index.add_items(matrix, labels)
+            self.next_label = required
+
+            for label, _id, doc in zip(labels, ids, documents):
+                self._pending_records[label] = {
+                    "label": label,
+                    "id": _id,
+                    "page_content": doc.page_content,
+                    "metadata": doc.metadata,
+                }
+                self._labels_by_id[_id] = label
+                self._pending_ids[_id] = label
+                self._pending_deletes.discard(_id)
+
+            if self._compaction is not None:
+                self._added_during_compaction.extend(labels)
+            self._maybe_compact()
+
+    def _mark_deleted(self, ids: List[str]) -> int:
+        labels = [label for label in (self._labels_by_id.pop(_id, None) for _id in ids) if label is not None]
+        if not labels:
+            return 0
+        with self._graph_lock.write():
+            for label in labels:
+                self._index.mark_deleted(label)
+        for label in labels:
+            self._offsets.pop(label, None)
+            self._pending_records.pop(label, None)
+        self._deleted.update(labels)
+        if self._compaction is not None:
+            self._deleted_during_compaction.extend(labels)
+        return len(labels)
+
+    def delete(self, ids: List[str]) -> int:
+        """Tombstone `ids`; returns how many were live."""
+        with self._lock:
+            for _id in ids:
+                if self._pending_ids.pop(_id, None) is None:
+                    self._pending_deletes.add(_id)
+            if self._index is None:
+                return 0
+            deleted = self._mark_deleted(ids)
+            self._maybe_compact()
+            return deleted
+
+    def _maybe_compact(self) -> None:
+        total = len(self._deleted) + self.count
+        if self._compaction is not None or total == 0:
+            return
+        if len(self._deleted) / total < config_settings.HNSW_COMPACTION_RATIO:
+            return
+
+        self._compaction = threading.Thread(
+            target=self._compact, name=f"hnsw-compaction-{self.path}", daemon=True
+        )
+        self._compaction.start()
+
+    def _compact(self) -> None:
+        try:
+            with self._lock:
+                labels = list(self._labels_by_id.values())
+                old_index = self._index
+                vectors = np.asarray(old_index.get_items(labels), dtype=np.float32)
+                self._added_during_compaction = []
+                self._deleted_during_compaction = []
+
+            logger.info(f"Compacting HNSW index at {self.path}: {len(labels)} live vectors")
+            new_index = self._new_index(len(labels))
+            if labels:
+                new_index.add_items(vectors, labels)
+
+            with self._lock:
+                if self._index is not old_index:
+                    # persist() reloaded the namespace meanwhile; this rebuild is stale
+                    return
+                live = set(self._labels_by_id.values())
+                added = [label for label in self._added_during_compaction if label in live]
+                if added:
+                    required = new_index.get_current_count() + len(added)
+                    if required > new_index.get_max_elements():
+                        new_index.resize_index(required)
+                    new_index.add_items(
+                        np.asarray(old_index.get_items(added), dtype=np.float32), added
+                    )
+                for label in self._deleted_during_compaction:
+                    if label in labels:
+                        new_index.mark_deleted(label)
+
+                # searches already running finish on the old graph
+                self._index = new_index
+                self._deleted = set(self._deleted_during_compaction) & set(labels)
+                self._compacted = True
+                logger.info(f"Compacted HNSW index at {self.path}")
+        except Exception as e:
+            logger.exception(f"HNSW compaction failed for {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._compaction = None
+
+    def wait_for_compaction(self) -> None:
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with self._lock, self._flock(fcntl.LOCK_EX):
+            yield
+
+    def _merge_saved(self) -> None:
+        """Reload the saved namespace and replay the unpersisted inserts and deletes onto it."""
+        ids = list(self._pending_ids)
+        labels = [self._pending_ids[_id] for _id in ids]
+        vectors = np.asarray(self._index.get_items(labels), dtype=np.float32) if labels else None
+        documents = [self.document(label) for label in labels]
+        deletes = list(self._pending_deletes)
+
+        self._reset()
+        self._load(write_locked=True)
+        if self._index is not None:
+            self._mark_deleted(deletes)
+        if ids:
+            self.add(ids, vectors, documents)
+        logger.info(f"Merged {len(ids)} inserts and {len(deletes)} deletes into {self.path}")
+
+    @staticmethod
+    def _encode(record: dict) -> bytes:
+        return json.dumps(record, default=str).encode("utf-8") + b"\n"
+
+    def _append_records(self) -> None:
+        """Append the unpersisted records after the committed end of the docs file."""
+        offsets = {}
+        start = self._docs_bytes
+        payload = []
+        for label, record in self._pending_records.items():
+            line = self._encode(record)
+            offsets[label] = (start, start + len(line))
+            payload.append(line)
+            start += len(line)
+
+        with open(self._file(self._docs_file), "ab") as docs_file:
+            # trailing bytes past the committed size are left over from a crashed writer
+            docs_file.truncate(self._docs_bytes)
+            docs_file.write(b"".join(payload))
+        self._offsets.update(offsets)
+        self._docs_bytes = start
+
+    def _rewrite_records(self) -> Optional[str]:
+        """Write the live records to a new docs file; returns the file it replaces, if any."""
+        old_docs_file = self._docs_file
+        docs_file_name = f"docs.{self.generation + 1}.jsonl"
+        offsets = {}
+        start = 0
+        with open(self._file(docs_file_name), "wb") as docs_file:
+            for label in sorted(self._labels_by_id.values()):
+                record = self._pending_records.get(label)
+                line = self._encode(record) if record is not None else self._read_line(label)
+                offsets[label] = (start, start + len(line))
+                docs_file.write(line)
+                start += len(line)
+
+        if self._docs_fd is not None:
+            os.close(self._docs_fd)
+        self._docs_fd = os.open(self._file(docs_file_name), os.O_RDONLY)
+        self._docs_file = docs_file_name
+        self._docs_bytes = start
+        self._offsets = offsets
+        return old_docs_file
+
+    def persist(self) -> None:
+        with self._write_lock():
+            if self._read_meta().get("generation", 0) != self.generation:
+                self._merge_saved()
+            if self._index is None:
+                return
+
+            replaced_docs_file = None
+            if self._docs_file is None or self._compacted:
+                replaced_docs_file = self._rewrite_records()
+            elif self._pending_records:
+                self._append_records()
+
+            self._index.save_index(f"{self._index_path}.tmp")
+            with open(f"{self._meta_path}.tmp", "w") as meta_file:
+                json.dump(
+                    {
+                        "dimension": self.dimension,
+                        "next_label": self.next_label,
+                        "max_elements": self._index.get_max_elements(),
+                        "deleted": sorted(self._deleted),
+                        "docs_file": self._docs_file,
+                        "docs_bytes": self._docs_bytes,
+                        "generation": self.generation + 1,
+                    },
+                    meta_file,
+                )
+
+            os.replace(f"{self._index_path}.tmp", self._index_path)
+            os.replace(f"{self._meta_path}.tmp", self._meta_path)
+            if replaced_docs_file is not None:
+                os.remove(self._file(replaced_docs_file))
+            self._meta_stamp = file_stamp(self._meta_path)
+            self.generation += 1
+            self._compacted = False
+            self._pending_ids.clear()
+            self._pending_deletes.clear()
+            self._pending_records.clear()
+
+    def _read_line(self, label: int) -> bytes:
+        start, end = self._offsets[label]
+        return os.pread(self._docs_fd, end - start, start)
+
+    def document(self, label: int) -> Optional[Document]:
+        """The chunk stored under `label`, or None if it was deleted since the search that found it."""
+        with self._lock:
+            record = self._pending_records.get(label)
+            if record is None:
+                if label not in self._offsets:
+                    return None
+                record = json.loads(self._read_line(label))
+        return Document(
+            id=record["id"],
+            page_content=record["page_content"],
+            metadata=record["metadata"],
+        )
+
+    def vectors(self, labels: np.ndarray) -> np.ndarray:
+        with self._lock:
+            if self._index is None or not len(labels):
+                return np.empty((0, self.dimension or 0), dtype=np.float32)
+            return normalise_vectors(self._index.get_items(labels.tolist()))
+
+    def search(self, query_vectors: Any, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k-NN for every query.
+
+        Returns:
+            (labels, cosine similarities), both shaped (queries, k)
+        """
+        queries = normalise_vectors(query_vectors)
+        self.refresh_if_changed()
+        with self._lock:
+            index = self._index
+            k = min(k, self.count)
+        empty = np.empty((queries.shape[0], 0))
+        if index is None or k <= 0:
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        # ef only ever grows, so a concurrent search never runs with less than its k
+        if index.ef < max(self.ef_search, k):
+            with self._graph_lock.write():
+                index.set_ef(max(index.ef, self.ef_search, k))
+        with self._graph_lock.read():
+            while True:
+                try:
+                    labels, distances = index.knn_query(queries, k=k)
+                    break
+                except RuntimeError:
+                    # tombstones can leave fewer than k elements reachable in the graph
+                    if k <= 1:
+                        return empty.astype(np.int64), empty.astype(np.float32)
+                    k //= 2
+        return labels.astype(np.int64), 1.0 - distances
+
+
+class HnswVectorStore(LocalVectorStore):
+    """LocalVectorStore whose namespaces are HNSW graphs instead of brute-force matrices."""
+
+    namespace_class = HnswNamespaceIndex
+
+    def delete(
+            self,
+            ids: Optional[List[str]] = None,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> Optional[bool]:
+        if not ids:
+            return False
+        store = self.get_namespace(namespace)
+        deleted = store.delete(ids)
+        store.persist()
+        logger.info(f"Deleted {deleted} vectors from namespace {namespace}")
+        return deleted > 0
@@ -0,0 +1,388 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+from loguru import logger
+
+from domains.injestion.models import InjestRequestDto, JobState, JobStatusResponseDto
+from domains.models import RequestStatusEnum
+from domains.settings import config_settings
+
+# called in the serving process with (request, status dict) once a job finishes
+JobCompletionHook = Callable[[InjestRequestDto, dict], Awaitable[None]]
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion backlog is at INGESTION_MAX_BACKLOG."""
+    pass
+
+
+def run_ingestion_job(payload: str) -> dict:
+    """Process-pool entry point: parse, embed and upsert one ingestion request."""
+    from domains.injestion.routes import load_file_push_to_db
+
+    request = InjestRequestDto.model_validate_json(payload)
+    status = load_file_push_to_db(request)
+    return status.model_dump(mode="json")
+
+
+def owner_is_dead(owner: Optional[str]) -> bool:
+    """True if `owner` ("host:pid:boot") is a process on this host that no longer exists."""
+    try:
+        host, pid, _ = (owner or "").split(":")
+        if host != socket.gethostname():
+            return False
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (ValueError, PermissionError):
+        return False
+    return False
+
+
+class IngestionJobQueue:
+    """
+    Ingestion jobs persisted in SQLite and executed by a pool of worker processes.
+
+    Jobs survive restarts. Several server processes may share the database, so a
+    RUNNING job records its owner process and a heartbeat the owner refreshes; a job
+    is only re-queued once its owner is gone, i.e. its heartbeat is stale or its pid
+    no longer exists on this host. A job that has been tried `max_attempts` times
+    (e.g. a document that keeps killing the worker) is marked FAILED instead.
+    Admission control rejects new jobs once QUEUED + RUNNING reaches `max_backlog`,
+    and the pool size caps how much parsing runs beside query traffic.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            workers: Optional[int] = None,
+            max_backlog: Optional[int] = None,
+            poll_interval: float = 1.0,
+            max_attempts: Optional[int] = None,
+    ):
+        self.path = path or config_settings.INGESTION_JOB_DB_PATH
+        self.workers = int(workers or config_settings.INGESTION_WORKERS)
+        self.max_backlog = int(max_backlog or config_settings.INGESTION_MAX_BACKLOG)
+        self.poll_interval = poll_interval
+        self.max_attempts = int(max_attempts or config_settings.INGESTION_JOB_MAX_ATTEMPTS)
+        self.heartbeat_seconds = float(config_settings.INGESTION_JOB_HEARTBEAT_SECONDS)
+        self.stale_seconds = float(config_settings.INGESTION_JOB_STALE_SECONDS)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.completion_hooks: List[JobCompletionHook] = []
+        self._db: Optional[aiosqlite.Connection] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._pool_lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = await aiosqlite.connect(self.path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                request_id INTEGER PRIMARY KEY,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error_detail TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        async with self._db.execute("PRAGMA table_info(ingestion_jobs)") as cursor:
+            columns = {row["name"] for row in await cursor.fetchall()}
+        for column in ("owner TEXT", "heartbeat_at REAL"):
+            if column.split()[0] not in columns:
+                await self._db.execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column}")
+        await self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ingestion_jobs_state ON ingestion_jobs (state, created_at)"
+        )
+        await self._db.commit()
+        await self._recover_orphaned()
+
+        self._pool = self._new_pool()
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch(), name=f"ingestion-dispatcher-{i}")
+            for i in range(self.workers)
+        ]
+        self._heartbeat = asyncio.create_task(self._beat(), name="ingestion-heartbeat")
+        logger.info(f"Ingestion job queue started with {self.workers} workers at {self.path}")
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    async def stop(self) -> None:
+        tasks = [*self._dispatchers, *([self._heartbeat] if self._heartbeat else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatchers = []
+        self._heartbeat = None
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+        logger.info("Ingestion job queue stopped")
+
+    async def backlog(self) -> int:
+        async with self._db.execute(
+            "SELECT COUNT(*) FROM ingestion_jobs WHERE state IN (?, ?)",
+            (JobState.QUEUED.value, JobState.RUNNING.value),
+        ) as cursor:
+            (count,) = await cursor.fetchone()
+        return count
+
+    async def enqueue(self, request: InjestRequestDto) -> None:
+        """
+        Persist `request` as a QUEUED job.
+
+        Re-submitting a request_id that already finished runs it again; one that is
+        still queued or running is left as is.
+
+        Raises:
+            QueueFullError: If the backlog is full
+        """
+        async with self._write_lock:
+            if await self.backlog() >= self.max_backlog:
+                raise QueueFullError(
+                    f"Ingestion backlog is full ({self.max_backlog} jobs), retry later"
+                )
+
+            now = time.time()
+            await self._db.execute(
+                """
+                INSERT INTO ingestion_jobs (request_id, payload, state, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (request_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    state = excluded.state,
+                    attempts = 0,
+                    owner = NULL,
+                    result = NULL,
+                    error_detail = NULL,
+                    created_at = excluded.created_at,
+                    updated_at = excluded.updated_at
+                WHERE ingestion_jobs.state IN (?, ?)
+                """,
+                (
+                    request.request_id,
+                    request.model_dump_json(),
+                    JobState.QUEUED.value,
+                    now,
+                    now,
+                    JobState.COMPLETED.value,
+                    JobState.FAILED.value,
+                ),
+            )
+            await self._db.commit()
+        self._wakeup.set()
+        logger.info(f"Queued ingestion job {request.request_id}")
+
+    async def get(self, request_id: int) -> Optional[JobStatusResponseDto]:
+        async with self._db.execute(
+            "SELECT * FROM ingestion_jobs WHERE request_id = ?", (request_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return JobStatusResponseDto(
+            request_id=row["request_id"],
+            state=row["state"],
+            attempts=row["attempts"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error_detail=row["error_detail"],
+        )
+
+    async def _recover_orphaned(self) -> None:
+        """Re-queue RUNNING jobs whose owner is gone; fail the ones out of attempts."""
+        now = time.time()
+        async with self._write_lock:
+            async with self._db.execute(
+                "SELECT request_id, owner, heartbeat_at, attempts FROM ingestion_jobs WHERE state = ? AND (owner IS NULL OR owner != ?)",
+                (JobState.RUNNING.value, self.owner),
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+            orphaned = [
+                row for row in rows
+                if (row["heartbeat_at"] or 0) < now - self.stale_seconds or owner_is_dead(row["owner"])
+            ]
+            for row in orphaned:
+                exhausted = row["attempts"] >= self.max_attempts
+                await self._db.execute(
+                    """
+                    UPDATE ingestion_jobs SET state = ?, owner = NULL, error_detail = ?, updated_at = ?
+                    WHERE request_id = ? AND state = ? AND owner IS ?
+                    """,
+                    (
+                        (JobState.FAILED if exhausted else JobState.QUEUED).value,
+                        f"Gave up after {row['attempts']} attempts" if exhausted else None,
+                        now,
+                        row["request_id"],
+                        JobState.RUNNING.value,
+                        row["owner"],
+                    ),
+                )
+            await self._db.commit()
+        if orphaned:
+            logger.warning(f"Recovered {len(orphaned)} ingestion jobs whose worker process is gone")
+            self._wakeup.set()
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                async with self._write_lock:
+                    await self._db.execute(
+                        "UPDATE ingestion_jobs SET heartbeat_at = ? WHERE state = ? AND owner = ?",
+                        (time.time(), JobState.RUNNING.value, self.owner),
+                    )
+                    await self._db.commit()
+                await self._recover_orphaned()
+            except Exception as e:
+                logger.error(f"Ingestion job heartbeat failed: {e}")
+
+    async def _claim(self) -> Optional[Tuple[InjestRequestDto, int]]:
+        """The oldest QUEUED job, now RUNNING and owned by this process, with its attempt number."""
+        now = time.time()
+        async with self._write_lock:
+            async with self._db.execute(
+                """
+                UPDATE ingestion_jobs
+                SET state = ?, attempts = attempts + 1, owner = ?, heartbeat_at = ?, updated_at = ?
+                WHERE request_id = (
+                    SELECT request_id FROM ingestion_jobs
+                    WHERE state = ? ORDER BY created_at LIMIT 1
+                ) AND state = ?
+                RETURNING payload, attempts
+                """,
+                (JobState.RUNNING.value, self.owner, now, now, JobState.QUEUED.value, JobState.QUEUED.value),
+            ) as cursor:
+                row = await cursor.fetchone()
+            await self._db.commit()
+        return (InjestRequestDto.model_validate_json(row["payload"]), row["attempts"]) if row else None
+
+    async def _finish(self, request_id: int, state: JobState, result: dict, error_detail: str = None):
+        async with self._write_lock:
+            await self._db.execute(
+                """
+                UPDATE ingestion_jobs SET state = ?, result = ?, error_detail = ?, updated_at = ?
+                WHERE request_id = ?
+                """,
+                (state.value, json.dumps(result), error_detail, time.time(), request_id),
+            )
+            await self._db.commit()
+
+    async def _requeue(self, request_id: int, count_attempt: bool = False) -> None:
+        """Put a job back in the queue; unless `count_attempt`, it never got to run."""
+        async with self._write_lock:
+            await self._db.execute(
+                """
+                UPDATE ingestion_jobs SET state = ?, attempts = MAX(attempts - ?, 0), owner = NULL, updated_at = ?
+                WHERE request_id = ? AND state = ?
+                """,
+                (JobState.QUEUED.value, 0 if count_attempt else 1, time.time(), request_id, JobState.RUNNING.value),
+            )
+            await self._db.commit()
+        self._wakeup.set()
+        logger.warning(f"Re-queued ingestion job {request_id}")
+
+    async def _replace_pool(self, broken_pool: ProcessPoolExecutor) -> None:
+        """Swap in a fresh pool, once, however many dispatchers saw `broken_pool` break."""
+        async with self._pool_lock:
+            if self._pool is not broken_pool:
+                return
+            self._pool = self._new_pool()
+        broken_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            claimed = await self._claim()
+            if claimed is None:
+                self._wakeup.clear()
+                # asyncio.timeout rather than wait_for: on 3.11 a cancel from stop() that
+                # lands as the wait times out can be lost inside wait_for's inner task
+                try:
+                    async with asyncio.timeout(self.poll_interval):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+                continue
+
+            request, attempt = claimed
+            logger.info(f"Running ingestion job {request.request_id} (attempt {attempt})")
+            pool = self._pool
+            try:
+                result = await loop.run_in_executor(
+                    pool, run_ingestion_job, request.model_dump_json()
+                )
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    # stop(): the job stays RUNNING and is recovered on the next start
+                    raise
+                # cancelled by the shutdown of a replaced pool before it ran
+                await self._requeue(request.request_id)
+                continue
+            except BrokenProcessPool as e:
+                # a worker died (e.g. OOM on a huge file); the pool is unusable afterwards
+                logger.error(f"Ingestion worker died while running job {request.request_id}: {e}")
+                await self._replace_pool(pool)
+                if attempt < self.max_attempts:
+                    # the job may only have shared the pool with the one that killed it
+                    await self._requeue(request.request_id, count_attempt=True)
+                    continue
+                result = {
+                    "status": RequestStatusEnum.FAILED.value,
+                    "error_detail": f"Ingestion worker died on each of {attempt} attempts: {e}",
+                }
+            except Exception as e:
+                if pool is not self._pool:
+                    # submitted to a pool that another dispatcher had just shut down
+                    await self._requeue(request.request_id)
+                    continue
+                logger.exception(f"Ingestion job {request.request_id} crashed")
+                result = {"status": RequestStatusEnum.FAILED.value, "error_detail": str(e)}
+
+            if result.get("status") == RequestStatusEnum.COMPLETED.value:
+                await self._finish(request.request_id, JobState.COMPLETED, result)
+            else:
+                await self._finish(
+                    request.request_id, JobState.FAILED, result, result.get("error_detail")
+                )
+
+            for hook in self.completion_hooks:
+                try:
+                    await hook(request, result)
+                except Exception as e:
+                    logger.error(f"Ingestion completion hook failed for {request.request_id}: {e}")
+
+
+job_queue = IngestionJobQueue()
@@ -0,0 +1,475 @@
+import fcntl
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from loguru import logger
+
+from domains.injestion.utils import get_embeddings
+from domains.settings import config_settings
+
+VECTORS_FILE_NAME = "vectors.f32"
+DOCS_FILE_NAME = "docs.jsonl"
+META_FILE_NAME = "meta.json"
+DOC_OFFSETS_FILE_NAME = "doc_offsets.u64"
+LOCK_FILE_NAME = ".lock"
+
+LOCAL_VECTOR_DATABASES = ("numpy", "hnsw")
+
+
+def normalise_vectors(vectors: Any) -> np.ndarray:
+    """Return a float32 copy of `vectors` with every row scaled to unit length."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """(inode, mtime) of `path`; meta.json is replaced on every commit, so this changes with it."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def top_k_scores(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the `k` best columns of every row of a (queries x rows) score matrix.
+
+    Uses `argpartition` so only the selected columns get sorted.
+
+    Returns:
+        (indices, scores), both shaped (queries, k) and ordered best first
+    """
+    total = scores.shape[1]
+    k = min(k, total)
+    if k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    if k < total:
+        indices = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        indices = np.broadcast_to(np.arange(total), scores.shape).copy()
+
+    selected = np.take_along_axis(scores, indices, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return (
+        np.take_along_axis(indices, order, axis=1),
+        np.take_along_axis(selected, order, axis=1),
+    )
+
+
+class NamespaceMatrix:
+    """
+    Append-only, memory-mapped store of unit-length float32 embeddings for one namespace.
+
+    On disk a namespace is a directory holding:
+        - vectors.f32: row-major float32 matrix, one row per chunk
+        - docs.jsonl: one {"id", "page_content", "metadata"} record per row
+        - doc_offsets.u64: byte offset of every row's record in docs.jsonl
+        - meta.json: dimension, row count, committed byte size of docs.jsonl and a
+          generation counter, replaced atomically after every append
+
+    Several processes may append to the same namespace: appends hold an exclusive
+    flock on .lock and re-read meta.json under it, so every writer extends the
+    committed files rather than its own view of them. A crash mid-write leaves
+    trailing bytes that are truncated away on the next append. Records are read
+    from docs.jsonl by offset when a hit needs them, so opening a namespace costs
+    the same whatever its size.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dimension: Optional[int] = None
+        self.count = 0
+        self.generation = 0
+        self._docs_bytes = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._doc_offsets: Optional[np.ndarray] = None
+        self._docs_fd: Optional[int] = None
+        self._meta_stamp: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+        self._refresh()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    @property
+    def _vectors_path(self) -> str:
+        return self._file(VECTORS_FILE_NAME)
+
+    @property
+    def _docs_path(self) -> str:
+        return self._file(DOCS_FILE_NAME)
+
+    @property
+    def _meta_path(self) -> str:
+        return self._file(META_FILE_NAME)
+
+    def _read_meta(self) -> dict:
+        try:
+            with open(self._meta_path) as meta_file:
+                return json.load(meta_file)
+        except FileNotFoundError:
+            return {}
+
+    def _refresh(self) -> None:
+        """Map whatever has been committed to disk, by this process or any other."""
+        with self._lock:
+            self._meta_stamp = file_stamp(self._meta_path)
+            meta = self._read_meta()
+            if not meta or (meta.get("generation", 0) == self.generation and meta["count"] == self.count):
+                return
+
+            self.dimension = meta["dimension"]
+            self.count = meta["count"]
+            self._docs_bytes = meta["docs_bytes"]
+            self.generation = meta.get("generation", 0)
+            self._remap()
+            logger.info(f"Loaded {self.count} vectors from {self.path}")
+
+    def refresh_if_changed(self) -> None:
+        """Cheap check before a read: remap only if meta.json was replaced since the last look."""
+        if file_stamp(self._meta_path) != self._meta_stamp:
+            self._refresh()
+
+    def _remap(self) -> None:
+        if self.count == 0:
+            self._matrix = self._doc_offsets = None
+            return
+        self._matrix = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.count, self.dimension),
+        )
+        self._doc_offsets = np.memmap(
+            self._file(DOC_OFFSETS_FILE_NAME), dtype=np.uint64, mode="r", shape=(self.count,)
+        )
+
+    def _write_meta(self) -> None:
+        self.generation += 1
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as meta_file:
+            json.dump(
+                {
+                    "dimension": self.dimension,
+                    "count": self.count,
+                    "docs_bytes": self._docs_bytes,
+                    "generation": self.generation,
+                },
+                meta_file,
+            )
+        os.replace(tmp_path, self._meta_path)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock, open(self._file(LOCK_FILE_NAME), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add(self, ids: List[str], vectors: Any, documents: List[Document]) -> None:
+        matrix = normalise_vectors(vectors)
+        if len(ids) != matrix.shape[0] or len(documents) != matrix.shape[0]:
+            raise ValueError("ids, vectors and documents must have the same length")
+
+        records = [
+            json.dumps(
+                {"id": _id, "page_content": doc.page_content, "metadata": doc.metadata}, default=str
+            ).encode("utf-8") + b"\n"
+            for _id, doc in zip(ids, documents)
+        ]
+        payload = b"".join(records)
+
+        with self._write_lock():
+            if self.dimension is None:
+                self.dimension = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Embedding dimension {matrix.shape[1]} does not match "
+                    f"namespace dimension {self.dimension}"
+                )
+
+            offsets = self._docs_bytes + np.cumsum([0] + [len(record) for record in records[:-1]])
+            # trailing bytes past the committed sizes are left over from a crashed writer
+            for name, committed, data in (
+                    (VECTORS_FILE_NAME, self.count * self.dimension * np.dtype(np.float32).itemsize, matrix.tobytes()),
+                    (DOCS_FILE_NAME, self._docs_bytes, payload),
+                    (DOC_OFFSETS_FILE_NAME, self.count * 8, offsets.astype(np.uint64).tobytes()),
+            ):
+                with open(self._file(name), "ab") as append_file:
+                    append_file.truncate(committed)
+                    append_file.write(data)
+
+            self.count += matrix.shape[0]
+            self._docs_bytes += len(payload)
+            self._write_meta()
+            self._remap()
+
+    def persist(self) -> None:
+        # every append is already committed to disk
+        pass
+
+    def document(self, row: int) -> Document:
+        with self._lock:
+            if self._docs_fd is None:
+                self._docs_fd = os.open(self._docs_path, os.O_RDONLY)
+            docs_fd, offsets, docs_bytes = self._docs_fd, self._doc_offsets, self._docs_bytes
+        start = int(offsets[row])
+        end = int(offsets[row + 1]) if row + 1 < len(offsets) else docs_bytes
+        record = json.loads(os.pread(docs_fd, end - start, start))
+        return Document(
+            id=record["id"],
+            page_content=record["page_content"],
+            metadata=record["metadata"],
+        )
+
+    def vectors(self, rows: np.ndarray) -> np.ndarray:
+        self.refresh_if_changed()
+        with self._lock:
+            matrix = self._matrix
+        if matrix is None:
+            return np.empty((0, self.dimension or 0), dtype=np.float32)
+        return np.asarray(matrix[rows])
+
+    def search(self, query_vectors: Any, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every query against every row with one matrix product.
+
+        Returns:
+            (row indices, cosine similarities), both shaped (queries, k)
+        """
+        queries = normalise_vectors(query_vectors)
+        self.refresh_if_changed()
+        with self._lock:
+            matrix = self._matrix
+        if matrix is None:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        return top_k_scores(queries @ matrix.T, k)
+
+
+def _hits(store, rows: np.ndarray, scores: np.ndarray) -> List[Tuple[Document, float]]:
+    """(Document, score) pairs for search results, skipping rows deleted since the search."""
+    hits = []
+    for row, score in zip(rows, scores):
+        document = store.document(int(row))
+        if document is not None:
+            hits.append((document, float(score)))
+    return hits
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store keeping one memory-mapped embedding matrix per namespace.
+
+    Mirrors the Pinecone store's calling convention: the namespace is passed to each
+    search or insert call rather than fixed on the instance.
+
+    Instances are cached per process (see load_local_vector_store), and ingestion
+    workers append from other processes; every namespace re-checks meta.json before a
+    search, so new chunks are visible without a restart.
+    """
+
+    namespace_class = NamespaceMatrix
+
+    def __init__(
+            self,
+            embedding: Embeddings,
+            index_name: str,
+            persist_directory: Optional[str] = None,
+    ):
+        self._embedding = embedding
+        self.index_name = index_name
+        self.persist_directory = os.path.join(
+            persist_directory or config_settings.LOCAL_VECTOR_STORE_PATH, index_name
+        )
+        self._namespaces: dict[str, NamespaceMatrix] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def get_namespace(self, namespace: Optional[str] = None) -> NamespaceMatrix:
+        namespace = namespace or config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
+        with self._lock:
+            if namespace not in self._namespaces:
+                self._namespaces[namespace] = self.namespace_class(
+                    os.path.join(self.persist_directory, namespace)
+                )
+            return self._namespaces[namespace]
+
+    def persist(self, namespace: Optional[str] = None) -> None:
+        self.get_namespace(namespace).persist()
+
+    def add_embeddings(
+            self,
+            texts: List[str],
+            embeddings: Any,
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            namespace: Optional[str] = None,
+    ) -> List[str]:
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        documents = [
+            Document(page_content=text, metadata=metadata)
+            for text, metadata in zip(texts, metadatas)
+        ]
+        self.get_namespace(namespace).add(ids, embeddings, documents)
+        return ids
+
+    def add_texts(
+            self,
+            texts: Iterable[str],
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(
+            texts,
+            self._embedding.embed_documents(texts),
+            metadatas=metadatas,
+            ids=ids,
+            namespace=namespace,
+        )
+
+    def similarity_search_by_vectors_with_score(
+            self,
+            embeddings: Any,
+            k: int = 4,
+            namespace: Optional[str] = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Batched search: one result list per query embedding."""
+        store = self.get_namespace(namespace)
+        indices, scores = store.search(embeddings, k)
+        return [_hits(store, rows, row_scores) for rows, row_scores in zip(indices, scores)]
+
+    def similarity_search_by_vector_with_vectors(
+            self,
+            embedding: List[float],
+            k: int = 4,
+            namespace: Optional[str] = None,
+    ) -> Tuple[List[Tuple[Document, float]], np.ndarray]:
+        """Like similarity_search_by_vector_with_score, plus the stored unit vectors of the hits."""
+        store = self.get_namespace(namespace)
+        indices, scores = store.search([embedding], k)
+        hits = [(int(row), store.document(int(row)), float(score)) for row, score in zip(indices[0], scores[0])]
+        hits = [hit for hit in hits if hit[1] is not None]
+        return (
+            [(document, score) for _, document, score in hits],
+            store.vectors(np.array([row for row, _, _ in hits], dtype=np.int64)),
+        )
+
+    def similarity_search_by_vector_with_score(
+            self,
+            embedding: List[float],
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vectors_with_score([embedding], k, namespace)[0]
+
+    def similarity_search_with_score(
+            self,
+            query: str,
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k=k, namespace=namespace
+        )
+
+    async def asimilarity_search_with_score(
+            self,
+            query: str,
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        embedding = await self._embedding.aembed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, namespace=namespace)
+
+    def similarity_search_by_vector(
+            self,
+            embedding: List[float],
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, namespace)
+        ]
+
+    def similarity_search(
+            self,
+            query: str,
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, namespace)]
+
+    async def asimilarity_search(
+            self,
+            query: str,
+            k: int = 4,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k, namespace)]
+
+    def _select_relevance_score_fn(self):
+        # cosine similarity in [-1, 1] mapped to [0, 1], same as the Pinecone store
+        return lambda score: min(1.0, max(0.0, (score + 1) / 2))
+
+    @classmethod
+    def from_texts(
+            cls,
+            texts: List[str],
+            embedding: Embeddings,
+            metadatas: Optional[List[dict]] = None,
+            ids: Optional[List[str]] = None,
+            index_name: str = config_settings.PINECONE_INDEX_NAME,
+            namespace: Optional[str] = None,
+            **kwargs: Any,
+    ) -> "LocalVectorStore":
+        store = cls(embedding=embedding, index_name=index_name, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids, namespace=namespace)
+        return store
+
+
+@lru_cache(maxsize=32)
+def load_local_vector_store(index_name: str) -> LocalVectorStore:
+    if config_settings.VECTOR_DATABASE_TO_USE == "hnsw":
+        from domains.injestion.hnsw_vector_store import HnswVectorStore
+
+        store_class = HnswVectorStore
+    else:
+        store_class = LocalVectorStore
+
+    return store_class(
+        embedding=get_embeddings(model_key="EMBEDDING_MODEL"),
+        index_name=index_name,
+    )
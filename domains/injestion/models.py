@@ -29,3 +29,20 @@ class InjestRequestDto(StatusRequestDto):
     params: Dict[str, Any]
     metadata: List[Dict[str, str]] = [{}]
     namespace: Optional[str] = config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
+
+
+class JobState(str, Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+class JobStatusResponseDto(BaseModel):
+    request_id: int
+    state: JobState
+    attempts: int = 0
+    created_at: float
+    updated_at: float
+    result: Optional[Dict[str, Any]] = None
+    error_detail: Optional[str] = None
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterable, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from domains.settings import config_settings
+from domains.tokenizer import count_tokens
+
+# upsert(ids, texts, vectors, metadatas) -> None, run in a worker thread
+UpsertFn = Callable[[List[str], List[str], List[List[float]], List[dict]], None]
+
+
+@dataclass
+class ChunkBatch:
+    ids: List[str] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    metadatas: List[dict] = field(default_factory=list)
+    tokens: int = 0
+
+
+@dataclass
+class IngestionStats:
+    chunks: int = 0
+    tokens: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        seconds = self.seconds or 1e-9
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "chunks_per_second": round(self.chunks / seconds, 2),
+            "tokens_per_second": round(self.tokens / seconds, 2),
+        }
+
+
+class _ProducerFailed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_PRODUCER_DONE = object()
+
+
+async def iterate_in_thread(iterable: Iterable, maxsize: int) -> AsyncIterator:
+    """
+    Drive a blocking iterator (file parsing, splitting) in a worker thread.
+
+    Items pass through a queue of `maxsize`, so the producer blocks instead of
+    running ahead of the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                put(item)
+            put(_PRODUCER_DONE)
+        except BaseException as e:
+            put(_ProducerFailed(e))
+
+    producer = asyncio.create_task(asyncio.to_thread(produce))
+    try:
+        while (item := await queue.get()) is not _PRODUCER_DONE:
+            if isinstance(item, _ProducerFailed):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        # unblock a producer waiting on a full queue so the thread can exit
+        while not producer.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+
+
+async def batch_by_tokens(
+        documents: AsyncIterator[Document],
+        max_tokens: int,
+        max_items: int,
+) -> AsyncIterator[ChunkBatch]:
+    """
+    Group chunks into batches of at most `max_tokens` tokens and `max_items` chunks.
+
+    Each chunk gets a fresh id, also stored as `chunk_id` metadata so it round-trips
+    through stores that do not return ids.
+    """
+    batch = ChunkBatch()
+    async for document in documents:
+        tokens = count_tokens(document.page_content)
+        if batch.texts and (batch.tokens + tokens > max_tokens or len(batch.texts) >= max_items):
+            yield batch
+            batch = ChunkBatch()
+
+        chunk_id = uuid.uuid4().hex
+        batch.ids.append(chunk_id)
+        batch.texts.append(document.page_content)
+        batch.metadatas.append(document.metadata | {"chunk_id": chunk_id})
+        batch.tokens += tokens
+
+    if batch.texts:
+        yield batch
+
+
+async def embed_and_upsert(
+        documents: Iterable[Document],
+        embeddings: Embeddings,
+        upsert: UpsertFn,
+        max_batch_tokens: Optional[int] = None,
+        max_batch_items: Optional[int] = None,
+        concurrency: Optional[int] = None,
+) -> IngestionStats:
+    """
+    Embed `documents` in token-sized batches and upsert them.
+
+    Stages are page/split -> embed -> upsert. `documents` may be a lazy generator;
+    it is consumed in a worker thread through a bounded queue. Up to `concurrency`
+    embedding requests run at once under a semaphore. Finished batches go through a
+    bounded queue to a single upsert worker, so upserting one batch overlaps with
+    embedding the next ones. Memory stays bounded by the queue sizes, not the file size.
+    """
+    max_batch_tokens = int(max_batch_tokens or config_settings.EMBEDDING_BATCH_MAX_TOKENS)
+    max_batch_items = int(max_batch_items or config_settings.EMBEDDING_BATCH_MAX_ITEMS)
+    concurrency = int(concurrency or config_settings.EMBEDDING_CONCURRENCY)
+
+    stats = IngestionStats()
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    upsert_queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def embed(batch: ChunkBatch) -> None:
+        async with semaphore:
+            vectors = await embeddings.aembed_documents(batch.texts)
+        await upsert_queue.put((batch, vectors))
+
+    async def upsert_worker() -> None:
+        while (item := await upsert_queue.get()) is not None:
+            batch, vectors = item
+            await asyncio.to_thread(upsert, batch.ids, batch.texts, vectors, batch.metadatas)
+            stats.chunks += len(batch.ids)
+            stats.tokens += batch.tokens
+            stats.batches += 1
+            logger.debug(f"Upserted batch of {len(batch.ids)} chunks ({batch.tokens} tokens)")
+
+    upsert_task = asyncio.create_task(upsert_worker())
+
+    async def drain(tasks: set[asyncio.Task]) -> set[asyncio.Task]:
+        # wake on the first finished embedding, or on the upsert worker failing
+        done, _ = await asyncio.wait({*tasks, upsert_task}, return_when=asyncio.FIRST_COMPLETED)
+        if upsert_task in done:
+            upsert_task.result()
+            raise RuntimeError("Upsert worker stopped before all batches were written")
+        for task in done:
+            task.result()
+        return tasks - done
+
+    chunks = iterate_in_thread(documents, int(config_settings.INGESTION_QUEUE_SIZE))
+    batches = batch_by_tokens(chunks, max_batch_tokens, max_batch_items)
+    pending: set[asyncio.Task] = set()
+    try:
+        async for batch in batches:
+            while len(pending) >= concurrency * 2:
+                pending = await drain(pending)
+            pending.add(asyncio.create_task(embed(batch)))
+
+        while pending:
+            pending = await drain(pending)
+
+        await upsert_queue.put(None)
+        await upsert_task
+    finally:
+        for task in [*pending, upsert_task]:
+            task.cancel()
+        await batches.aclose()
+        await chunks.aclose()
+
+    stats.seconds = time.perf_counter() - started
+    logger.info(f"Ingestion pipeline finished: {stats.as_dict()}")
+    return stats
@@ -1,14 +1,18 @@
-from domains.injestion.doc_loader import file_loader
-from domains.injestion.models import InjestRequestDto, FileInjestionResponseDto
+from domains.injestion.doc_loader import file_loader, file_loader_stream
+from domains.injestion.job_queue import QueueFullError, job_queue
+from domains.injestion.models import (
+    InjestRequestDto,
+    FileInjestionResponseDto,
+    JobStatusResponseDto,
+)
 from domains.models import RequestStatus, ApiNameEnum, RequestStatusEnum
-from domains.injestion.utils import update_status
-from domains.injestion.vector_db_utils import push_to_database
+from domains.injestion.embedding_cache import get_embedding_cache_stats
 from domains.settings import config_settings
-from domains.status_util import call_update_status_api
+from domains.status_util import status_client
 
 from loguru import logger
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header
 
 router = APIRouter(tags=["injestion"])
 
@@ -18,9 +22,8 @@ router = APIRouter(tags=["injestion"])
     summary="Injests a document into the database",
     description="Injests a document into the database",
 )
-def injest_doc(
+async def injest_doc(
     request: InjestRequestDto,
-    background_tasks: BackgroundTasks,
     # token: str = Header(alias="Authorization"),
 ) -> FileInjestionResponseDto:
     logger.info(f"injest-doc request: {request.model_dump_json()}")
@@ -34,12 +37,13 @@ def injest_doc(
             total_pages=1
         )
 
-        background_tasks.add_task(
-            load_file_push_to_db,
-            request,
-        )
+        await job_queue.enqueue(request)
         return response
 
+    except QueueFullError as e:
+        logger.warning(f"Rejecting injest-doc request {request.request_id}: {e}")
+        raise HTTPException(status_code=429, detail=str(e))
+
     except Exception as e:
         logger.exception("Failed during fetching metadata")
         status = RequestStatus(
@@ -49,7 +53,7 @@ def injest_doc(
             error_detail=str(e),
         )
 
-        update_status(request.response_data_api_path, status)
+        await status_client.submit(request.response_data_api_path, status)
 
         response = FileInjestionResponseDto(
             file_name=request.file_name,
@@ -57,22 +61,58 @@ def injest_doc(
             total_pages=0,
         )
 
-    background_tasks.add_task(
-        load_file_push_to_db, request
-    )
-    update_status(request.response_data_api_path, status)
-
     logger.info(f"injest-doc response: {response.model_dump_json()}")
     return response
 
 
+@router.get(
+    "/jobs/{request_id}",
+    summary="Status of an ingestion job",
+    description="State, attempts and result of the ingestion job queued for request_id",
+)
+async def get_job_status(request_id: int) -> JobStatusResponseDto:
+    job = await job_queue.get(request_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No ingestion job for request_id {request_id}")
+    return job
+
+
+async def post_job_status(request: InjestRequestDto, result: dict) -> None:
+    """Job-queue completion hook: report the finished job from the serving process."""
+    await status_client.submit(
+        request.response_data_api_path,
+        RequestStatus(
+            request_id=request.request_id,
+            api_name=ApiNameEnum.INJEST_DOC,
+            status=result["status"],
+            data_json=result.get("data_json"),
+            error_detail=result.get("error_detail"),
+        ),
+    )
+
+
+job_queue.completion_hooks.append(post_job_status)
+
+
+@router.get(
+    "/embedding-cache/stats",
+    summary="Embedding cache hit/miss counters",
+    description="Hit/miss counters and estimated embedding time saved, per embedding model, summed over all processes",
+)
+def embedding_cache_stats() -> list[dict]:
+    return get_embedding_cache_stats(config_settings.EMBEDDING_CACHE_PATH)
+
+
 def load_file_push_to_db(
         request: InjestRequestDto
-):
+) -> RequestStatus:
+    # runs in the ingestion worker processes; the API process never imports pinecone
+    from domains.injestion.vector_db_utils import push_to_database
+
     try:
         logger.debug(f"load_file_push_to_db(): Attempting to load file from {request.pre_signed_url}")
 
-        chunked_documents, non_chunked_docs = file_loader(
+        loader_kwargs = dict(
             pre_signed_url=request.pre_signed_url,
             file_name=request.file_name,
             original_file_name=request.file_name,
@@ -81,20 +121,30 @@ def load_file_push_to_db(
             params={"summary": False},
             metadata=[]
         )
-        logger.info(f"Successfully loaded file from {request.pre_signed_url} and total pages in file is {len(non_chunked_docs)}")
 
-        push_to_database(
+        if config_settings.STREAMING_INGESTION:
+            chunked_documents = file_loader_stream(**loader_kwargs)
+        else:
+            chunked_documents, non_chunked_docs = file_loader(**loader_kwargs)
+            logger.info(f"Successfully loaded file from {request.pre_signed_url} and total pages in file is {len(non_chunked_docs)}")
+
+        ingestion_stats = push_to_database(
             texts=chunked_documents,
             index_name=config_settings.PINECONE_INDEX_NAME,
             namespace=request.namespace
         )
 
+        if config_settings.STREAMING_INGESTION:
+            total_pages = chunked_documents.pages
+        else:
+            total_pages = len(non_chunked_docs)
+
         # Create success status
         status = RequestStatus(
             request_id=request.request_id,
             api_name=ApiNameEnum.INJEST_DOC,
             status=RequestStatusEnum.COMPLETED,
-            data_json={"total_pages": len(non_chunked_docs)},
+            data_json={"total_pages": total_pages, **ingestion_stats},
         )
         logger.info("Processing completed successfully")
 
@@ -108,12 +158,9 @@ def load_file_push_to_db(
             error_detail=error_detail,
         )
 
-    finally:
-        if status:
-            logger.info(
-                f"Completed injest-doc for file_name: {request.file_name}"
-                f" with status: {status.status}"
-            )
-            call_update_status_api(request.response_data_api_path, status)
-        else:
-            logger.error("Status object was not created - this is unexpected")
+    # the status callback is posted by the serving process once the job is recorded
+    logger.info(
+        f"Completed injest-doc for file_name: {request.file_name}"
+        f" with status: {status.status}"
+    )
+    return status
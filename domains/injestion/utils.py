@@ -1,15 +1,29 @@
-from langchain_openai import OpenAIEmbeddings
+from functools import lru_cache
+
 from domains.settings import config_settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from domains.models import RequestStatus
-from domains.status_util import call_update_status_api
+from domains.injestion.embedding_cache import wrap_with_cache
+from domains.injestion.text_splitter import get_token_splitter
 
-def split_text(text: list[Document], CHUNK_SIZE: int, CHUNK_OVERLAP: int) -> list[Document]:
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP
+
+@lru_cache(maxsize=8)
+def get_recursive_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
     )
+
+
+def split_text(text: list[Document], CHUNK_SIZE: int, CHUNK_OVERLAP: int) -> list[Document]:
+    if config_settings.CHUNK_SPLITTER == "token":
+        text_splitter = get_token_splitter(
+            int(config_settings.CHUNK_SIZE_TOKENS),
+            int(config_settings.CHUNK_OVERLAP_TOKENS),
+            config_settings.LLMS.get("OPENAI_EMBEDDING_MODEL_NAME"),
+        )
+    else:
+        text_splitter = get_recursive_splitter(int(CHUNK_SIZE), int(CHUNK_OVERLAP))
     return text_splitter.split_documents(text)
 
 
@@ -17,20 +31,30 @@ def get_embeddings(
         model_key: str
 ):
     if model_key == "EMBEDDING_MODEL":
-        return OpenAIEmbeddings(
-            model=config_settings.LLMS.get("OPENAI_EMBEDDING_MODEL_NAME"),
-            api_key=config_settings.OPENAI_API_KEY,
-        )
+        model_name = config_settings.LLMS.get("OPENAI_EMBEDDING_MODEL_NAME")
 
     elif model_key == "AZURE_EMBEDDING_MODEL":
+        model_name = config_settings.LLMS.get("SUMMARIZE_LLM_MODEL")
+
+    else:
+        return None
+
+    def make_embeddings():
+        from langchain_openai import OpenAIEmbeddings
+
         return OpenAIEmbeddings(
-            model=config_settings.LLMS.get("SUMMARIZE_LLM_MODEL"),
+            model=model_name,
             api_key=config_settings.OPENAI_API_KEY,
         )
 
+    if not config_settings.EMBEDDING_CACHE_ENABLED:
+        return make_embeddings()
 
-def update_status(api_path: str, request_status: RequestStatus, token: str=None) -> None:
-    if api_path:
-        call_update_status_api(api_path, request_status)
-
-
+    return wrap_with_cache(
+        make_embeddings,
+        model_name=model_name,
+        path=config_settings.EMBEDDING_CACHE_PATH,
+        query_cache_size=int(config_settings.EMBEDDING_QUERY_CACHE_SIZE),
+        stats_flush_every=int(config_settings.EMBEDDING_CACHE_STATS_FLUSH_EVERY),
+        stats_flush_seconds=float(config_settings.EMBEDDING_CACHE_STATS_FLUSH_SECONDS),
+    )
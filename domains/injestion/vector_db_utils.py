@@ -1,10 +1,16 @@
+import asyncio
 import functools
 
 from pinecone import Pinecone, ServerlessSpec
 from domains.injestion.utils import get_embeddings
+from domains.injestion.bm25_index import BM25Index, bm25_index_path
+from domains.injestion.pipeline import UpsertFn, embed_and_upsert
+from domains.injestion.local_vector_store import (
+    LOCAL_VECTOR_DATABASES,
+    load_local_vector_store,
+)
 from domains.settings import config_settings
 from loguru import logger
-from langchain_community.vectorstores import Pinecone as PineconeVectorStore
 from pinecone.exceptions import PineconeApiException
 
 
@@ -89,27 +95,73 @@ def validate_and_create_index(
         return False
 
 
-def push_to_database(texts, index_name, namespace):
-    try:
-        meta_datas = [text.metadata for text in texts]
+def get_upsert_fn(index_name: str, namespace: str) -> UpsertFn:
+    """Build the per-batch upsert callable for the configured vector database."""
+    if config_settings.VECTOR_DATABASE_TO_USE in LOCAL_VECTOR_DATABASES:
+        store = load_local_vector_store(index_name)
+
+        def upsert_local(ids, texts, vectors, metadatas):
+            store.add_embeddings(texts, vectors, metadatas=metadatas, ids=ids, namespace=namespace)
 
-        if namespace is None:
-            namespace = config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
+        return upsert_local
 
+    index = initialize_pinecone().Index(index_name)
+    batch_size = int(config_settings.PINECONE_UPSERT_BATCH_SIZE)
+
+    def upsert_pinecone(ids, texts, vectors, metadatas):
+        records = [
+            {"id": _id, "values": vector, "metadata": metadata | {"text": text}}
+            for _id, text, vector, metadata in zip(ids, texts, vectors, metadatas)
+        ]
         try:
-            PineconeVectorStore.from_texts(
-                [t.page_content for t in texts],
-                get_embeddings(model_key="EMBEDDING_MODEL"),
-                meta_datas,
-                index_name=index_name,
-                namespace=namespace,
-            )
+            for start in range(0, len(records), batch_size):
+                index.upsert(vectors=records[start:start + batch_size], namespace=namespace)
         except Exception as e:
             logger.error(f"Failed to push data to Pinecone: {str(e)}")
             raise Exception(f"Pinecone ingestion failed: {str(e)}")
 
+    return upsert_pinecone
+
+
+async def apush_to_database(texts, index_name, namespace) -> dict:
+    if namespace is None:
+        namespace = config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
+
+    upsert = get_upsert_fn(index_name, namespace)
+    if config_settings.HYBRID_RETRIEVAL:
+        # this job's own writer: if the job fails, its buffered chunks go with it
+        keyword_index = BM25Index(bm25_index_path(index_name, namespace))
+        vector_upsert = upsert
+
+        def upsert(ids, texts, vectors, metadatas):
+            vector_upsert(ids, texts, vectors, metadatas)
+            keyword_index.add(ids, texts, metadatas)
+
+    stats = await embed_and_upsert(
+        texts,
+        embeddings=get_embeddings(model_key="EMBEDDING_MODEL"),
+        upsert=upsert,
+    )
+
+    if config_settings.HYBRID_RETRIEVAL:
+        await asyncio.to_thread(keyword_index.commit)
+
+    if config_settings.VECTOR_DATABASE_TO_USE in LOCAL_VECTOR_DATABASES:
+        await asyncio.to_thread(load_local_vector_store(index_name).persist, namespace)
+
+    return stats.as_dict()
+
+
+def push_to_database(texts, index_name, namespace) -> dict:
+    """
+    Embed and upsert `texts` into `namespace`; returns throughput stats.
+
+    Runs its own event loop, so call it from a worker thread or process, not from a coroutine.
+    """
+    try:
+        stats = asyncio.run(apush_to_database(texts, index_name, namespace))
         logger.info("Vectors have been pushed to database successfully")
-        return True
+        return stats
 
     except Exception as e:
         logger.exception(f"Failed to push vectors to database: {str(e)}")
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from loguru import logger
+
+from domains.settings import config_settings
+
+
+# monotonic time of the last model request over the shared clients, for keep_warm
+_last_used = 0.0
+
+
+def _is_keep_warm_ping(request: httpx.Request) -> bool:
+    return request.url.path.endswith("/models")
+
+
+def _mark_used(request: httpx.Request) -> None:
+    global _last_used
+    if not _is_keep_warm_ping(request):
+        _last_used = time.monotonic()
+
+
+async def _amark_used(request: httpx.Request) -> None:
+    _mark_used(request)
+
+
+@lru_cache(maxsize=1)
+def get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """One pooled sync/async HTTP client pair shared by every chat model in the process."""
+    limits = httpx.Limits(
+        max_connections=int(config_settings.LLM_HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=int(config_settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS),
+        keepalive_expiry=float(config_settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS),
+    )
+    timeout = httpx.Timeout(float(config_settings.LLM_HTTP_TIMEOUT_SECONDS), connect=10.0)
+    return (
+        httpx.Client(limits=limits, timeout=timeout, event_hooks={"request": [_mark_used]}),
+        httpx.AsyncClient(limits=limits, timeout=timeout, event_hooks={"request": [_amark_used]}),
+    )
+
+
+@lru_cache(maxsize=64)
+def get_llm(
+        service: str,
+        model: str,
+        temperature: float = 0.0,
+        streaming: bool = False,
+        azure_settings_key: Optional[str] = None,
+) -> BaseChatModel:
+    """
+    Process-wide chat client for (service, model, temperature, streaming).
+
+    Clients are stateless apart from their HTTP pool, so they are safe to share across
+    requests; pass per-request callbacks at invocation time through `config`.
+    """
+    from langchain_openai import AzureChatOpenAI, ChatOpenAI
+
+    http_client, http_async_client = get_http_clients()
+    logger.info(f"Creating {service} chat client for {model} (temperature={temperature}, streaming={streaming})")
+
+    if service == "azure-openai":
+        azure_settings = config_settings.AZURE_OPENAI_SETTINGS[azure_settings_key]
+        return AzureChatOpenAI(
+            azure_endpoint=azure_settings["ENDPOINT"],
+            azure_deployment=azure_settings["DEPLOYMENT"],
+            api_key=azure_settings["API_KEY"],
+            api_version=azure_settings["API_VERSION"],
+            temperature=temperature,
+            model=model,
+            streaming=streaming,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        api_key=config_settings.OPENAI_API_KEY,
+        streaming=streaming,
+        stream_usage=streaming,
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
+
+
+def _openai_api_base_url() -> str:
+    return config_settings.OPENAI_CHAT_BASE_URL.removesuffix("/chat/completions")
+
+
+async def keep_warm(interval: Optional[float] = None) -> None:
+    """
+    Touch the OpenAI API every `interval` seconds over the shared async client.
+
+    A cheap authenticated GET /models keeps a pooled TLS connection alive, so the first
+    chat request after a short pause does not pay the connection handshake. It only
+    pings while the clients were used within the last interval; an idle process lets
+    its connections expire. Disabled when the interval is 0 or no API key is set.
+    """
+    interval = float(interval or config_settings.LLM_KEEP_WARM_INTERVAL_SECONDS)
+    if interval <= 0 or not config_settings.OPENAI_API_KEY:
+        logger.info("LLM keep-warm ping disabled")
+        return
+
+    _, http_async_client = get_http_clients()
+    url = f"{_openai_api_base_url()}/models"
+    headers = {"Authorization": f"Bearer {config_settings.OPENAI_API_KEY}"}
+
+    while True:
+        await asyncio.sleep(interval)
+        if time.monotonic() - _last_used > interval:
+            continue
+        try:
+            response = await http_async_client.get(url, headers=headers)
+            logger.debug(f"LLM keep-warm ping returned {response.status_code}")
+        except httpx.HTTPError as e:
+            logger.warning(f"LLM keep-warm ping failed: {e!r}")
+
+
+async def close_http_clients() -> None:
+    if get_http_clients.cache_info().currsize:
+        http_client, http_async_client = get_http_clients()
+        http_client.close()
+        await http_async_client.aclose()
+        get_http_clients.cache_clear()
+        get_llm.cache_clear()
@@ -1,5 +1,6 @@
 # message-type for websocket messages
 MESSAGE_TYPE_START = "start"
+MESSAGE_TYPE_STREAM = "stream"
 MESSAGE_TYPE_END = "end"
 MESSAGE_TYPE_BLOB = "blob"
 MESSAGE_TYPE_ERROR = "error"
@@ -14,4 +15,9 @@ CONTENT_TYPE_RETRIEVAL = "retrieval"
 CONTENT_TYPE_NOTE = "note"
 CONTENT_TYPE_AGENT_INTERRUPT = "agent_interrupt"
 CONTENT_TYPE_INTERMITTENT_STEPS = "intermittent_steps"
+CONTENT_TYPE_RESUME_INSIGHT = "resume_insight"
+# session id announced when a websocket session is opened or resumed
+CONTENT_TYPE_SESSION = "session"
+# content type of streamed answer tokens
+CONTENT_TYPE_TEXT_PLAIN = "text/plain"
 
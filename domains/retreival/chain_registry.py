@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Callable, Dict
+
+from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+from domains.retreival.models import RagUseCase
+from domains.retreival.prompts import (
+    MULTI_QUERY_PROMPT,
+    PROMPT_PREFIX_QNA,
+    PROMPT_SUFFIX,
+    QUERY_REWRITE_PROMPT,
+    initialise_doc_search_prompt_template,
+)
+from domains.settings import config_settings
+from domains.utils import get_chat_model, get_streaming_chat_model
+
+# (prefix, suffix) of the answer prompt per use case; generator_routing serves DEFAULT only
+ANSWER_PROMPTS: Dict[RagUseCase, tuple] = {
+    RagUseCase.DEFAULT: (PROMPT_PREFIX_QNA, PROMPT_SUFFIX),
+}
+
+
+class ChainRegistry:
+    """
+    Prompt templates and LCEL chains (prompt | llm | parser) built once per process.
+
+    Chat clients are shared (see get_llm) and per-request callbacks are passed through
+    `config` at invocation, so a compiled chain holds no request state and every
+    request can reuse it. Entries are built on first use; `compile` builds them all
+    up front during startup warmup.
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, object] = {}
+        # re-entrant: building a chain looks up its prompt
+        self._lock = threading.RLock()
+
+    def _get(self, key: tuple, build: Callable[[], object]):
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = build()
+        return entry
+
+    def answer_prompt(self, use_case: RagUseCase = RagUseCase.DEFAULT) -> PromptTemplate:
+        if use_case not in ANSWER_PROMPTS:
+            raise ValueError(f"Unsupported route: {use_case}")
+        return self._get(
+            ("answer_prompt", use_case),
+            lambda: initialise_doc_search_prompt_template(*ANSWER_PROMPTS[use_case]),
+        )
+
+    def answer_chain(self, use_case: RagUseCase = RagUseCase.DEFAULT) -> Runnable:
+        def build() -> Runnable:
+            llm = get_streaming_chat_model(model_key=config_settings.LLMS.get("OPENAI_CHAT"))
+            if not llm:
+                raise ValueError("Failed to initialize language model")
+            return self.answer_prompt(use_case) | llm | StrOutputParser()
+
+        return self._get(("answer_chain", use_case), build)
+
+    def _prompt_chain(self, name: str, template: str, model_key: str) -> Runnable:
+        def build() -> Runnable:
+            llm = get_chat_model(model_key=model_key)
+            if not llm:
+                raise ValueError("Failed to initialize language model")
+            return PromptTemplate.from_template(template) | llm | StrOutputParser()
+
+        return self._get((name, model_key), build)
+
+    def query_rewrite_chain(self, model_key: str = "OPTIMIZED_QUESTION_MODEL") -> Runnable:
+        return self._prompt_chain("query_rewrite", QUERY_REWRITE_PROMPT, model_key)
+
+    def multi_query_chain(self, model_key: str = "OPTIMIZED_QUESTION_MODEL") -> Runnable:
+        return self._prompt_chain("multi_query", MULTI_QUERY_PROMPT, model_key)
+
+    def compile(self) -> None:
+        for use_case in ANSWER_PROMPTS:
+            self.answer_chain(use_case)
+        self.query_rewrite_chain()
+        self.multi_query_chain()
+        logger.info(f"Compiled {len(self._entries)} prompt templates and chains")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+chain_registry = ChainRegistry()
+
+
+def benchmark(requests: int = 2000) -> None:
+    """Per-request setup cost: building prompts, chains and memory vs. reusing them."""
+    from domains.retreival.initialize_memory import initialise_memory_from_chat_context, memory_pool
+    from domains.retreival.models import Message
+
+    chat_context = [
+        Message(type=config_settings.CHAT_CONTEXT_HUMAN_MESSAGE_KEY, content="What is the refund policy?"),
+        Message(type=config_settings.CHAT_CONTEXT_AI_MESSAGE_KEY, content="Refunds are accepted within 30 days."),
+    ]
+    llm = get_streaming_chat_model(model_key=config_settings.LLMS.get("OPENAI_CHAT"))
+    rewrite_llm = get_chat_model(model_key="OPTIMIZED_QUESTION_MODEL")
+
+    def per_request_setup() -> None:
+        prompt = initialise_doc_search_prompt_template(PROMPT_PREFIX_QNA, PROMPT_SUFFIX)
+        initialise_memory_from_chat_context(chat_context)
+        prompt | llm | StrOutputParser()
+        PromptTemplate(template=QUERY_REWRITE_PROMPT, input_variables=["question"]) | rewrite_llm | StrOutputParser()
+
+    def registry_lookup() -> None:
+        chain_registry.answer_prompt(RagUseCase.DEFAULT)
+        with memory_pool.acquire(chat_context):
+            chain_registry.answer_chain(RagUseCase.DEFAULT)
+            chain_registry.query_rewrite_chain()
+
+    chain_registry.compile()
+    for name, setup in (("built per request", per_request_setup), ("registry + memory pool", registry_lookup)):
+        setup()
+        started = time.perf_counter()
+        for _ in range(requests):
+            setup()
+        elapsed = time.perf_counter() - started
+        print(f"{name:<24} {elapsed / requests * 1e6:>9.1f} us/request")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,3 +1,4 @@
+import asyncio
 import typing
 import uuid
 import datetime
@@ -7,12 +8,64 @@ from langchain.callbacks.base import AsyncCallbackHandler
 from langchain.schema.output import LLMResult
 from langchain_core.messages import BaseMessage
 
+from domains.retreival.framing import send_frame, stream_frame
+from domains.settings import config_settings
+
 
 class StreamingLLMCallbackHandler(AsyncCallbackHandler):
-    """Callback handler for streaming LLM responses."""
+    """
+    Callback handler for streaming LLM responses.
+
+    With coalescing on, tokens after the first are buffered and sent as one frame
+    every `coalesce_ms` milliseconds or once `coalesce_chars` characters are waiting,
+    whichever comes first. The first token of every LLM run is sent immediately so
+    time to first token is unchanged, and whatever is buffered is flushed when the
+    run ends.
+    """
 
-    def __init__(self, websocket_internal: WebSocket):
+    def __init__(
+            self,
+            websocket_internal: WebSocket,
+            coalesce: typing.Optional[bool] = None,
+            coalesce_ms: typing.Optional[float] = None,
+            coalesce_chars: typing.Optional[int] = None,
+    ):
         self.websocket = websocket_internal
+        self.coalesce = config_settings.STREAM_COALESCING if coalesce is None else coalesce
+        self.coalesce_seconds = float(coalesce_ms or config_settings.STREAM_COALESCE_MS) / 1000
+        self.coalesce_chars = int(coalesce_chars or config_settings.STREAM_COALESCE_CHARS)
+        self._buffer: typing.List[str] = []
+        self._buffered_chars = 0
+        self._first_token_sent = False
+        self._flush_timer: typing.Optional[asyncio.Task] = None
+        self._send_lock = asyncio.Lock()
+        self.tokens = 0
+        self.frames = 0
+
+    def _reset(self) -> None:
+        self._first_token_sent = False
+        self.tokens = 0
+        self.frames = 0
+
+    async def _send(self, text: str) -> None:
+        async with self._send_lock:
+            await send_frame(self.websocket, stream_frame(text))
+        self.frames += 1
+
+    async def _flush(self) -> None:
+        if self._flush_timer is not None and self._flush_timer is not asyncio.current_task():
+            self._flush_timer.cancel()
+        self._flush_timer = None
+        if not self._buffer:
+            return
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        self._buffered_chars = 0
+        await self._send(text)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.coalesce_seconds)
+        await self._flush()
 
     async def on_chat_model_start(
             self,
@@ -25,6 +78,7 @@ class StreamingLLMCallbackHandler(AsyncCallbackHandler):
             metadata: typing.Dict[str, typing.Any] | None = None,
             **kwargs: typing.Any,
     ) -> typing.Any:
+        self._reset()
         logger.info(f"LLM chain chat model start with serialized: {serialized}\nmessages: {messages}\nkwargs: {kwargs}")
 
     async def on_llm_start(self,
@@ -36,18 +90,32 @@ class StreamingLLMCallbackHandler(AsyncCallbackHandler):
                            tags: typing.Optional[typing.List[str]] = None,
                            metadata: typing.Optional[typing.Dict[str, typing.Any]] = None,
                            **kwargs: typing.Any) -> None:
+        self._reset()
         logger.info(f'LLM chain started with prompts: {prompts} and kwargs: {kwargs}')
 
     async def on_llm_new_token(self, token: str, **kwargs: typing.Any) -> None:
-        resp = {
-            "message": token,
-            "type": "stream",
-            "content_type": "text/plain",
-        }
-        # Send the JSON object directly instead of formatting it as a string
-        await self.websocket.send_json(resp)
+        self.tokens += 1
+        if not self.coalesce or not self._first_token_sent:
+            self._first_token_sent = True
+            await self._send(token)
+            return
+
+        self._buffer.append(token)
+        self._buffered_chars += len(token)
+        if self._buffered_chars >= self.coalesce_chars:
+            await self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.create_task(self._flush_later())
 
     async def on_llm_end(self, response: LLMResult, *, run_id: uuid.UUID,
                          parent_run_id: typing.Optional[uuid.UUID] = None,
                          tags: typing.Optional[typing.List[str]] = None, **kwargs: typing.Any) -> None:
+        await self._flush()
+        # wait for a timer flush that may still be sending
+        async with self._send_lock:
+            pass
         logger.info(f'LLM chain ended with response: {response}')
+        logger.debug(f"Streamed {self.tokens} tokens in {self.frames} frames")
+
+    async def on_llm_error(self, error: BaseException, **kwargs: typing.Any) -> None:
+        await self._flush()
@@ -18,6 +18,8 @@ class ChatResponse(BaseModel):
             "resume_insight",
             "agent_interrupt",
             "intermittent_steps",
+            "text/plain",
+            "session",
         ]
         | None
     ) = None
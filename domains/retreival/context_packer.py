@@ -0,0 +1,173 @@
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from domains.retreival.fusion import document_key
+from domains.settings import config_settings
+from domains.tokenizer import count_tokens, token_counts
+
+# a chunk must start with at least this many characters of an earlier chunk's tail
+# before the shared text is treated as splitter overlap
+MIN_OVERLAP_CHARS = 32
+
+
+@dataclass
+class PackedContext:
+    text: str
+    documents: List[Tuple[Document, float]] = field(default_factory=list)
+    tokens: int = 0
+    # what the unpacked list of (Document, score) pairs would have cost in the prompt
+    raw_tokens: int = 0
+    below_score: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(self.raw_tokens - self.tokens, 0)
+
+
+def citation_header(position: int, document: Document) -> str:
+    title = document.metadata.get("title") or document.metadata.get("file_name") or "document"
+    page = document.metadata.get("page")
+    return f"[{position}] {title}" + (f", p.{int(page) + 1}" if isinstance(page, (int, float)) else "")
+
+
+def _source(document: Document) -> str:
+    return str(document.metadata.get("file_name") or document.metadata.get("source") or "")
+
+
+def overlap_length(earlier: str, later: str) -> int:
+    """Length of the longest suffix of `earlier` that is a prefix of `later`."""
+    probe = later[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = earlier.rfind(probe)
+    longest = 0
+    while start != -1:
+        length = len(earlier) - start
+        if later.startswith(earlier[start:]):
+            longest = length
+        start = earlier.rfind(probe, 0, start + len(probe) - 1)
+    return longest
+
+
+def strip_overlap(text: str, packed: List[str]) -> Optional[str]:
+    """
+    Remove text already present in `packed` chunks of the same source.
+
+    Returns None when `text` is entirely contained in a packed chunk; otherwise the
+    part of it not shared with the neighbouring chunks it overlaps.
+    """
+    for other in packed:
+        if text in other:
+            return None
+        if overlap := overlap_length(other, text):
+            text = text[overlap:]
+        if overlap := overlap_length(text, other):
+            text = text[:-overlap]
+    return text.strip() or None
+
+
+def pack_context(
+        related_docs_with_score: List[Tuple[Document, float]],
+        minimum_score: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        model_name: str = None,
+) -> PackedContext:
+    """
+    Build the prompt's {context} from scored chunks.
+
+    Chunks below `minimum_score` are dropped (pass None for rank-fused scores, which
+    have no absolute scale), the rest are taken best score first, repeated chunks and
+    the overlap the splitter leaves between neighbouring chunks are cut, and chunks
+    are added under a one-line citation header until `max_tokens` is reached.
+    """
+    max_tokens = int(max_tokens or config_settings.CONTEXT_MAX_TOKENS)
+    model_name = model_name or config_settings.LLMS.get("OPENAI_CHAT")
+    ranked = sorted(related_docs_with_score, key=lambda pair: pair[1], reverse=True)
+    packed = PackedContext(text="")
+
+    candidates = []
+    for document, score in ranked:
+        if minimum_score is not None and score < minimum_score:
+            packed.below_score += 1
+            continue
+        candidates.append((document, score))
+
+    seen_keys = set()
+    texts_by_source: dict = {}
+    sections = []
+    for document, score in candidates:
+        key = document_key(document)
+        source = _source(document)
+        text = None if key in seen_keys else strip_overlap(document.page_content, texts_by_source.get(source, []))
+        if text is None:
+            packed.duplicates += 1
+            continue
+        seen_keys.add(key)
+        texts_by_source.setdefault(source, []).append(document.page_content)
+        sections.append((document, score, text))
+
+    # headers are counted with a placeholder number; the final numbers are at most a token longer
+    section_tokens = token_counts(
+        [f"{citation_header(0, document)}\n{text}" for document, _, text in sections], model_name
+    )
+    packed.raw_tokens = count_tokens(str(related_docs_with_score), model_name)
+
+    kept = []
+    for (document, score, text), tokens in zip(sections, section_tokens):
+        if packed.tokens + tokens > max_tokens:
+            packed.over_budget += 1
+            continue
+        packed.tokens += tokens
+        packed.documents.append((document, score))
+        kept.append(f"{citation_header(len(kept) + 1, document)}\n{text}")
+
+    packed.text = "\n\n".join(kept)
+    return packed
+
+
+class ContextPackingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.raw_tokens = 0
+        self.packed_tokens = 0
+        self.below_score = 0
+        self.duplicates = 0
+        self.over_budget = 0
+
+    def record(self, packed: PackedContext) -> None:
+        with self._lock:
+            self.requests += 1
+            self.raw_tokens += packed.raw_tokens
+            self.packed_tokens += packed.tokens
+            self.below_score += packed.below_score
+            self.duplicates += packed.duplicates
+            self.over_budget += packed.over_budget
+        logger.info(
+            f"Packed {len(packed.documents)} chunks into {packed.tokens} tokens "
+            f"({packed.tokens_saved} saved; dropped {packed.below_score} below score, "
+            f"{packed.duplicates} duplicate, {packed.over_budget} over budget)"
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            saved = max(self.raw_tokens - self.packed_tokens, 0)
+            return {
+                "requests": self.requests,
+                "raw_tokens": self.raw_tokens,
+                "packed_tokens": self.packed_tokens,
+                "tokens_saved": saved,
+                "mean_tokens_saved": round(saved / self.requests, 1) if self.requests else 0.0,
+                "chunks_below_score": self.below_score,
+                "chunks_duplicate": self.duplicates,
+                "chunks_over_budget": self.over_budget,
+            }
+
+
+context_packing_stats = ContextPackingStats()
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+import fastapi
+import orjson
+from loguru import logger
+
+from domains import retreival
+from domains.settings import config_settings
+
+MESSAGE_TYPES = (
+    retreival.MESSAGE_TYPE_START,
+    retreival.MESSAGE_TYPE_STREAM,
+    retreival.MESSAGE_TYPE_END,
+    retreival.MESSAGE_TYPE_BLOB,
+    retreival.MESSAGE_TYPE_ERROR,
+    retreival.MESSAGE_TYPE_INFO,
+)
+
+CONTENT_TYPES = (
+    None,
+    retreival.CONTENT_TYPE_OPTIMISED_QUESTION,
+    retreival.CONTENT_TYPE_ANSWER,
+    retreival.CONTENT_TYPE_CITATIONS,
+    retreival.CONTENT_TYPE_SUMMARY,
+    retreival.CONTENT_TYPE_RETRIEVAL,
+    retreival.CONTENT_TYPE_NOTE,
+    retreival.CONTENT_TYPE_RESUME_INSIGHT,
+    retreival.CONTENT_TYPE_AGENT_INTERRUPT,
+    retreival.CONTENT_TYPE_INTERMITTENT_STEPS,
+    retreival.CONTENT_TYPE_TEXT_PLAIN,
+    retreival.CONTENT_TYPE_SESSION,
+)
+
+_MESSAGE_PREFIX = b'{"message":'
+
+
+def _build_templates() -> Dict[Tuple[str, Optional[str]], bytes]:
+    """Everything after the message of each frame, in ChatResponse.model_dump() key order."""
+    return {
+        (message_type, content_type): (
+            b',"type":' + orjson.dumps(message_type)
+            + b',"content_type":' + orjson.dumps(content_type) + b"}"
+        )
+        for message_type in MESSAGE_TYPES
+        for content_type in CONTENT_TYPES
+    }
+
+
+FRAME_SUFFIXES = _build_templates()
+# start/end frames carry no message, so they are built once in full
+EMPTY_FRAMES = {key: _MESSAGE_PREFIX + b'""' + suffix for key, suffix in FRAME_SUFFIXES.items()}
+
+
+def encode_frame(
+        message: str,
+        message_type: str = retreival.MESSAGE_TYPE_STREAM,
+        content_type: Optional[str] = None,
+) -> bytes:
+    """
+    UTF-8 JSON of {"message", "type", "content_type"}; only the message is encoded per
+    call. Unknown type/content-type pairs raise ValueError, as ChatResponse validation did.
+    """
+    key = (message_type, content_type)
+    if not message and key in EMPTY_FRAMES:
+        return EMPTY_FRAMES[key]
+    try:
+        suffix = FRAME_SUFFIXES[key]
+    except KeyError:
+        raise ValueError(f"Unsupported frame type {message_type!r} / content type {content_type!r}")
+    return _MESSAGE_PREFIX + orjson.dumps(message) + suffix
+
+
+def stream_frame(text: str) -> bytes:
+    return encode_frame(text, retreival.MESSAGE_TYPE_STREAM, retreival.CONTENT_TYPE_TEXT_PLAIN)
+
+
+class FrameSendError(Exception):
+    """The connection's writer failed; nothing more can be sent on it."""
+    pass
+
+
+class FrameSender:
+    """
+    Per-connection queue of encoded frames drained by one writer task.
+
+    The queue is bounded: once `max_frames` frames wait for a slow client, `send`
+    blocks, which in turn pauses the producer (e.g. the LLM token stream) instead of
+    buffering without limit. Frames go out in the order they were queued. If a write
+    fails the error is logged, queued frames are dropped and every later `send`
+    raises FrameSendError.
+    """
+
+    def __init__(self, websocket: fastapi.WebSocket, max_frames: Optional[int] = None):
+        self.websocket = websocket
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=int(max_frames or config_settings.WEBSOCKET_SEND_QUEUE_SIZE))
+        self._writer: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+        self.frames_sent = 0
+        self.send_waits = 0
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop(), name="websocket-frame-writer")
+
+    async def _write_loop(self) -> None:
+        while True:
+            frame = await self._queue.get()
+            try:
+                if self.error is None:
+                    # ASGI text frames must be str; the frame is already valid UTF-8
+                    await self.websocket.send_text(frame.decode())
+                    self.frames_sent += 1
+            except Exception as e:
+                self.error = e
+                logger.error(f"Error sending frame over WebSocket: {e!r}")
+            finally:
+                self._queue.task_done()
+
+    async def send(self, frame: bytes) -> None:
+        if self.error is not None:
+            raise FrameSendError(f"WebSocket send failed: {self.error!r}")
+        if self._queue.full():
+            self.send_waits += 1
+        await self._queue.put(frame)
+
+    async def flush(self) -> None:
+        """Wait until every queued frame has been written (or dropped after an error)."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout=float(config_settings.WEBSOCKET_SEND_TIMEOUT_SECONDS))
+        except asyncio.TimeoutError:
+            logger.warning(f"Dropping {self._queue.qsize()} unsent frames on close")
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+
+
+@asynccontextmanager
+async def open_frame_sender(websocket: fastapi.WebSocket) -> AsyncIterator[FrameSender]:
+    """Route every frame sent on `websocket` through a FrameSender for the block's duration."""
+    sender = FrameSender(websocket)
+    sender.start()
+    websocket.state.frame_sender = sender
+    try:
+        yield sender
+    finally:
+        await sender.close()
+        websocket.state.frame_sender = None
+
+
+async def send_frame(websocket: fastapi.WebSocket, frame: bytes) -> None:
+    """Queue `frame` on the connection's FrameSender, or send it directly if it has none."""
+    sender = getattr(getattr(websocket, "state", None), "frame_sender", None)
+    if sender is not None:
+        await sender.send(frame)
+    else:
+        await websocket.send_text(frame.decode())
+
+
+def benchmark(frames: int = 200_000) -> None:
+    """Frames per second on one core: pydantic ChatResponse vs. templates, and through a FrameSender."""
+    import json
+
+    from domains.retreival.chat_response import ChatResponse
+
+    message = "The refund window is 30 days from delivery."
+
+    def report(name: str, seconds: float) -> None:
+        print(f"{name:<34} {frames / seconds:>12,.0f} frames/s  {seconds / frames * 1e6:>6.2f} us/frame")
+
+    started = time.perf_counter()
+    for _ in range(frames):
+        json.dumps(ChatResponse(message=message, type="stream", content_type="answer").model_dump())
+    report("ChatResponse + model_dump + json", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(frames):
+        encode_frame(message, retreival.MESSAGE_TYPE_STREAM, retreival.CONTENT_TYPE_ANSWER)
+    report("frame templates + orjson", time.perf_counter() - started)
+
+    class NullWebSocket:
+        async def send_text(self, text: str) -> None:
+            pass
+
+    async def through_sender() -> float:
+        sender = FrameSender(NullWebSocket(), max_frames=256)
+        sender.start()
+        started = time.perf_counter()
+        for _ in range(frames):
+            await sender.send(encode_frame(message, retreival.MESSAGE_TYPE_STREAM, retreival.CONTENT_TYPE_ANSWER))
+        await sender.flush()
+        elapsed = time.perf_counter() - started
+        await sender.close()
+        return elapsed
+
+    report("templates + FrameSender queue", asyncio.run(through_sender()))
+
+
+if __name__ == "__main__":
+    benchmark()
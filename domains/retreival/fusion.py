@@ -0,0 +1,71 @@
+import hashlib
+from typing import Dict, List, Sequence, Tuple, Union
+
+from langchain_core.documents import Document
+
+# the usual RRF damping constant (Cormack et al.)
+RRF_K = 60
+
+Ranked = Union[Document, Tuple[Document, float]]
+
+
+def document_key(document: Document) -> str:
+    """Stable identity of a chunk across result lists: chunk_id, then id, then a content hash."""
+    return (
+        document.metadata.get("chunk_id")
+        or document.id
+        or hashlib.sha1(document.page_content.encode("utf-8")).hexdigest()
+    )
+
+
+def reciprocal_rank_fusion(
+        rankings: Sequence[Sequence[Ranked]],
+        k: int = RRF_K,
+        limit: int = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each list may hold Documents or (Document, score) pairs; only the rank is used. A
+    chunk scores sum(1 / (k + rank)) over the lists it appears in, and the first copy
+    seen is the one returned.
+    """
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            document = item[0] if isinstance(item, tuple) else item
+            key = document_key(document)
+            documents.setdefault(key, document)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+
+    ordered = sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
+    return [(documents[key], score) for key, score in ordered[:limit]]
+
+
+def weighted_score_fusion(
+        rankings: Sequence[Sequence[Tuple[Document, float]]],
+        weights: Sequence[float],
+        limit: int = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Merge scored result lists whose scores live on different scales (cosine, BM25).
+
+    Each list's scores are min-max normalised to [0, 1] and a chunk scores the weighted
+    sum over the lists it appears in. A list whose scores are all equal counts as 1.
+    """
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        scores = [score for _, score in ranking]
+        low, spread = min(scores), max(scores) - min(scores)
+        for document, score in ranking:
+            key = document_key(document)
+            documents.setdefault(key, document)
+            normalised = (score - low) / spread if spread else 1.0
+            fused[key] = fused.get(key, 0.0) + weight * normalised
+
+    ordered = sorted(fused.items(), key=lambda pair: pair[1], reverse=True)
+    return [(documents[key], score) for key, score in ordered[:limit]]
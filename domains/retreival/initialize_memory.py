@@ -1,3 +1,7 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List
+
 from langchain.memory import ConversationBufferWindowMemory
 from domains.settings import config_settings
 from loguru import logger
@@ -7,14 +11,16 @@ def initialise_memory_from_chat_context(chat_context, input_key: str = None):
     return __load_chat_context(chat_context, input_key)
 
 
-def __load_chat_context(chat_context, input_key: str):
-    memory = ConversationBufferWindowMemory(
+def _new_memory(input_key: str = None) -> ConversationBufferWindowMemory:
+    return ConversationBufferWindowMemory(
         memory_key=config_settings.CONVERSATIONAL_BUFFER_WINDOW_MEMORY_KEY,
         return_messages=True,
         k=config_settings.LANGCHAIN_MEMORY_BUFFER_WINDOW,
         input_key=input_key or config_settings.CONVERSATIONAL_BUFFER_WINDOW_INPUT_KEY,
     )
 
+
+def _fill_memory(memory: ConversationBufferWindowMemory, chat_context) -> ConversationBufferWindowMemory:
     if chat_context is not None:
         logger.info("Loading context from chat context")
         for message in chat_context:
@@ -23,4 +29,47 @@ def __load_chat_context(chat_context, input_key: str):
             elif message.type == config_settings.CHAT_CONTEXT_AI_MESSAGE_KEY:
                 memory.chat_memory.add_ai_message(message.content)
 
-    return memory
\ No newline at end of file
+    return memory
+
+
+def __load_chat_context(chat_context, input_key: str):
+    return _fill_memory(_new_memory(input_key), chat_context)
+
+
+class MemoryPool:
+    """
+    Cleared ConversationBufferWindowMemory objects handed out per request instead of
+    building a new one each time. At most `max_size` idle objects are kept.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._idle: List[ConversationBufferWindowMemory] = []
+        self._lock = threading.Lock()
+
+    def take(self, chat_context, input_key: str = None) -> ConversationBufferWindowMemory:
+        """A memory filled with `chat_context`; hand it back with `release` when done."""
+        with self._lock:
+            memory = self._idle.pop() if self._idle else None
+        if memory is None:
+            memory = _new_memory(input_key)
+        else:
+            memory.input_key = input_key or config_settings.CONVERSATIONAL_BUFFER_WINDOW_INPUT_KEY
+        return _fill_memory(memory, chat_context)
+
+    def release(self, memory: ConversationBufferWindowMemory) -> None:
+        memory.clear()
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(memory)
+
+    @contextmanager
+    def acquire(self, chat_context, input_key: str = None) -> Iterator[ConversationBufferWindowMemory]:
+        memory = self.take(chat_context, input_key)
+        try:
+            yield memory
+        finally:
+            self.release(memory)
+
+
+memory_pool = MemoryPool(int(config_settings.MEMORY_POOL_SIZE))
@@ -0,0 +1,45 @@
+from typing import List
+
+import numpy as np
+
+from domains.injestion.local_vector_store import normalise_vectors
+
+
+def maximal_marginal_relevance(
+        query_vector,
+        candidate_vectors,
+        k: int,
+        lambda_mult: float = 0.5,
+) -> List[int]:
+    """
+    Pick `k` candidate indices trading relevance against redundancy.
+
+    Each step takes the candidate maximising
+        lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, already selected)
+    The candidate-to-candidate similarities come from one matrix product and the
+    running redundancy is a vector updated with a single column per step, so the
+    selection is O(fetch_k * k) array work rather than a Python double loop.
+    """
+    if len(candidate_vectors) == 0 or k <= 0:
+        return []
+    candidates = normalise_vectors(candidate_vectors)
+
+    query = normalise_vectors(query_vector)[0]
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    k = min(k, candidates.shape[0])
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    available = np.ones(candidates.shape[0], dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+
+    return selected
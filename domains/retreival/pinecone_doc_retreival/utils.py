@@ -1,22 +1,36 @@
 import asyncio
+import numpy as np
 
 from domains.settings import config_settings
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Pinecone
-from typing import Tuple, List
+from typing import TYPE_CHECKING, Tuple, List
 from domains.injestion.utils import get_embeddings
 from loguru import logger
 
 from contextlib import asynccontextmanager
 from functools import lru_cache
 
-from langchain_pinecone import PineconeVectorStore
-from domains.injestion.utils import get_embeddings
+from domains.retreival.fusion import reciprocal_rank_fusion, weighted_score_fusion
+from domains.retreival.mmr import maximal_marginal_relevance
+from domains.injestion.bm25_index import get_bm25_index
+from domains.injestion.local_vector_store import (
+    LOCAL_VECTOR_DATABASES,
+    load_local_vector_store,
+)
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Pinecone
+    from langchain_pinecone import PineconeVectorStore
 
 
 @lru_cache(maxsize=32)
-def load_index(index_name: str, namespace: str | None = None) -> Pinecone:
-    # load a pinecone index
+def load_index(index_name: str, namespace: str | None = None) -> "Pinecone":
+    if config_settings.VECTOR_DATABASE_TO_USE in LOCAL_VECTOR_DATABASES:
+        return load_local_vector_store(index_name)
+
+    # load a pinecone index; imported here so the pinecone client loads on first use
+    from langchain_community.vectorstores import Pinecone
+
     return Pinecone.from_existing_index(
         index_name=index_name,
         embedding=get_embeddings(model_key="EMBEDDING_MODEL"),
@@ -25,15 +39,20 @@ def load_index(index_name: str, namespace: str | None = None) -> Pinecone:
 
 
 @asynccontextmanager
-async def get_docsearch(index_name: str) -> PineconeVectorStore:
+async def get_docsearch(index_name: str) -> "PineconeVectorStore":
     """
     Context manager for handling document search initialization.
     """
     try:
-        docsearch = PineconeVectorStore.from_existing_index(
-            index_name=index_name,
-            embedding=get_embeddings(model_key="EMBEDDING_MODEL"),
-        )
+        if config_settings.VECTOR_DATABASE_TO_USE in LOCAL_VECTOR_DATABASES:
+            docsearch = load_local_vector_store(index_name)
+        else:
+            from langchain_pinecone import PineconeVectorStore
+
+            docsearch = PineconeVectorStore.from_existing_index(
+                index_name=index_name,
+                embedding=get_embeddings(model_key="EMBEDDING_MODEL"),
+            )
         yield docsearch
     except Exception as e:
         logger.error(f"Failed to initialize document search: {e}")
@@ -52,6 +71,7 @@ async def get_related_docs_with_score(
         # Perform similarity search without a filter
         related_docs_with_score = await docsearch.asimilarity_search_with_relevance_scores(
             query=question,
+            k=total_docs_to_retrieve,
             namespace=namespace,
         )
         return related_docs_with_score
@@ -61,6 +81,175 @@ async def get_related_docs_with_score(
         return []
 
 
+async def get_related_docs_for_queries(
+    index_name: str,
+    namespace: str,
+    queries: List[str],
+    total_docs_to_retrieve: int = 10,
+    budget_seconds: float = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Retrieve for several queries at once and fuse the rankings with RRF.
+
+    All queries are embedded in one batched call. Local stores then search every vector
+    in a single matrix scan; Pinecone gets one concurrent query per vector, and only the
+    queries answered within `budget_seconds` are fused (at least one is always waited
+    for). Returned scores are the fused RRF scores.
+
+    Searches run in worker threads, which cannot be interrupted: a query dropped over the
+    budget stops being waited for, but its thread keeps running until Pinecone answers
+    and still occupies a slot in the default executor until then.
+    """
+    budget_seconds = float(budget_seconds or config_settings.MULTI_QUERY_BUDGET_SECONDS)
+    keyword_searches = None
+    try:
+        docsearch = load_index(index_name=index_name)
+        if config_settings.HYBRID_RETRIEVAL:
+            keyword_index = get_bm25_index(index_name, namespace)
+            keyword_searches = asyncio.gather(*(
+                asyncio.to_thread(keyword_index.search, query, total_docs_to_retrieve)
+                for query in queries
+            ), return_exceptions=True)
+        vectors = await get_embeddings(model_key="EMBEDDING_MODEL").aembed_documents(queries)
+
+        if hasattr(docsearch, "similarity_search_by_vectors_with_score"):
+            rankings = await asyncio.to_thread(
+                docsearch.similarity_search_by_vectors_with_score,
+                vectors, total_docs_to_retrieve, namespace,
+            )
+        else:
+            searches = [
+                asyncio.create_task(asyncio.to_thread(
+                    docsearch.similarity_search_by_vector_with_score,
+                    vector, k=total_docs_to_retrieve, namespace=namespace,
+                ))
+                for vector in vectors
+            ]
+            done, pending = await asyncio.wait(searches, timeout=budget_seconds)
+            if not done:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for search in pending:
+                search.cancel()
+            if pending:
+                logger.warning(f"Dropped {len(pending)} of {len(searches)} queries over the {budget_seconds}s budget")
+            rankings = []
+            for search in searches:
+                if search not in done:
+                    continue
+                if search.exception() is not None:
+                    logger.error(f"Dense search failed for one of the queries: {search.exception()}")
+                else:
+                    rankings.append(search.result())
+
+        if keyword_searches is not None:
+            for keyword_ranking in await keyword_searches:
+                if isinstance(keyword_ranking, Exception):
+                    logger.error(f"Keyword search failed for one of the queries: {keyword_ranking}")
+                else:
+                    rankings.append(keyword_ranking)
+
+        fused = reciprocal_rank_fusion(rankings, limit=total_docs_to_retrieve)
+        logger.info(f"Fused {len(rankings)} result lists into {len(fused)} documents")
+        return fused
+
+    except Exception as e:
+        logger.error(f"Failed to get related docs for multiple queries: {e}")
+        if keyword_searches is not None and not keyword_searches.done():
+            keyword_searches.cancel()
+        return []
+
+
+async def get_related_docs_hybrid(
+    index_name: str,
+    namespace: str,
+    question: str,
+    total_docs_to_retrieve: int = 10,
+) -> List[Tuple[Document, float]]:
+    """
+    Dense and BM25 keyword retrieval run side by side, fused by normalised score.
+
+    HYBRID_DENSE_WEIGHT weighs the dense scores and the keyword scores get the rest.
+    Either side failing leaves the other one's results.
+    """
+    dense_weight = float(config_settings.HYBRID_DENSE_WEIGHT)
+    dense_docs, keyword_docs = await asyncio.gather(
+        get_related_docs_with_score(index_name, namespace, question, total_docs_to_retrieve),
+        asyncio.to_thread(get_bm25_index(index_name, namespace).search, question, total_docs_to_retrieve),
+        return_exceptions=True,
+    )
+    if isinstance(keyword_docs, BaseException):
+        logger.error(f"BM25 search failed, using dense results only: {keyword_docs}")
+        keyword_docs = []
+
+    fused = weighted_score_fusion(
+        [dense_docs, keyword_docs],
+        weights=[dense_weight, 1 - dense_weight],
+        limit=total_docs_to_retrieve,
+    )
+    logger.info(f"Fused {len(dense_docs)} dense and {len(keyword_docs)} keyword results into {len(fused)}")
+    return fused
+
+
+@lru_cache(maxsize=32)
+def get_pinecone_index(index_name: str):
+    from domains.injestion.vector_db_utils import initialize_pinecone
+
+    return initialize_pinecone().Index(index_name)
+
+
+def search_with_vectors(
+    index_name: str,
+    namespace: str,
+    query_vector: List[float],
+    k: int,
+) -> Tuple[List[Tuple[Document, float]], np.ndarray]:
+    """Top `k` chunks with their scores and stored vectors (include_values on Pinecone)."""
+    if config_settings.VECTOR_DATABASE_TO_USE in LOCAL_VECTOR_DATABASES:
+        return load_local_vector_store(index_name).similarity_search_by_vector_with_vectors(
+            query_vector, k=k, namespace=namespace
+        )
+
+    response = get_pinecone_index(index_name).query(
+        vector=query_vector,
+        top_k=k,
+        namespace=namespace,
+        include_values=True,
+        include_metadata=True,
+    )
+    docs_with_score = []
+    for match in response.matches:
+        metadata = dict(match.metadata or {})
+        page_content = metadata.pop("text", "")
+        docs_with_score.append((Document(id=match.id, page_content=page_content, metadata=metadata), match.score))
+    return docs_with_score, np.array([match.values for match in response.matches], dtype=np.float32)
+
+
+async def get_related_docs_with_mmr(
+    index_name: str,
+    namespace: str,
+    question: str,
+    total_docs_to_retrieve: int = 10,
+    fetch_k: int = None,
+    lambda_mult: float = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Fetch `fetch_k` candidates with their vectors and keep `total_docs_to_retrieve`
+    of them by maximal marginal relevance, so near-duplicate chunks do not crowd out
+    the rest. Scores are the candidates' similarities mapped to [0, 1] like
+    asimilarity_search_with_relevance_scores does for cosine indexes.
+    """
+    fetch_k = max(int(fetch_k or config_settings.MMR_FETCH_K), total_docs_to_retrieve)
+    lambda_mult = float(lambda_mult if lambda_mult is not None else config_settings.MMR_LAMBDA)
+
+    query_vector = await get_embeddings(model_key="EMBEDDING_MODEL").aembed_query(question)
+    candidates, vectors = await asyncio.to_thread(
+        search_with_vectors, index_name, namespace, query_vector, fetch_k
+    )
+    selected = maximal_marginal_relevance(query_vector, vectors, total_docs_to_retrieve, lambda_mult)
+    logger.info(f"MMR kept {len(selected)} of {len(candidates)} candidates (lambda={lambda_mult})")
+    return [(candidates[i][0], (candidates[i][1] + 1) / 2) for i in selected]
+
+
 async def get_related_docs_without_context(
         index_name: str,
         namespace: str,
@@ -68,20 +257,27 @@ async def get_related_docs_without_context(
         total_docs_to_retrieve: int = 10
 ) -> List[Tuple[Document, float]]:
     """
-    Retrieve related documents using PineconeVectorStore retriever.
+    Retrieve related documents with their scores.
+
+    Plain dense retrieval and MMR give relevance scores in [0, 1]; with HYBRID_RETRIEVAL
+    the scores are the fused, per-request normalised ones.
     """
     try:
-        async with get_docsearch(index_name) as docsearch:
-            retriever = docsearch.as_retriever(
-                search_kwargs={
-                    "k": total_docs_to_retrieve,
-                    "namespace": namespace
-                }
+        if config_settings.HYBRID_RETRIEVAL:
+            return await get_related_docs_hybrid(
+                index_name, namespace, question, total_docs_to_retrieve
             )
 
-            related_docs = await retriever.ainvoke(input=question)
-            logger.info(f"Retrieved {len(related_docs)} documents")
-            return related_docs
+        if config_settings.MMR_ENABLED:
+            return await get_related_docs_with_mmr(
+                index_name, namespace, question, total_docs_to_retrieve
+            )
+
+        related_docs = await get_related_docs_with_score(
+            index_name, namespace, question, total_docs_to_retrieve
+        )
+        logger.info(f"Retrieved {len(related_docs)} documents")
+        return related_docs
 
     except Exception as e:
         logger.error(f"Error in get_related_docs_without_context: {str(e)}")
@@ -48,4 +48,54 @@ Based on these documents, here is my response:
         ]
     )
 
-    return PromptTemplate(template=prompt_template, input_variables=input_variables)
\ No newline at end of file
+    return PromptTemplate(template=prompt_template, input_variables=input_variables)
+
+QUERY_REWRITE_PROMPT = """
+    Input Description: A natural language user query about a specific topic.
+    
+    Transformation Guidelines: Convert the user query into a more effective retrieval query by following these steps:
+    
+    Keyword Focus: Identify and use specific keywords that are central to the topic.
+    Synonyms and Variants: Include synonyms or related terms to cover variations in how the information might be phrased.
+    Streamlining: Eliminate common stop words and unnecessary punctuation to improve search focus.
+    Conciseness: Ensure the query is concise, ideally between 4-12 words, to maintain focus without over-specifying.
+    Exact Matches: Enclose terms in quotes to enforce exact phrase matching when necessary to capture precise information.
+    Special Handling for Irrelevant Queries:
+    
+    If the query is casual or non-informative (e.g., "Hi, how are you"), return None to indicate that the query does not require a retrieval-based response.
+    Output: Deliver the optimized query formatted according to the above guidelines, or None if the query is identified as irrelevant.
+    
+    Example:
+    
+    Original User Query: "What are some good resources for learning python programming?"
+    
+    Optimized Query: "Python programming tutorials resources"
+    
+    Original User Query: "Hi, how are you?"
+    
+    Optimized Query: None
+    
+    Pointers for Using This Prompt:
+    
+    Be vigilant about distinguishing between informational queries and non-informative interactions.
+    Ensure that the language model understands the importance of keyword density and relevance to improve the specificity of the search results.
+    Regularly update the synonyms or related terms based on evolving language usage or new developments in the subject area.
+    Be mindful of the balance between conciseness and informativeness; overly broad queries may retrieve too much irrelevant information, while overly narrow queries might miss useful content.
+    
+    USER QUERY : {question}
+    
+    Note : Only return the transformed query or "None" if a user is trying to do a small talk.
+        """
+
+MULTI_QUERY_PROMPT = """You turn a user question into search queries for a vector database of document chunks.
+
+Write up to {max_queries} short retrieval queries (4-12 words each) that together cover the question:
+- one query per distinct sub-question or aspect
+- use specific keywords, synonyms and related terms
+- enclose exact phrases in quotes when needed
+- no numbering, bullets or explanations; one query per line
+
+If the question is small talk (e.g. "Hi, how are you") return only: None
+
+USER QUESTION: {question}
+"""
@@ -0,0 +1,157 @@
+import re
+import threading
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Optional
+
+from cachetools import TTLCache
+from loguru import logger
+
+from domains.settings import config_settings
+
+# what the rewrite prompt answers for chit-chat; callers already check for it
+NO_RETRIEVAL = "None"
+
+_CHIT_CHAT_PHRASE = (
+    r"(hi+|hey+|hello+|yo|hiya|howdy|greetings|good (morning|afternoon|evening|night)"
+    r"|thanks?( you)?( (so|very) much)?|thank u|thx|ty|cheers|much appreciated|appreciate it"
+    r"|ok(ay)?|k|alright|all right|cool|great|nice|awesome|perfect|excellent|wonderful|fine|sure"
+    r"|got it|understood|makes sense|sounds good|no problem|no worries|will do"
+    r"|bye|goodbye|see (you|ya)|how are (you|u)( doing)?( today)?|how('?s| is) it going"
+    r"|what'?s up|sup|nice to meet you|who are you|are you there)"
+)
+# one or more chit-chat phrases in a row, e.g. "ok thanks" or "great, thank you bye"
+_CHIT_CHAT = re.compile(
+    rf"^{_CHIT_CHAT_PHRASE}( {_CHIT_CHAT_PHRASE})*( (there|buddy|friend|bot|assistant))?$"
+)
+
+_STOP_WORDS = frozenset(
+    "a an the is are was were be been am do does did can could should would will shall may might must "
+    "i me my you your we our they their he she it its this that these those what which who whom whose "
+    "when where why how please tell explain give show find about of to in on for with at by from "
+    "and or but if then than so not no".split()
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s\"'-]+")
+
+
+class QueryKind(str, Enum):
+    # chit-chat answered directly, without retrieval
+    DIRECT_ANSWER = "direct_answer"
+    KEYWORDS = "keywords"
+    NEEDS_REWRITE = "needs_rewrite"
+
+
+def normalise_question(question: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", question.lower()).split())
+
+
+def classify_query(question: str) -> QueryKind:
+    """
+    Rule-based classifier run before the rewrite LLM.
+
+    Greetings, thanks, acknowledgements and similar chit-chat are answered directly without
+    retrieval. Short queries made only of content words (no question words or stop words)
+    are already in the shape the rewrite prompt produces, so they are used as they are.
+    """
+    normalised = normalise_question(question)
+    if not normalised or _CHIT_CHAT.match(normalised):
+        return QueryKind.DIRECT_ANSWER
+
+    words = normalised.split()
+    if (
+            len(words) <= int(config_settings.QUERY_REWRITE_MAX_KEYWORD_TERMS)
+            and "?" not in question
+            and not any(word in _STOP_WORDS for word in words)
+    ):
+        return QueryKind.KEYWORDS
+    return QueryKind.NEEDS_REWRITE
+
+
+def queries_near_identical(first: str, second: str, threshold: float = None) -> bool:
+    """Jaccard similarity of the normalised word sets is at least `threshold`."""
+    threshold = float(threshold or config_settings.SPECULATIVE_RETRIEVAL_SIMILARITY)
+    first_words = set(normalise_question(first).split())
+    second_words = set(normalise_question(second).split())
+    if not first_words or not second_words:
+        return first_words == second_words
+    return len(first_words & second_words) / len(first_words | second_words) >= threshold
+
+
+class QueryRewriteCache:
+    """
+    LRU + TTL cache in front of the query-rewrite LLM call, with skip-rate stats.
+
+    Entries are keyed by the rewrite model and the normalised question, so switching
+    `model_key` never serves another model's rewrite. Saved latency is estimated from
+    the running mean of the LLM calls actually made.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, fast_path: bool = True):
+        self.fast_path = fast_path
+        self._cache: TTLCache = TTLCache(maxsize=max_size, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.cache_hits = 0
+        self.direct_answers = 0
+        self.keyword_passthrough = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    async def rewrite(
+            self,
+            question: str,
+            rewrite_with_llm: Callable[[str], Awaitable[Optional[str]]],
+            model_key: str = "OPTIMIZED_QUESTION_MODEL",
+    ) -> Optional[str]:
+        self.requests += 1
+        if self.fast_path:
+            kind = classify_query(question)
+            if kind == QueryKind.DIRECT_ANSWER:
+                self.direct_answers += 1
+                logger.info(f"Skipping query rewrite for chit-chat: {question!r}")
+                return NO_RETRIEVAL
+            if kind == QueryKind.KEYWORDS:
+                self.keyword_passthrough += 1
+                logger.info(f"Query is already keyword-like, skipping rewrite: {question!r}")
+                return question.strip()
+
+        key = (model_key, normalise_question(question))
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            logger.info(f"Query rewrite cache hit - {cached}")
+            return cached
+
+        started = time.perf_counter()
+        rewritten = await rewrite_with_llm(question)
+        self.llm_calls += 1
+        self.llm_seconds += time.perf_counter() - started
+
+        if rewritten:
+            with self._lock:
+                self._cache[key] = rewritten
+        return rewritten
+
+    def stats(self) -> dict:
+        skipped = self.cache_hits + self.direct_answers + self.keyword_passthrough
+        mean_llm_seconds = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "direct_answers": self.direct_answers,
+            "keyword_passthrough": self.keyword_passthrough,
+            "llm_calls": self.llm_calls,
+            "skip_rate": round(skipped / self.requests, 4) if self.requests else 0.0,
+            "mean_llm_seconds": round(mean_llm_seconds, 3),
+            "estimated_seconds_saved": round(skipped * mean_llm_seconds, 3),
+        }
+
+
+query_rewrite_cache = QueryRewriteCache(
+    max_size=int(config_settings.QUERY_REWRITE_CACHE_SIZE),
+    ttl_seconds=float(config_settings.QUERY_REWRITE_CACHE_TTL_SECONDS),
+    fast_path=config_settings.QUERY_REWRITE_FAST_PATH,
+)
+
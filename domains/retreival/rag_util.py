@@ -1,7 +1,9 @@
 import fastapi
-from domains.retreival.chat_response import ChatResponse
+from loguru import logger
 from typing import Literal
 
+from domains.retreival.framing import encode_frame, send_frame
+
 
 async def send_message_over_websocket(
     websocket: fastapi.WebSocket,
@@ -18,15 +20,14 @@ async def send_message_over_websocket(
             "resume_insight",
             "agent_interrupt",
             "intermittent_steps",
+            "text/plain",
+            "session",
         ]
         | None
     ) = None,
 ):
     try:
-        resp = ChatResponse(
-            message=message, type=message_type, content_type=content_type
-        )
-        await websocket.send_json(resp.model_dump())
+        await send_frame(websocket, encode_frame(message, message_type, content_type))
     except Exception as e:
-        print(f"Error sending message over WebSocket: {e}")
-        await websocket.close(code=1000)  #
+        logger.error(f"Error sending message over WebSocket: {e!r}")
+        await websocket.close(code=1000)
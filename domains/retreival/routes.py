@@ -8,23 +8,97 @@ from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
 from langchain.prompts import PromptTemplate
 
+from domains.retreival.chat_handler import StreamingLLMCallbackHandler
 from domains.retreival.rag_util import send_message_over_websocket
 from domains.retreival.utils import (
+    generate_retrieval_queries,
     transform_user_query_for_retreival,
-    get_chat_model_with_streaming,
+    get_streaming_chat_model,
 )
-from domains.retreival.pinecone_doc_retreival.utils import get_related_docs_without_context
-from domains.retreival.initialize_memory import initialise_memory_from_chat_context
+from domains.retreival.pinecone_doc_retreival.utils import (
+    get_related_docs_for_queries,
+    get_related_docs_without_context,
+)
+from domains.retreival.initialize_memory import memory_pool
+from domains.retreival.sessions import ChatSession
+from domains.retreival.chain_registry import chain_registry
+from domains.retreival.semantic_cache import replay_answer, semantic_answer_cache
+from domains.retreival.fusion import document_key, reciprocal_rank_fusion
+from domains.retreival.context_packer import context_packing_stats, pack_context
+from domains.retreival.query_rewrite import queries_near_identical
+from domains.injestion.utils import get_embeddings
 from domains.settings import config_settings
 from domains.retreival.models import RagUseCase, RAGGenerationResponse, Message
-from domains.retreival.prompts import (
-    PROMPT_PREFIX_QNA,
-    PROMPT_SUFFIX,
-    initialise_doc_search_prompt_template,
-)
 from domains import retreival
 
 
+async def embed_question(question: str) -> Optional[List[float]]:
+    """Embedding used as the semantic cache key; None (cache bypassed) if embedding fails."""
+    try:
+        return await get_embeddings(model_key="EMBEDDING_MODEL").aembed_query(question)
+    except Exception as e:
+        logger.error(f"Failed to embed question for the semantic cache: {e}")
+        return None
+
+
+async def _cancel(task: asyncio.Task) -> None:
+    """Cancel `task` and wait for it, so its outcome is retrieved rather than logged as never retrieved."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+async def retrieve_with_speculation(
+        index_name: str,
+        namespace: str,
+        question: str,
+) -> Tuple[Optional[str], List[Tuple[Document, float]]]:
+    """
+    Retrieve on the raw question while the rewrite runs, hiding the rewrite latency.
+
+    If the rewrite is near-identical to the question, the speculative results are used
+    as they are; otherwise the rewritten query is retrieved too and both lists are
+    merged with reciprocal rank fusion. Fused chunks keep their best score from either
+    list, so they stay comparable with a score threshold. Small talk cancels the
+    speculative retrieval.
+    """
+    speculative = asyncio.create_task(
+        get_related_docs_without_context(index_name, namespace, question)
+    )
+    try:
+        retreival_query = await transform_user_query_for_retreival(
+            question, "OPTIMIZED_QUESTION_MODEL"
+        )
+    except BaseException:
+        await _cancel(speculative)
+        raise
+
+    if not retreival_query or retreival_query == "None":
+        await _cancel(speculative)
+        return retreival_query, []
+
+    if queries_near_identical(question, retreival_query):
+        logger.info("Rewrite is near-identical to the question, using speculative retrieval")
+        return retreival_query, await speculative
+
+    question_docs, rewritten_docs = await asyncio.gather(
+        speculative,
+        get_related_docs_without_context(index_name, namespace, retreival_query),
+    )
+    best_scores = {}
+    for document, score in [*question_docs, *rewritten_docs]:
+        key = document_key(document)
+        best_scores[key] = max(score, best_scores.get(key, score))
+    fused = reciprocal_rank_fusion(
+        [rewritten_docs, question_docs],
+        limit=max(len(rewritten_docs), len(question_docs)),
+    )
+    logger.info(
+        f"Fused {len(rewritten_docs)} rewritten-query and {len(question_docs)} "
+        f"raw-question results into {len(fused)}"
+    )
+    return retreival_query, [(document, best_scores[document_key(document)]) for document, _ in fused]
+
+
 class RAGError(Exception):
     """Base exception for RAG-related errors"""
     pass
@@ -46,6 +120,7 @@ async def run_rag(
         chat_context: Optional[List[Message]] = None,
         websocket: Optional[WebSocket] = None,
         namespace: Optional[str] = None,
+        session: Optional[ChatSession] = None,
 ) -> RAGGenerationResponse:
     """
     Main RAG pipeline function.
@@ -56,6 +131,8 @@ async def run_rag(
         chat_context: Previous chat history
         websocket: WebSocket connection for streaming
         namespace: Pinecone namespace
+        session: Multi-turn session whose memory replaces `chat_context`; the turn is
+            appended to it once answered
 
     Returns:
         RAGGenerationResponse object
@@ -69,21 +146,36 @@ async def run_rag(
         namespace = namespace or config_settings.PINECONE_DEFAULT_DEV_NAMESPACE
 
         # Initialize components
-        prompt_qna = initialise_doc_search_prompt_template(
-            PROMPT_PREFIX_QNA,
-            PROMPT_SUFFIX
-        )
-        memory = initialise_memory_from_chat_context(chat_context or [])
-
-        return await rag_with_streaming(
-            websocket=websocket,
-            language=language,
-            question=question,
-            minimum_score=minimum_score,
-            prompt_template_ask_question=prompt_qna,
-            memory=memory,
-            namespace=namespace,
-        )
+        prompt_qna = chain_registry.answer_prompt(RagUseCase.DEFAULT)
+
+        if session is not None:
+            async with session.lock:
+                response = await rag_with_streaming(
+                    websocket=websocket,
+                    language=language,
+                    question=question,
+                    minimum_score=minimum_score,
+                    prompt_template_ask_question=prompt_qna,
+                    memory=session.memory,
+                    namespace=namespace,
+                    use_semantic_cache=config_settings.SEMANTIC_CACHE_ENABLED and not session.has_history,
+                )
+                if response.answer:
+                    session.record_turn(question, response.answer)
+                return response
+
+        with memory_pool.acquire(chat_context or []) as memory:
+            return await rag_with_streaming(
+                websocket=websocket,
+                language=language,
+                question=question,
+                minimum_score=minimum_score,
+                prompt_template_ask_question=prompt_qna,
+                memory=memory,
+                namespace=namespace,
+                # answers depend on the chat history, so only first turns are cached
+                use_semantic_cache=config_settings.SEMANTIC_CACHE_ENABLED and not chat_context,
+            )
     except Exception as e:
         logger.exception("RAG pipeline failed")
         raise RAGError(f"RAG pipeline failed: {str(e)}")
@@ -99,9 +191,14 @@ async def rag_with_streaming(
         namespace: str,
         use_case: RagUseCase = RagUseCase.DEFAULT,
         citations_count: int = None,
+        use_semantic_cache: bool = False,
 ) -> RAGGenerationResponse:
     """
     RAG pipeline with streaming support.
+
+    With `use_semantic_cache`, a question similar enough to one already answered for
+    this namespace and language is answered from the semantic cache, replayed through
+    the same start/stream/end frames.
     """
     citations_count = citations_count or config_settings.PINECONE_TOTAL_DOCS_TO_RETRIEVE
     index_name = config_settings.PINECONE_INDEX_NAME
@@ -112,22 +209,60 @@ async def rag_with_streaming(
                 websocket, "", retreival.MESSAGE_TYPE_START
             )
 
-        # Get optimized retrieval query
-        retreival_query = await transform_user_query_for_retreival(
-            question, "OPTIMIZED_QUESTION_MODEL"
-        )
+        query_vector = None
+        if use_semantic_cache:
+            query_vector = await embed_question(question)
+        if query_vector is not None:
+            cached = semantic_answer_cache.lookup(namespace, language, query_vector)
+            if cached is not None:
+                logger.info(
+                    f"Semantic cache hit ({cached.similarity:.3f}) for {question!r} "
+                    f"via {cached.question!r}"
+                )
+                if websocket:
+                    await replay_answer(websocket, cached.answer)
+                    await send_message_over_websocket(
+                        websocket, "", retreival.MESSAGE_TYPE_END
+                    )
+                return RAGGenerationResponse(answer=cached.answer)
+
+        # Get optimized retrieval query and related documents; rank-fused and hybrid
+        # scores have no absolute scale, so the score threshold is skipped for them
+        score_threshold = None if config_settings.HYBRID_RETRIEVAL else minimum_score
+        if config_settings.MULTI_QUERY_RETRIEVAL:
+            retreival_queries = await generate_retrieval_queries(
+                question, int(config_settings.MULTI_QUERY_MAX_QUERIES)
+            )
+            retreival_query = retreival_queries[0] if retreival_queries else "None"
+            score_threshold = None
+            related_docs = []
+            if retreival_queries:
+                related_docs = await get_related_docs_for_queries(
+                    index_name,
+                    namespace,
+                    retreival_queries,
+                    total_docs_to_retrieve=citations_count,
+                )
+        elif config_settings.SPECULATIVE_RETRIEVAL:
+            retreival_query, related_docs = await retrieve_with_speculation(
+                index_name, namespace, question
+            )
+        else:
+            retreival_query = await transform_user_query_for_retreival(
+                question, "OPTIMIZED_QUESTION_MODEL"
+            )
+            related_docs = []
+            if retreival_query and retreival_query != "None":
+                related_docs = await get_related_docs_without_context(
+                    index_name,
+                    namespace,
+                    retreival_query,
+                )
 
         if not retreival_query or retreival_query == "None":
             logger.warning("Empty retrieval query")
             return RAGGenerationResponse(answer="")
 
-        # Retrieve related documents
-        related_docs = await get_related_docs_without_context(
-            index_name,
-            namespace,
-            retreival_query,
-        )
-
         logger.debug(f"Retrieved {len(related_docs)} documents")
 
         # Generate response
@@ -139,10 +274,24 @@ async def rag_with_streaming(
             websocket=websocket,
             route=RagUseCase.DEFAULT,
             citations_count=citations_count,
-            minimum_score=minimum_score,
+            minimum_score=score_threshold,
             related_docs_with_score=related_docs,
         )
 
+        if query_vector is not None and response.answer:
+            semantic_answer_cache.store(
+                namespace,
+                language,
+                question,
+                query_vector,
+                response.answer,
+                chunk_ids=[
+                    doc.metadata.get("chunk_id") or doc.id
+                    for doc, _ in related_docs[:citations_count]
+                    if doc.metadata.get("chunk_id") or doc.id
+                ],
+            )
+
         if websocket:
             await send_message_over_websocket(
                 websocket, "", retreival.MESSAGE_TYPE_END
@@ -167,7 +316,7 @@ async def generator_routing(
         websocket: Optional[WebSocket],
         route: RagUseCase,
         citations_count: int,
-        minimum_score: float,
+        minimum_score: Optional[float],
         related_docs_with_score: List[Tuple[Document, float]],
 ) -> RAGGenerationResponse:
     """
@@ -177,6 +326,7 @@ async def generator_routing(
         raise ValueError(f"Unsupported route: {route}")
 
     return await run_doc_retrieval_flow(
+        use_case=route,
         memory=memory,
         optimised_question=optimised_question,
         prompt_template_ask_question=prompt_template_ask_question,
@@ -193,31 +343,44 @@ async def run_doc_retrieval_flow(
         prompt_template_ask_question: PromptTemplate,
         related_docs_with_score: List[Tuple[Document, float]],
         websocket: Optional[WebSocket],
-        minimum_score: float,
+        minimum_score: Optional[float],
         language: str,
+        use_case: RagUseCase = RagUseCase.DEFAULT,
 ) -> RAGGenerationResponse:
     """
     Executes the document retrieval and response generation flow.
+
+    The chunks are packed into the prompt by `pack_context`: filtered by
+    `minimum_score` (None skips the filter), de-duplicated and cut to CONTEXT_MAX_TOKENS.
     """
     try:
-        document_count = len(related_docs_with_score)
-
-        llm = get_chat_model_with_streaming(
-            websocket,
-            model_key=config_settings.LLMS.get("OPENAI_CHAT")
+        packed = await asyncio.to_thread(
+            pack_context,
+            related_docs_with_score,
+            minimum_score,
+            model_name=config_settings.LLMS.get("OPENAI_CHAT"),
         )
-        if not llm:
-            raise ValueError("Failed to initialize language model")
+        context_packing_stats.record(packed)
+        document_count = len(packed.documents)
+
+        if prompt_template_ask_question is chain_registry.answer_prompt(use_case):
+            llm_chain = chain_registry.answer_chain(use_case)
+        else:
+            llm = get_streaming_chat_model(
+                model_key=config_settings.LLMS.get("OPENAI_CHAT")
+            )
+            if not llm:
+                raise ValueError("Failed to initialize language model")
 
-        llm_chain = prompt_template_ask_question | llm | StrOutputParser()
+            llm_chain = prompt_template_ask_question | llm | StrOutputParser()
 
         response = await llm_chain.ainvoke({
             "question": optimised_question,
             "chat_history": memory.buffer_as_str,
             "doc_count": str(document_count),
-            "context": related_docs_with_score,
+            "context": packed.text,
             "language": language
-        })
+        }, config={"callbacks": [StreamingLLMCallbackHandler(websocket)] if websocket else []})
 
         return RAGGenerationResponse(answer=response)
 
@@ -0,0 +1,164 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import fastapi
+import numpy as np
+from loguru import logger
+
+from domains.retreival.framing import send_frame, stream_frame
+from domains.settings import config_settings
+
+# words per "stream" frame when replaying a cached answer
+REPLAY_WORDS_PER_FRAME = 8
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    chunk_ids: List[str]
+    similarity: float
+
+
+@dataclass
+class _NamespaceAnswers:
+    """Unit query vectors in one matrix so a lookup is a single mat-vec product."""
+
+    vectors: np.ndarray
+    questions: List[str] = field(default_factory=list)
+    answers: List[str] = field(default_factory=list)
+    chunk_ids: List[List[str]] = field(default_factory=list)
+    created_at: List[float] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def drop_oldest(self, count: int) -> None:
+        self.vectors = self.vectors[count:]
+        del self.questions[:count], self.answers[:count], self.chunk_ids[:count], self.created_at[:count]
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by the embedding of the user's question, per (namespace, language).
+
+    A question whose embedding has cosine similarity >= `threshold` with a cached one is
+    answered from the cache. Entries expire after `ttl_seconds`, each key keeps at most
+    `max_entries` (oldest dropped first), and ingestion into a namespace drops all of
+    its entries. The cache lives in one server process and only that process's
+    ingestion jobs invalidate it, so with several workers the TTL bounds how stale an
+    answer can be.
+    """
+
+    def __init__(self, threshold: float, max_entries: int, ttl_seconds: float):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[tuple, _NamespaceAnswers] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, entries: _NamespaceAnswers) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = next((i for i, created in enumerate(entries.created_at) if created >= cutoff), len(entries))
+        if expired:
+            entries.drop_oldest(expired)
+
+    def lookup(self, namespace: str, language: str, query_vector: Sequence[float]) -> Optional[CachedAnswer]:
+        query = self._unit(query_vector)
+        with self._lock:
+            entries = self._entries.get((namespace, language))
+            if entries is not None:
+                self._expire(entries)
+            if not entries:
+                self.misses += 1
+                return None
+
+            scores = entries.vectors @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return CachedAnswer(
+                question=entries.questions[best],
+                answer=entries.answers[best],
+                chunk_ids=list(entries.chunk_ids[best]),
+                similarity=float(scores[best]),
+            )
+
+    def store(
+            self,
+            namespace: str,
+            language: str,
+            question: str,
+            query_vector: Sequence[float],
+            answer: str,
+            chunk_ids: List[str],
+    ) -> None:
+        vector = self._unit(query_vector)
+        with self._lock:
+            entries = self._entries.get((namespace, language))
+            if entries is None or entries.vectors.shape[1] != vector.shape[0]:
+                entries = self._entries[(namespace, language)] = _NamespaceAnswers(
+                    vectors=np.empty((0, vector.shape[0]), dtype=np.float32)
+                )
+            if len(entries) >= self.max_entries:
+                entries.drop_oldest(len(entries) - self.max_entries + 1)
+
+            entries.vectors = np.vstack([entries.vectors, vector[None, :]])
+            entries.questions.append(question)
+            entries.answers.append(answer)
+            entries.chunk_ids.append(chunk_ids)
+            entries.created_at.append(time.time())
+
+    def invalidate(self, namespace: str) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == namespace]
+            dropped = sum(len(self._entries.pop(key)) for key in keys)
+        self.invalidations += 1
+        logger.info(f"Invalidated {dropped} cached answers for namespace {namespace}")
+        return dropped
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = sum(len(answers) for answers in self._entries.values())
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+semantic_answer_cache = SemanticAnswerCache(
+    threshold=float(config_settings.SEMANTIC_CACHE_THRESHOLD),
+    max_entries=int(config_settings.SEMANTIC_CACHE_MAX_ENTRIES),
+    ttl_seconds=float(config_settings.SEMANTIC_CACHE_TTL_SECONDS),
+)
+
+
+async def invalidate_on_ingestion(request, result: dict) -> None:
+    """Job-queue completion hook: anything written to a namespace makes its answers stale."""
+    semantic_answer_cache.invalidate(request.namespace or config_settings.PINECONE_DEFAULT_DEV_NAMESPACE)
+
+
+async def replay_answer(websocket: fastapi.WebSocket, answer: str) -> None:
+    """Send a cached answer as "stream" frames shaped like StreamingLLMCallbackHandler's."""
+    words = re.findall(r"\s*\S+\s*", answer)
+    for start in range(0, len(words), REPLAY_WORDS_PER_FRAME):
+        await send_frame(websocket, stream_frame("".join(words[start:start + REPLAY_WORDS_PER_FRAME])))
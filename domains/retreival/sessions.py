@@ -0,0 +1,177 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from langchain.memory import ConversationBufferWindowMemory
+from loguru import logger
+
+from domains.retreival.initialize_memory import memory_pool
+from domains.retreival.models import Message
+from domains.settings import config_settings
+
+
+@dataclass
+class ChatSession:
+    """Server-side state of one conversation, kept across the turns of a websocket connection."""
+    session_id: str
+    memory: ConversationBufferWindowMemory
+    namespace: Optional[str] = None
+    language: str = "en"
+    turns: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    # connections currently attached; attached sessions are never evicted
+    connections: int = 0
+    # one turn at a time, even if the session is resumed on a second connection
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # ended or evicted; its memory goes back to the pool once the last connection detaches
+    closed: bool = False
+
+    @property
+    def has_history(self) -> bool:
+        return bool(self.memory.chat_memory.messages)
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+
+    def record_turn(self, question: str, answer: str) -> None:
+        """Append the turn to the memory instead of rebuilding it from the client's chat_context."""
+        self.memory.save_context({self.memory.input_key: question}, {"answer": answer})
+        self.turns += 1
+        self.touch()
+
+
+class SessionManager:
+    """
+    Chat sessions by id, with idle ones evicted after `ttl_seconds`.
+
+    Each session holds a pooled conversation memory that grows one turn at a time.
+    A client that reconnects with its session id within the TTL continues the
+    conversation without resending its history. Beyond `max_sessions` the least
+    recently used detached session is evicted.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.created = 0
+        self.resumed = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str]) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None and self._expired(session):
+            self._evict(session)
+            return None
+        return session
+
+    def open(
+            self,
+            session_id: Optional[str] = None,
+            chat_context: Optional[List[Message]] = None,
+            namespace: Optional[str] = None,
+            language: str = "en",
+    ) -> ChatSession:
+        """
+        Resume `session_id` if it is still live, otherwise start a new session under a
+        fresh server-generated id whose memory is seeded once from `chat_context`. The
+        session counts as attached until `detach` is called.
+        """
+        session = self.get(session_id)
+        if session is not None:
+            self.resumed += 1
+            self._sessions.move_to_end(session.session_id)
+        else:
+            session = ChatSession(
+                session_id=uuid.uuid4().hex,
+                memory=memory_pool.take(chat_context or []),
+                namespace=namespace,
+                language=language,
+            )
+            self._sessions[session.session_id] = session
+            self.created += 1
+            self._evict_overflow()
+        session.connections += 1
+        session.touch()
+        return session
+
+    def detach(self, session: ChatSession) -> None:
+        if session.connections == 0:
+            return
+        session.connections -= 1
+        session.touch()
+        if session.closed and session.connections == 0:
+            memory_pool.release(session.memory)
+
+    def close(self, session_id: str) -> None:
+        """End the session; connections still attached keep its memory until they detach."""
+        session = self._sessions.get(session_id)
+        if session is not None:
+            self._evict(session)
+
+    def _expired(self, session: ChatSession) -> bool:
+        return session.connections == 0 and time.monotonic() - session.last_used > self.ttl_seconds
+
+    def _evict(self, session: ChatSession) -> None:
+        if self._sessions.pop(session.session_id, None) is None:
+            return
+        self.evicted += 1
+        session.closed = True
+        if session.connections == 0:
+            memory_pool.release(session.memory)
+        logger.info(f"Evicted chat session {session.session_id} after {session.turns} turns")
+
+    def _evict_overflow(self) -> None:
+        for session in list(self._sessions.values()):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if session.connections == 0:
+                self._evict(session)
+
+    def evict_expired(self) -> int:
+        expired = [session for session in self._sessions.values() if self._expired(session)]
+        for session in expired:
+            self._evict(session)
+        return len(expired)
+
+    async def _sweep(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            if evicted := self.evict_expired():
+                logger.info(f"Evicted {evicted} idle chat sessions, {len(self)} live")
+
+    async def start(self) -> None:
+        if self._sweeper is None:
+            interval = float(config_settings.SESSION_SWEEP_INTERVAL_SECONDS)
+            self._sweeper = asyncio.create_task(self._sweep(interval), name="chat-session-sweeper")
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        for session in list(self._sessions.values()):
+            self._evict(session)
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self._sessions),
+            "attached": sum(1 for session in self._sessions.values() if session.connections),
+            "created": self.created,
+            "resumed": self.resumed,
+            "evicted": self.evicted,
+        }
+
+
+session_manager = SessionManager(
+    ttl_seconds=float(config_settings.SESSION_TTL_SECONDS),
+    max_sessions=int(config_settings.SESSION_MAX_COUNT),
+)
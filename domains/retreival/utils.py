@@ -1,68 +1,89 @@
+import re
+from typing import List
+
 import fastapi
 from langchain_core.output_parsers import StrOutputParser
-from langchain.prompts import PromptTemplate
-from domains.utils import get_chat_model_with_streaming
-from domains.utils import get_chat_model
+from domains.utils import get_streaming_chat_model
+from domains.retreival.chat_handler import StreamingLLMCallbackHandler
+from domains.retreival.chain_registry import chain_registry
+from domains.retreival.query_rewrite import (
+    QueryKind,
+    classify_query,
+    queries_near_identical,
+    query_rewrite_cache,
+)
 from loguru import logger
 
 
 async def transform_user_query_for_retreival(
     question: str, model_key: str = "OPTIMIZED_QUESTION_MODEL"
+):
+    """
+    Rewrite `question` into a retrieval query, or "None" for chit-chat.
+
+    Chit-chat and keyword-like queries are answered locally and repeated questions come
+    from the rewrite cache; only the rest reach the LLM.
+    """
+    return await query_rewrite_cache.rewrite(
+        question, lambda q: _rewrite_query_with_llm(q, model_key), model_key
+    )
+
+
+async def _rewrite_query_with_llm(
+    question: str, model_key: str = "OPTIMIZED_QUESTION_MODEL"
 ):
     try:
-        template = """
-    Input Description: A natural language user query about a specific topic.
-    
-    Transformation Guidelines: Convert the user query into a more effective retrieval query by following these steps:
-    
-    Keyword Focus: Identify and use specific keywords that are central to the topic.
-    Synonyms and Variants: Include synonyms or related terms to cover variations in how the information might be phrased.
-    Streamlining: Eliminate common stop words and unnecessary punctuation to improve search focus.
-    Conciseness: Ensure the query is concise, ideally between 4-12 words, to maintain focus without over-specifying.
-    Exact Matches: Enclose terms in quotes to enforce exact phrase matching when necessary to capture precise information.
-    Special Handling for Irrelevant Queries:
-    
-    If the query is casual or non-informative (e.g., "Hi, how are you"), return None to indicate that the query does not require a retrieval-based response.
-    Output: Deliver the optimized query formatted according to the above guidelines, or None if the query is identified as irrelevant.
-    
-    Example:
-    
-    Original User Query: "What are some good resources for learning python programming?"
-    
-    Optimized Query: "Python programming tutorials resources"
-    
-    Original User Query: "Hi, how are you?"
-    
-    Optimized Query: None
-    
-    Pointers for Using This Prompt:
-    
-    Be vigilant about distinguishing between informational queries and non-informative interactions.
-    Ensure that the language model understands the importance of keyword density and relevance to improve the specificity of the search results.
-    Regularly update the synonyms or related terms based on evolving language usage or new developments in the subject area.
-    Be mindful of the balance between conciseness and informativeness; overly broad queries may retrieve too much irrelevant information, while overly narrow queries might miss useful content.
-    
-    USER QUERY : {question}
-    
-    Note : Only return the transformed query or "None" if a user is trying to do a small talk.
-        """
-
-        prompt = PromptTemplate(template=template, input_variables=["question"])
-        output_parser = StrOutputParser()
-        llm = get_chat_model(model_key=model_key)
-
-        if llm:
-            llm_chain = prompt | llm | output_parser
-            answer_from_model: str = await llm_chain.ainvoke({"question": question})
-            logger.info(f"Transformed query for retrieval - {answer_from_model}")
-
-            return answer_from_model
+        llm_chain = chain_registry.query_rewrite_chain(model_key)
+        answer_from_model: str = await llm_chain.ainvoke({"question": question})
+        logger.info(f"Transformed query for retrieval - {answer_from_model}")
+
+        return answer_from_model
 
     except Exception as e:
         logger.error(f"Error in retreival query transformation - {e}")
         return None
 
 
+async def generate_retrieval_queries(
+    question: str,
+    max_queries: int,
+    model_key: str = "OPTIMIZED_QUESTION_MODEL",
+) -> List[str]:
+    """
+    Split `question` into up to `max_queries` retrieval queries with one LLM call.
+
+    The raw question is kept as the last query unless a generated one is near-identical
+    to it. Chit-chat yields no queries; keyword-like questions and LLM failures fall
+    back to the question alone.
+    """
+    kind = classify_query(question)
+    if kind == QueryKind.DIRECT_ANSWER:
+        return []
+    if kind == QueryKind.KEYWORDS or max_queries <= 1:
+        return [question.strip()]
+
+    try:
+        llm_chain = chain_registry.multi_query_chain(model_key)
+        answer: str = await llm_chain.ainvoke({"question": question, "max_queries": max_queries})
+    except Exception as e:
+        logger.error(f"Error generating retrieval queries - {e}")
+        return [question.strip()]
+
+    queries: List[str] = []
+    for line in answer.splitlines():
+        query = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+        if query and query != "None" and query not in queries:
+            queries.append(query)
+    if not queries and answer.strip() == "None":
+        return []
+
+    queries = queries[:max_queries]
+    if not any(queries_near_identical(question, query) for query in queries):
+        queries = [*queries[:max_queries - 1], question.strip()]
+    logger.info(f"Generated retrieval queries - {queries}")
+    return queries
+
+
 async def optimize_user_query(
     websocket: fastapi.WebSocket,
     question,
@@ -74,12 +95,12 @@ async def optimize_user_query(
     output_parser = StrOutputParser()
     llm_chain = (
         pre_grounding_prompt
-        | get_chat_model_with_streaming(websocket, model_key=model_key)
+        | get_streaming_chat_model(model_key=model_key)
         | output_parser
     )
     optimised_question = await llm_chain.ainvoke(
         {"question": question, "chat_history": memory.buffer_as_str},
-        # config={'callbacks': [ConsoleCallbackHandler()]}
+        config={"callbacks": [StreamingLLMCallbackHandler(websocket)]},
     )
     logger.info(f"Optimised question generated: {optimised_question}")
     return optimised_question
@@ -17,7 +17,53 @@ class Settings(BaseSettings):
     )
     SUMMARIZE_LLM_MODEL: str = os.environ.get("SUMMARIZE_LLM_MODEL", "gpt-4o")
 
+    # embedding cache
+    EMBEDDING_CACHE_ENABLED: bool = os.environ.get("EMBEDDING_CACHE_ENABLED", True)
+    EMBEDDING_CACHE_PATH: str = os.environ.get("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite3")
+    EMBEDDING_QUERY_CACHE_SIZE: int = os.environ.get("EMBEDDING_QUERY_CACHE_SIZE", 1024)
+    # hit/miss counters are written to the cache file every N lookups or T seconds, and at exit
+    EMBEDDING_CACHE_STATS_FLUSH_EVERY: int = os.environ.get("EMBEDDING_CACHE_STATS_FLUSH_EVERY", 200)
+    EMBEDDING_CACHE_STATS_FLUSH_SECONDS: float = os.environ.get("EMBEDDING_CACHE_STATS_FLUSH_SECONDS", 30)
+
+    # ingestion pipeline
+    EMBEDDING_BATCH_MAX_TOKENS: int = os.environ.get("EMBEDDING_BATCH_MAX_TOKENS", 20000)
+    EMBEDDING_BATCH_MAX_ITEMS: int = os.environ.get("EMBEDDING_BATCH_MAX_ITEMS", 500)
+    EMBEDDING_CONCURRENCY: int = os.environ.get("EMBEDDING_CONCURRENCY", 4)
+    STREAMING_INGESTION: bool = os.environ.get("STREAMING_INGESTION", True)
+    INGESTION_QUEUE_SIZE: int = os.environ.get("INGESTION_QUEUE_SIZE", 256)
+
+    # pdf parsing: shard page ranges across processes for large files; every ingestion
+    # worker has its own pool, by default of cpu_count // INGESTION_WORKERS processes
+    PDF_SHARDING_PAGE_THRESHOLD: int = os.environ.get("PDF_SHARDING_PAGE_THRESHOLD", 200)
+    PDF_SHARD_SIZE: int = os.environ.get("PDF_SHARD_SIZE", 50)
+    PDF_SHARDING_WORKERS: int = os.environ.get("PDF_SHARDING_WORKERS", 0)
+
+    # pre-signed url downloads
+    DOWNLOAD_CACHE_DIR: str = os.environ.get("DOWNLOAD_CACHE_DIR", "cache/downloads")
+    DOWNLOAD_CACHE_MAX_BYTES: int = os.environ.get("DOWNLOAD_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+    DOWNLOAD_CHUNK_SIZE: int = os.environ.get("DOWNLOAD_CHUNK_SIZE", 1024 ** 2)
+    DOWNLOAD_TIMEOUT_SECONDS: float = os.environ.get("DOWNLOAD_TIMEOUT_SECONDS", 300)
+
+    # ingestion job queue
+    INGESTION_JOB_DB_PATH: str = os.environ.get("INGESTION_JOB_DB_PATH", "cache/ingestion_jobs.sqlite3")
+    INGESTION_WORKERS: int = os.environ.get("INGESTION_WORKERS", 2)
+    INGESTION_MAX_BACKLOG: int = os.environ.get("INGESTION_MAX_BACKLOG", 100)
+    # RUNNING jobs carry their process as owner and a heartbeat; another process only
+    # recovers them once the heartbeat is INGESTION_JOB_STALE_SECONDS old (or the owner's
+    # pid is gone on this host), and a job is FAILED after INGESTION_JOB_MAX_ATTEMPTS tries
+    INGESTION_JOB_HEARTBEAT_SECONDS: float = os.environ.get("INGESTION_JOB_HEARTBEAT_SECONDS", 10)
+    INGESTION_JOB_STALE_SECONDS: float = os.environ.get("INGESTION_JOB_STALE_SECONDS", 60)
+    INGESTION_JOB_MAX_ATTEMPTS: int = os.environ.get("INGESTION_JOB_MAX_ATTEMPTS", 3)
+
     API_HOSTNAME: str = os.environ.get("API_HOSTNAME", "https://dummyjson.com/c")
+
+    # status callbacks to API_HOSTNAME
+    STATUS_CALLBACK_POOL_SIZE: int = os.environ.get("STATUS_CALLBACK_POOL_SIZE", 10)
+    STATUS_CALLBACK_OUTBOX_SIZE: int = os.environ.get("STATUS_CALLBACK_OUTBOX_SIZE", 1000)
+    STATUS_CALLBACK_MAX_ATTEMPTS: int = os.environ.get("STATUS_CALLBACK_MAX_ATTEMPTS", 5)
+    STATUS_CALLBACK_BACKOFF_BASE_SECONDS: float = os.environ.get("STATUS_CALLBACK_BACKOFF_BASE_SECONDS", 0.5)
+    STATUS_CALLBACK_BACKOFF_MAX_SECONDS: float = os.environ.get("STATUS_CALLBACK_BACKOFF_MAX_SECONDS", 30)
+    STATUS_CALLBACK_TIMEOUT_SECONDS: float = os.environ.get("STATUS_CALLBACK_TIMEOUT_SECONDS", 10)
     VECTOR_DATABASE_TO_USE: str = os.environ.get("VECTOR_DATABASE_TO_USE","pinecone")
 
     MAX_TOKEN_LIMIT: int = os.environ.get("MAX_TOKEN_LIMIT", 1500)
@@ -31,10 +77,32 @@ class Settings(BaseSettings):
     PINECONE_INDEX_REGION_NAME: str = os.environ.get("PINECONE_INDEX_REGION_NAME", "us-east-1")
     PINECONE_DEFAULT_DEV_NAMESPACE: str = os.environ.get("PINCEONE_DEFAULT_DEV_NAMESPACE", "default_dev")
     PINECONE_DROP_INDEX_NAME_STATUS: bool = os.environ.get("PINECONE_DROP_INDEX_NAME_STATUS", False)
+    PINECONE_UPSERT_BATCH_SIZE: int = os.environ.get("PINECONE_UPSERT_BATCH_SIZE", 100)
     PINECONE_TOTAL_DOCS_TO_RETRIEVE: int = os.environ.get(
         "PINECONE_TOTAL_DOCS_TO_RETRIEVE", 10
     )
 
+    # local vector store (VECTOR_DATABASE_TO_USE=numpy or hnsw)
+    LOCAL_VECTOR_STORE_PATH: str = os.environ.get("LOCAL_VECTOR_STORE_PATH", "vector_store")
+    HNSW_M: int = os.environ.get("HNSW_M", 16)
+    HNSW_EF_CONSTRUCTION: int = os.environ.get("HNSW_EF_CONSTRUCTION", 200)
+    HNSW_EF_SEARCH: int = os.environ.get("HNSW_EF_SEARCH", 64)
+    HNSW_INITIAL_CAPACITY: int = os.environ.get("HNSW_INITIAL_CAPACITY", 10000)
+    HNSW_COMPACTION_RATIO: float = float(os.environ.get("HNSW_COMPACTION_RATIO", 0.2))
+
+    # BM25 keyword index built at ingestion and fused with dense results (HYBRID_RETRIEVAL)
+    HYBRID_RETRIEVAL: bool = os.environ.get("HYBRID_RETRIEVAL", False)
+    HYBRID_DENSE_WEIGHT: float = os.environ.get("HYBRID_DENSE_WEIGHT", 0.5)
+    BM25_INDEX_PATH: str = os.environ.get("BM25_INDEX_PATH", "bm25_index")
+    BM25_K1: float = os.environ.get("BM25_K1", 1.2)
+    BM25_B: float = os.environ.get("BM25_B", 0.75)
+    BM25_COMMIT_EVERY: int = os.environ.get("BM25_COMMIT_EVERY", 5000)
+
+    # maximal marginal relevance: keep k of MMR_FETCH_K candidates, 1.0 = pure relevance
+    MMR_ENABLED: bool = os.environ.get("MMR_ENABLED", False)
+    MMR_LAMBDA: float = os.environ.get("MMR_LAMBDA", 0.5)
+    MMR_FETCH_K: int = os.environ.get("MMR_FETCH_K", 30)
+
     # citation
     CITATIONS_TOGGLE: bool = os.environ.get(
         "CITATIONS_TOGGLE", False
@@ -43,6 +111,10 @@ class Settings(BaseSettings):
     # chunk setting
     CHUNK_SIZE: int = os.environ.get("CHUNK_SIZE", 1000)
     CHUNK_OVERLAP: int = os.environ.get("CHUNK_OVERLAP", 200)
+    # "recursive" (character based) or "token" (tiktoken offsets, sizes below)
+    CHUNK_SPLITTER: str = os.environ.get("CHUNK_SPLITTER", "recursive")
+    CHUNK_SIZE_TOKENS: int = os.environ.get("CHUNK_SIZE_TOKENS", 256)
+    CHUNK_OVERLAP_TOKENS: int = os.environ.get("CHUNK_OVERLAP_TOKENS", 48)
 
     # classification
     CLASSIFICATION_MODEL: str = os.environ.get("CLASSIFICATION_MODEL", "gpt-4o")
@@ -58,6 +130,13 @@ class Settings(BaseSettings):
     CONVERSATIONAL_BUFFER_WINDOW_INPUT_KEY: str = os.environ.get(
         "CONVERSATIONAL_BUFFER_WINDOW_INPUT_KEY", "question"
     )
+    # idle conversation memory objects kept for reuse across requests
+    MEMORY_POOL_SIZE: int = os.environ.get("MEMORY_POOL_SIZE", 64)
+    # multi-turn websocket sessions: detached sessions idle for SESSION_TTL_SECONDS are
+    # evicted, checked every SESSION_SWEEP_INTERVAL_SECONDS
+    SESSION_TTL_SECONDS: float = os.environ.get("SESSION_TTL_SECONDS", 900)
+    SESSION_MAX_COUNT: int = os.environ.get("SESSION_MAX_COUNT", 10000)
+    SESSION_SWEEP_INTERVAL_SECONDS: float = os.environ.get("SESSION_SWEEP_INTERVAL_SECONDS", 60)
     CHAT_CONTEXT_HUMAN_MESSAGE_KEY: str = os.environ.get(
         "CHAT_CONTEXT_HUMAN_MESSAGE_KEY", "human"
     )
@@ -65,9 +144,45 @@ class Settings(BaseSettings):
         "CHAT_CONTEXT_AI_MESSAGE_KEY", "ai"
     )
 
+    # retrieve on the raw question while the rewrite runs, fuse with RRF
+    SPECULATIVE_RETRIEVAL: bool = os.environ.get("SPECULATIVE_RETRIEVAL", False)
+    SPECULATIVE_RETRIEVAL_SIMILARITY: float = os.environ.get("SPECULATIVE_RETRIEVAL_SIMILARITY", 0.8)
+
+    # multi-query fan-out: one LLM call yields several retrieval queries, fused with RRF
+    MULTI_QUERY_RETRIEVAL: bool = os.environ.get("MULTI_QUERY_RETRIEVAL", False)
+    MULTI_QUERY_MAX_QUERIES: int = os.environ.get("MULTI_QUERY_MAX_QUERIES", 4)
+    MULTI_QUERY_BUDGET_SECONDS: float = os.environ.get("MULTI_QUERY_BUDGET_SECONDS", 2.0)
+
+    # semantic answer cache (first-turn questions only). Off by default: it is per process,
+    # so ingestion only invalidates the worker that finished the job, and questions that
+    # differ only by an entity (e.g. a candidate name) can still be 0.95 similar
+    SEMANTIC_CACHE_ENABLED: bool = os.environ.get("SEMANTIC_CACHE_ENABLED", False)
+    SEMANTIC_CACHE_THRESHOLD: float = os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.95)
+    SEMANTIC_CACHE_MAX_ENTRIES: int = os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 2000)
+    SEMANTIC_CACHE_TTL_SECONDS: float = os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", 300)
+
+    # query rewrite cache and small-talk / keyword fast path
+    QUERY_REWRITE_CACHE_SIZE: int = os.environ.get("QUERY_REWRITE_CACHE_SIZE", 4096)
+    QUERY_REWRITE_CACHE_TTL_SECONDS: float = os.environ.get("QUERY_REWRITE_CACHE_TTL_SECONDS", 3600)
+    QUERY_REWRITE_FAST_PATH: bool = os.environ.get("QUERY_REWRITE_FAST_PATH", True)
+    QUERY_REWRITE_MAX_KEYWORD_TERMS: int = os.environ.get("QUERY_REWRITE_MAX_KEYWORD_TERMS", 6)
+
+    # websocket token streaming: with coalescing, tokens after the first are sent every
+    # STREAM_COALESCE_MS or once STREAM_COALESCE_CHARS characters are buffered
+    STREAM_COALESCING: bool = os.environ.get("STREAM_COALESCING", False)
+    STREAM_COALESCE_MS: float = os.environ.get("STREAM_COALESCE_MS", 30)
+    STREAM_COALESCE_CHARS: int = os.environ.get("STREAM_COALESCE_CHARS", 64)
+
+    # websocket framing: frames waiting for a slow client before producers are paused,
+    # and how long a closing connection waits for its queued frames
+    WEBSOCKET_SEND_QUEUE_SIZE: int = os.environ.get("WEBSOCKET_SEND_QUEUE_SIZE", 256)
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = os.environ.get("WEBSOCKET_SEND_TIMEOUT_SECONDS", 5.0)
+
     # optimized question
     OPTIMIZED_QUESTION_MODEL: str = os.environ.get("OPTIMIZED_QUESTION_MODEL", "gpt-4o-mini")
     MINIMUM_SCORE: float = float(os.environ.get("MINIMUM_SCORE", 0.5))
+    # token budget for the retrieved chunks packed into the answer prompt
+    CONTEXT_MAX_TOKENS: int = os.environ.get("CONTEXT_MAX_TOKENS", 3000)
 
     UPLOAD_FOLDER: str = os.environ.get("UPLOAD_FOLDER", "uploads")
     LOGS_FOLDER: str = os.environ.get("LOGS_FOLDER", "logs")
@@ -77,6 +192,16 @@ class Settings(BaseSettings):
     )
 
     MAX_TOKENS: int = os.environ.get("MAX_TOKENS", 1500)
+    TOKEN_COUNT_CACHE_SIZE: int = os.environ.get("TOKEN_COUNT_CACHE_SIZE", 50000)
+
+    # shared llm http clients
+    LLM_HTTP_MAX_CONNECTIONS: int = os.environ.get("LLM_HTTP_MAX_CONNECTIONS", 100)
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = os.environ.get("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", 20)
+    LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS: float = os.environ.get("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", 120)
+    LLM_HTTP_TIMEOUT_SECONDS: float = os.environ.get("LLM_HTTP_TIMEOUT_SECONDS", 120)
+    # keep-warm ping, off by default (0); keep it below the keep-alive expiry when enabled
+    LLM_KEEP_WARM_INTERVAL_SECONDS: float = os.environ.get("LLM_KEEP_WARM_INTERVAL_SECONDS", 0)
+
     # Modular Model Names
     LLMS: ClassVar[dict] = {
         "OPENAI_CHAT_MODEL_NAME": os.environ.get("OPENAI_CHAT_MODEL_NAME", "gpt-4o"),
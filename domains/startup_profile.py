@@ -0,0 +1,118 @@
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+# module prefix -> subsystem; the longest matching prefix wins, standard library
+# modules are grouped together and anything else by its top-level package
+SUBSYSTEMS = {
+    "domains.injestion": "app: ingestion",
+    "domains.retreival": "app: retrieval",
+    "domains.agents": "app: agents",
+    "domains": "app: core",
+    "langchain_core": "langchain-core",
+    "langchain_community": "langchain-community",
+    "langchain_openai": "langchain-openai",
+    "langchain_pinecone": "langchain-pinecone",
+    "langchain_text_splitters": "langchain-core",
+    "langchain": "langchain",
+    "langgraph": "langgraph",
+    "langsmith": "langchain-core",
+    "openai": "openai",
+    "tiktoken": "openai",
+    "pinecone": "pinecone",
+    "fitz": "pymupdf",
+    "pymupdf": "pymupdf",
+    "unstructured": "unstructured",
+    "tavily": "tavily",
+    "fastapi": "web",
+    "starlette": "web",
+    "uvicorn": "web",
+    "pydantic": "pydantic",
+    "pydantic_core": "pydantic",
+    "pydantic_settings": "pydantic",
+    "numpy": "numpy",
+    "aiohttp": "http clients",
+    "httpx": "http clients",
+    "httpcore": "http clients",
+    "requests": "http clients",
+    "urllib3": "http clients",
+}
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def subsystem(module: str) -> str:
+    for prefix in sorted(SUBSYSTEMS, key=len, reverse=True):
+        if module == prefix or module.startswith(prefix + "."):
+            return SUBSYSTEMS[prefix]
+    top_level = module.split(".")[0]
+    if top_level.lstrip("_") in sys.stdlib_module_names or top_level.startswith("_sysconfigdata"):
+        return "stdlib"
+    return top_level
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        if match := _IMPORTTIME_LINE.match(line):
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def profile_imports(module: str) -> List[ImportRecord]:
+    """Import `module` in a fresh interpreter with -X importtime and parse the report."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if not line.startswith("import time:")]
+        tail = "\n".join(errors[-20:])
+        raise Exception(f"Importing {module} failed:\n{tail}")
+    return parse_importtime(completed.stderr)
+
+
+def aggregate(records: List[ImportRecord]) -> Dict[str, dict]:
+    """Sum self time per subsystem; self times add up to the total import time."""
+    totals: Dict[str, dict] = defaultdict(lambda: {"self_us": 0, "modules": 0})
+    for record in records:
+        entry = totals[subsystem(record.module)]
+        entry["self_us"] += record.self_us
+        entry["modules"] += 1
+    return dict(sorted(totals.items(), key=lambda item: item[1]["self_us"], reverse=True))
+
+
+def print_report(module: str = "service", top_modules: int = 15) -> None:
+    records = profile_imports(module)
+    totals = aggregate(records)
+    total_us = sum(entry["self_us"] for entry in totals.values()) or 1
+
+    print(f"Import profile of `{module}`: {total_us / 1000:.1f} ms across {len(records)} modules\n")
+    print(f"{'subsystem':<24} {'ms':>9} {'share':>7} {'modules':>8}")
+    for name, entry in totals.items():
+        print(
+            f"{name:<24} {entry['self_us'] / 1000:>9.1f} "
+            f"{100 * entry['self_us'] / total_us:>6.1f}% {entry['modules']:>8}"
+        )
+
+    print(f"\nSlowest top-level imports (cumulative):")
+    top_level = sorted((r for r in records if r.depth == 0), key=lambda r: r.cumulative_us, reverse=True)
+    for record in top_level[:top_modules]:
+        print(f"{record.cumulative_us / 1000:>9.1f} ms  {record.module}")
+
+
+if __name__ == "__main__":
+    print_report(sys.argv[1] if len(sys.argv) > 1 else "service")
@@ -1,41 +1,187 @@
-import requests
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import aiohttp
 from loguru import logger
 
 from domains.models import RequestStatusEnum, RequestStatus
 from domains.settings import config_settings
 
 
-def call_update_status_api(
-        status_api_path: str,
-        request_status: RequestStatus,
-) -> None:
-    try:
-        status_api_url = f"{config_settings.API_HOSTNAME}/{status_api_path}"
-        logger.info(
-            f"Calling update status API with "
-            f"URL: {status_api_url} and "
-            f"API_PATH: {status_api_path} and "
-            f"data: {request_status}")
-
-        response = requests.post(
-            status_api_url,
-            json=request_status.model_dump(),
+@dataclass
+class _OutgoingStatus:
+    status_api_path: str
+    request_status: RequestStatus
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+class StatusCallbackClient:
+    """
+    Async client for the status callback API.
+
+    Updates go into a bounded outbox keyed by request_id, so a newer status for the
+    same request replaces one that has not been sent yet (including one waiting to be
+    retried). A single sender posts due updates over a shared, pooled aiohttp session,
+    never two for the same request_id at once, and retries connection errors, 429 and
+    5xx responses with jittered exponential backoff.
+    """
+
+    def __init__(
+            self,
+            base_url: Optional[str] = None,
+            pool_size: Optional[int] = None,
+            outbox_size: Optional[int] = None,
+            max_attempts: Optional[int] = None,
+            backoff_base: Optional[float] = None,
+            backoff_max: Optional[float] = None,
+            timeout: Optional[float] = None,
+    ):
+        self.base_url = base_url or config_settings.API_HOSTNAME
+        self.pool_size = int(pool_size or config_settings.STATUS_CALLBACK_POOL_SIZE)
+        self.outbox_size = int(outbox_size or config_settings.STATUS_CALLBACK_OUTBOX_SIZE)
+        self.max_attempts = int(max_attempts or config_settings.STATUS_CALLBACK_MAX_ATTEMPTS)
+        self.backoff_base = float(backoff_base or config_settings.STATUS_CALLBACK_BACKOFF_BASE_SECONDS)
+        self.backoff_max = float(backoff_max or config_settings.STATUS_CALLBACK_BACKOFF_MAX_SECONDS)
+        self.timeout = float(timeout or config_settings.STATUS_CALLBACK_TIMEOUT_SECONDS)
+        self.stats = {"submitted": 0, "coalesced": 0, "sent": 0, "retried": 0, "dropped": 0}
+
+        self._outbox: OrderedDict[int, _OutgoingStatus] = OrderedDict()
+        self._in_flight: Dict[int, asyncio.Task] = {}
+        self._changed = asyncio.Condition()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sender: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
         )
+        self._sender = asyncio.create_task(self._send_loop(), name="status-callback-sender")
+        logger.info(f"Status callback client started for {self.base_url}")
+
+    async def stop(self, flush_timeout: float = 10.0) -> None:
+        """Give queued updates up to `flush_timeout` seconds to go out, then close the session."""
+        try:
+            await asyncio.wait_for(self.flush(), timeout=flush_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Dropping {len(self._outbox)} unsent status updates on shutdown")
+
+        if self._sender is not None:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, *self._in_flight.values(), return_exceptions=True)
+            self._sender = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def flush(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._outbox and not self._in_flight)
+
+    async def submit(self, status_api_path: str, request_status: RequestStatus) -> None:
+        """Queue a status update; waits only while the outbox is full."""
+        if not status_api_path:
+            return
+
+        async with self._changed:
+            self.stats["submitted"] += 1
+            outgoing = _OutgoingStatus(status_api_path, request_status)
+            if request_status.request_id in self._outbox:
+                self.stats["coalesced"] += 1
+                self._outbox[request_status.request_id] = outgoing
+            else:
+                await self._changed.wait_for(lambda: len(self._outbox) < self.outbox_size)
+                self._outbox[request_status.request_id] = outgoing
+            self._changed.notify_all()
+
+    def _backoff(self, attempts: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+
+    async def _send_loop(self) -> None:
+        while True:
+            async with self._changed:
+                now = time.monotonic()
+                due = [
+                    request_id for request_id, outgoing in self._outbox.items()
+                    if outgoing.not_before <= now and request_id not in self._in_flight
+                ][:self.pool_size - len(self._in_flight)]
+
+                for request_id in due:
+                    outgoing = self._outbox.pop(request_id)
+                    self._in_flight[request_id] = asyncio.create_task(self._send(outgoing))
+                if due:
+                    self._changed.notify_all()
+
+                waiting = [
+                    outgoing.not_before for request_id, outgoing in self._outbox.items()
+                    if request_id not in self._in_flight
+                ]
+                timeout = max(0.0, min(waiting) - now) if waiting else None
+                # asyncio.timeout rather than wait_for, whose inner task can swallow the
+                # cancel from stop() on 3.11
+                try:
+                    async with asyncio.timeout(timeout):
+                        await self._changed.wait()
+                except TimeoutError:
+                    pass
+
+    async def _post(self, outgoing: _OutgoingStatus) -> bool:
+        """Returns True once the update is delivered or not worth retrying."""
+        status_api_url = f"{self.base_url}/{outgoing.status_api_path}"
+        try:
+            async with self._session.post(
+                status_api_url, json=outgoing.request_status.model_dump(mode="json")
+            ) as response:
+                text = await response.text()
+                if response.status == 200:
+                    logger.info(
+                        f"Successfully sent status {outgoing.request_status.status.value} "
+                        f"for request_id {outgoing.request_status.request_id} to {outgoing.status_api_path}"
+                    )
+                    self.stats["sent"] += 1
+                    return True
+                if response.status != 429 and response.status < 500:
+                    logger.error(
+                        f'Request failed for URL: {outgoing.status_api_path} for '
+                        f'data: "{outgoing.request_status}" with '
+                        f'status code: "{response.status}" and response: "{text}"'
+                    )
+                    self.stats["dropped"] += 1
+                    return True
+                logger.warning(f"Status API {outgoing.status_api_path} returned {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Status API {outgoing.status_api_path} unreachable: {e!r}")
+        return False
+
+    async def _send(self, outgoing: _OutgoingStatus) -> None:
+        request_id = outgoing.request_status.request_id
+        try:
+            if await self._post(outgoing):
+                return
+            outgoing.attempts += 1
+            if outgoing.attempts >= self.max_attempts:
+                logger.error(
+                    f"Giving up on status update for request_id {request_id} "
+                    f"after {outgoing.attempts} attempts"
+                )
+                self.stats["dropped"] += 1
+                return
+
+            async with self._changed:
+                # a newer update submitted meanwhile supersedes this one
+                if request_id not in self._outbox:
+                    outgoing.not_before = time.monotonic() + self._backoff(outgoing.attempts)
+                    self._outbox[request_id] = outgoing
+                    self.stats["retried"] += 1
+        finally:
+            async with self._changed:
+                self._in_flight.pop(request_id, None)
+                self._changed.notify_all()
+
 
-        if response.status_code == 200:
-            logger.info(
-                f'Successfully sent request for '
-                f'URL: {status_api_path} for '
-                f'data: "{request_status}" with '
-                f'response: "{response.text}"'
-            )
-        else:
-            logger.error(
-                f'Request failed for '
-                f'URL: {status_api_path} for '
-                f'data: "{request_status}" with '
-                f'status code: "{response.status_code}" and '
-                f'response: "{response.text}"'
-            )
-    except requests.exceptions.RequestException as e:
-        logger.exception("Error occurred during the API request", e)
\ No newline at end of file
+status_client = StatusCallbackClient()
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Sequence
+
+import tiktoken
+
+from domains.settings import config_settings
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model_name: Optional[str] = None) -> tiktoken.Encoding:
+    """Return the tiktoken encoding for `model_name`, built once per process."""
+    if model_name:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+def count_tokens(text: str, model_name: Optional[str] = None) -> int:
+    return len(get_encoding(model_name).encode_ordinary(text))
+
+
+class TokenCountCache:
+    """Bounded LRU of token counts keyed by (encoding, blake2b(text)), so texts are not retained."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._counts: OrderedDict[tuple, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(encoding_name: str, text: str) -> tuple:
+        return encoding_name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+            return count
+
+    def put(self, key: tuple, count: int) -> None:
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_size:
+                self._counts.popitem(last=False)
+
+
+_count_cache = TokenCountCache(int(config_settings.TOKEN_COUNT_CACHE_SIZE))
+
+
+def token_counts(texts: Sequence[str], model_name: Optional[str] = None) -> List[int]:
+    """
+    Token count of each text, memoised per text.
+
+    Texts not seen before are encoded together with `encode_ordinary_batch`, which
+    spreads the work over tiktoken's thread pool.
+    """
+    encoding = get_encoding(model_name)
+    keys = [TokenCountCache.key(encoding.name, text) for text in texts]
+    counts = [_count_cache.get(key) for key in keys]
+
+    missing: dict[tuple, List[int]] = {}
+    for i, count in enumerate(counts):
+        if count is None:
+            missing.setdefault(keys[i], []).append(i)
+    if missing:
+        positions = list(missing.values())
+        encoded = encoding.encode_ordinary_batch([texts[indices[0]] for indices in positions])
+        for indices, tokens in zip(positions, encoded):
+            _count_cache.put(keys[indices[0]], len(tokens))
+            for i in indices:
+                counts[i] = len(tokens)
+    return counts
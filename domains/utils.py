@@ -1,6 +1,6 @@
 import fastapi
 
-from langchain_openai import ChatOpenAI, AzureChatOpenAI
+from domains.llm_clients import get_llm
 from domains.settings import config_settings
 from domains.retreival.chat_handler import StreamingLLMCallbackHandler
 from loguru import logger
@@ -8,18 +8,10 @@ from loguru import logger
 def get_chat_model(model_key: str ="OPENAI_CHAT"):
     try:
         if config_settings.LLM_SERVICE == "openai":
-            return ChatOpenAI(
-                model=config_settings.LLMS.get(model_key, "gpt-4o"),
-                temperature=0.0,
-                api_key=config_settings.OPENAI_API_KEY,
-            )
+            return get_llm("openai", config_settings.LLMS.get(model_key, "gpt-4o"))
 
         elif config_settings.LLM_SERVICE == "azure_openai":
-            return ChatOpenAI(
-                model=config_settings.LLMS.get("SUMMARIZE_LLM_MODEL"),
-                temperature=0.0,
-                api_key=config_settings.OPENAI_API_KEY,
-            )
+            return get_llm("openai", config_settings.LLMS.get("SUMMARIZE_LLM_MODEL"))
 
     except Exception as e:
         logger.error(f"Error while getting chat model: {e}")
@@ -29,52 +21,45 @@ def get_chat_model(model_key: str ="OPENAI_CHAT"):
 
 def get_chat_model_streaming(model_key: str ="OPENAI_CHAT"):
     if config_settings.LLM_SERVICE == "openai":
-        return ChatOpenAI(
-            model=config_settings.LLMS.get("OPENAI_CHAT_MODEL_NAME"),
-            temperature=0.0,
-            api_key=config_settings.OPENAI_API_KEY,
-            streaming=True
-        )
+        return get_llm("openai", config_settings.LLMS.get("OPENAI_CHAT_MODEL_NAME"), streaming=True)
 
     elif config_settings.LLM_SERVICE == "azure_openai":
-        return ChatOpenAI(
-            model=config_settings.LLMS.get("SUMMARIZE_LLM_MODEL"),
-            temperature=0.0,
-            api_key=config_settings.OPENAI_API_KEY,
-            streaming=True
-        )
+        return get_llm("openai", config_settings.LLMS.get("SUMMARIZE_LLM_MODEL"), streaming=True)
 
 
-def get_chat_model_with_streaming(
-    websocket: fastapi.WebSocket,
+def get_streaming_chat_model(
     model_key: str = "OPENAI_CHAT",
     temperature: float = 0.0,
 ):
+    """
+    Shared streaming chat client. Pass the per-request StreamingLLMCallbackHandler at
+    invocation time: `chain.ainvoke(inputs, config={"callbacks": [handler]})`.
+    """
     try:
         if config_settings.LLM_SERVICE == "openai":
-            return ChatOpenAI(
-                model="gpt-4o",
-                temperature=temperature,
-                streaming=True,
-                callbacks=[StreamingLLMCallbackHandler(websocket)],
-                stream_usage=True,
-                api_key=config_settings.OPENAI_API_KEY,
-            )
+            return get_llm("openai", "gpt-4o", temperature, streaming=True)
 
         elif config_settings.LLM_SERVICE == "azure-openai":
-            return AzureChatOpenAI(
-                azure_endpoint=config_settings.AZURE_OPENAI_SETTINGS[model_key]["ENDPOINT"],
-                azure_deployment=config_settings.AZURE_OPENAI_SETTINGS[model_key][
-                    "DEPLOYMENT"
-                ],
-                api_key=config_settings.AZURE_OPENAI_SETTINGS[model_key]["API_KEY"],
-                api_version=config_settings.AZURE_OPENAI_SETTINGS[model_key]["API_VERSION"],
-                temperature=temperature,
-                model=config_settings.LLMS.get(model_key, ""),
+            return get_llm(
+                "azure-openai",
+                config_settings.LLMS.get(model_key, ""),
+                temperature,
                 streaming=True,
-                callbacks=[StreamingLLMCallbackHandler(websocket)],
+                azure_settings_key=model_key,
             )
 
     except Exception as e:
         logger.error(f"Failed to get chat model with streaming: {e}")
         raise
+
+
+def get_chat_model_with_streaming(
+    websocket: fastapi.WebSocket,
+    model_key: str = "OPENAI_CHAT",
+    temperature: float = 0.0,
+):
+    """Shared streaming client with the websocket handler bound as invocation config."""
+    llm = get_streaming_chat_model(model_key=model_key, temperature=temperature)
+    if llm is None:
+        return None
+    return llm.with_config(callbacks=[StreamingLLMCallbackHandler(websocket)])
@@ -1,18 +1,22 @@
+import asyncio
 import fastapi
 import loguru
 import uvicorn
 from fastapi import WebSocket, WebSocketDisconnect, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from langchain.vectorstores.base import VectorStore
-from typing import Optional, List
+from domains.app import lifespan, startup_state
 from domains.settings import config_settings
 from domains.injestion.routes import router as injestion_router
-from domains.retreival.routes import run_rag, RagUseCase, Message
+from domains.retreival.routes import run_rag, RagUseCase, Message, RAGError
+from domains.retreival.framing import open_frame_sender
+from domains.retreival.rag_util import send_message_over_websocket
+from domains.retreival.sessions import session_manager
+from domains import retreival
 from domains.agents.routes import react_orchestrator
 from loguru import logger
 
-app = fastapi.FastAPI()
-vectorstore: Optional[VectorStore] = None
+app = fastapi.FastAPI(lifespan=lifespan)
 
 
 # Add CORS Middleware
@@ -41,6 +45,46 @@ app.include_router(
 
 from fastapi import Query
 
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once background warmup has finished successfully, 503 before."""
+    return JSONResponse(
+        status_code=200 if startup_state.ready else 503,
+        content=startup_state.as_dict(),
+    )
+
+
+@app.get("/stats/query-rewrite")
+async def query_rewrite_stats():
+    """Query-rewrite cache hits, fast-path skips and estimated LLM time saved."""
+    from domains.retreival.query_rewrite import query_rewrite_cache
+
+    return query_rewrite_cache.stats()
+
+
+@app.get("/stats/semantic-cache")
+async def semantic_cache_stats():
+    """Semantic answer cache size, hit rate and invalidations."""
+    from domains.retreival.semantic_cache import semantic_answer_cache
+
+    return semantic_answer_cache.stats()
+
+
+@app.get("/stats/context-packing")
+async def context_packing_stats():
+    """Prompt tokens saved by the context packer and chunks it dropped."""
+    from domains.retreival.context_packer import context_packing_stats
+
+    return context_packing_stats.stats()
+
+
+@app.get("/stats/sessions")
+async def session_stats():
+    """Live, attached, created, resumed and evicted websocket chat sessions."""
+    return session_manager.stats()
+
+
 @app.get("/run_agents")
 async def get_run_agents(
     query: str = Query(..., description="The query or task to be processed by the agents"),
@@ -57,26 +101,75 @@ async def get_run_agents(
 
 @app.websocket("/ws/run_rag")
 async def websocket_run_rag(websocket: WebSocket):
-    """WebSocket endpoint for running RAG model queries."""
+    """
+    WebSocket endpoint for running RAG model queries.
+
+    The connection stays open for any number of questions, each a JSON message
+    {"question", "language", "namespace", "chat_context", "session_id"}. The first
+    message opens a session (or resumes `session_id` if it is still live) and its id
+    is sent back as an info/session frame. `chat_context` only seeds a new session;
+    later turns use the history kept on the server. {"action": "end_session"} ends the
+    session. A connection idle for SESSION_TTL_SECONDS is closed.
+    """
     await websocket.accept()
+    idle_timeout = float(config_settings.SESSION_TTL_SECONDS)
+    session = None
     try:
-        data = await websocket.receive_json()  # Receive parameters as JSON
-
-        # Run the RAG model
-        await run_rag(
-            language=data.get("language", "en"),
-            chat_context=data.get("chat_context", []),
-            websocket=websocket,
-            namespace=data.get("namespace", config_settings.PINECONE_DEFAULT_DEV_NAMESPACE),
-            question=data.get("question", ""),
-        )
+        async with open_frame_sender(websocket):
+            while True:
+                try:
+                    data = await asyncio.wait_for(websocket.receive_json(), timeout=idle_timeout)
+                except asyncio.TimeoutError:
+                    logger.info("Closing idle WebSocket session")
+                    await websocket.close(code=1000)
+                    break
+
+                if data.get("action") == "end_session":
+                    if session is not None:
+                        session_manager.close(session.session_id)
+                    await websocket.close(code=1000)
+                    break
+
+                if session is None:
+                    session = session_manager.open(
+                        session_id=data.get("session_id"),
+                        chat_context=[Message(**message) for message in data.get("chat_context") or []],
+                        namespace=data.get("namespace"),
+                        language=data.get("language", "en"),
+                    )
+                    await send_message_over_websocket(
+                        websocket, session.session_id, retreival.MESSAGE_TYPE_INFO, retreival.CONTENT_TYPE_SESSION
+                    )
+
+                # Run the RAG model; its frames go through a bounded per-connection send queue
+                try:
+                    await run_rag(
+                        language=data.get("language", session.language),
+                        websocket=websocket,
+                        namespace=data.get("namespace", session.namespace or config_settings.PINECONE_DEFAULT_DEV_NAMESPACE),
+                        question=data.get("question", ""),
+                        session=session,
+                    )
+                except RAGError as e:
+                    # the error frame has been sent; keep the session for the next question
+                    logger.error(f"RAG turn failed in session {session.session_id}: {e}")
     except WebSocketDisconnect:
-        print("Client disconnected")
+        logger.info("Client disconnected")
     except Exception as e:
-        print(f"Error: {e}")
+        logger.error(f"Error: {e}")
         await websocket.close(code=1011)  # 1011 = Internal Server Error
+    finally:
+        if session is not None:
+            session_manager.detach(session)
 
 
 if __name__ == "__main__":
-    uvicorn.run("service:app", host="0.0.0.0", port=8081)
+    import sys
+
+    if "--profile-startup" in sys.argv:
+        from domains.startup_profile import print_report
+
+        print_report("service")
+    else:
+        uvicorn.run("service:app", host="0.0.0.0", port=8081)
 
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+import tiktoken
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# one token per byte, with words and whitespace pre-split the way cl100k does; built in
+# memory so the tests do not download the tiktoken vocabularies
+BYTE_ENCODING = tiktoken.Encoding(
+    "test-bytes",
+    pat_str=r"""'s|'t| ?\w+| ?[^\s\w]+|\s+""",
+    mergeable_ranks={bytes([i]): i for i in range(256)},
+    special_tokens={},
+)
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    from domains import tokenizer
+    from domains.injestion import text_splitter
+
+    monkeypatch.setattr(tokenizer, "get_encoding", lambda model_name=None: BYTE_ENCODING)
+    monkeypatch.setattr(text_splitter, "get_encoding", lambda model_name=None: BYTE_ENCODING)
+    return BYTE_ENCODING
@@ -0,0 +1,105 @@
+import math
+from collections import Counter
+
+import pytest
+
+from domains.injestion.bm25_index import BM25Index, tokenize
+
+CHUNKS = [
+    "The refund window is 30 days from delivery",
+    "Refunds are paid to the original card within 5 days",
+    "Shipping takes 3-5 business days; express shipping takes 1 day",
+    "Contact support@example.com about order A-1234",
+    "Gift cards cannot be refunded or exchanged for cash",
+    "Delivery is free on orders over 50 EUR",
+]
+
+
+def brute_force_bm25(texts, query, k1, b):
+    documents = [tokenize(text) for text in texts]
+    average_length = sum(map(len, documents)) / len(documents)
+    scores = []
+    for tokens in documents:
+        counts = Counter(tokens)
+        score = 0.0
+        for term in set(tokenize(query)):
+            frequency = sum(1 for other in documents if term in other)
+            if not counts[term]:
+                continue
+            idf = math.log1p((len(documents) - frequency + 0.5) / (frequency + 0.5))
+            tf = counts[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+    return scores
+
+
+def build(path, texts, commit_every=None):
+    index = BM25Index(str(path), k1=1.2, b=0.75)
+    step = commit_every or len(texts)
+    for start in range(0, len(texts), step):
+        batch = texts[start:start + step]
+        index.add([str(start + i) for i in range(len(batch))], batch, [{"n": start + i} for i in range(len(batch))])
+        index.commit()
+    return index
+
+
+def test_tokenize_keeps_identifiers_and_drops_stop_words():
+    assert tokenize("Mail support@example.com about A-1234 and the 3.5 release") == \
+        ["mail", "support@example.com", "about", "a-1234", "3.5", "release"]
+
+
+@pytest.mark.parametrize("commit_every", [None, 1, 2], ids=["one-segment", "merged-1", "merged-2"])
+@pytest.mark.parametrize("query", ["refund days", "shipping", "support@example.com A-1234", "delivery free"])
+def test_scores_match_brute_force(tmp_path, commit_every, query):
+    index = build(tmp_path / "ns", CHUNKS, commit_every)
+    expected = brute_force_bm25(CHUNKS, query, 1.2, 0.75)
+
+    results = index.search(query, k=len(CHUNKS))
+
+    assert len(index) == len(CHUNKS)
+    assert {document.metadata["n"]: score for document, score in results} == \
+        pytest.approx({n: score for n, score in enumerate(expected) if score > 0}, rel=1e-5)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_merges_keep_segment_count_logarithmic(tmp_path):
+    index = build(tmp_path / "ns", CHUNKS * 4, commit_every=1)
+    assert len(index._segments) <= math.ceil(math.log2(len(CHUNKS) * 4)) + 1
+
+
+def test_reader_sees_other_writers_commits(tmp_path):
+    writer, reader = BM25Index(str(tmp_path / "ns")), BM25Index(str(tmp_path / "ns"))
+    assert reader.search("refund") == []
+
+    writer.add(["a"], [CHUNKS[0]])
+    writer.commit()
+    assert [document.id for document, _ in reader.search("refund")] == ["a"]
+
+    writer.add(["b"], ["refund refund refund"])
+    writer.commit()
+    results = reader.search("refund")
+    assert [document.id for document, _ in results] == ["b", "a"]
+    assert results[0][0].page_content == "refund refund refund"
+
+
+def test_uncommitted_bytes_from_a_crashed_writer_are_discarded(tmp_path):
+    index = build(tmp_path / "ns", CHUNKS[:2])
+    with open(tmp_path / "ns" / "docs.jsonl", "ab") as docs_file:
+        docs_file.write(b'{"id": "torn", "page_con')
+
+    index = BM25Index(str(tmp_path / "ns"))
+    index.add(["c"], [CHUNKS[2]])
+    index.commit()
+
+    reopened = BM25Index(str(tmp_path / "ns"))
+    assert [reopened.document(row).id for row in range(len(reopened))] == ["0", "1", "c"]
+
+
+def test_chunks_of_an_abandoned_writer_are_never_committed(tmp_path):
+    failed_job, next_job = BM25Index(str(tmp_path / "ns")), BM25Index(str(tmp_path / "ns"))
+    failed_job.add(["partial"], ["refund for a job that failed mid-ingest"])
+
+    next_job.add(["a"], [CHUNKS[0]])
+    next_job.commit()
+
+    assert [document.id for document, _ in BM25Index(str(tmp_path / "ns")).search("refund")] == ["a"]
@@ -0,0 +1,65 @@
+import asyncio
+import json
+import uuid
+
+from domains import retreival
+from domains.retreival.chat_handler import StreamingLLMCallbackHandler
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send_text(self, text: str) -> None:
+        self.messages.append(json.loads(text))
+
+
+async def stream_tokens(handler, tokens, gap=0.0):
+    run_id = uuid.uuid4()
+    await handler.on_llm_start({}, ["prompt"], run_id=run_id)
+    for token in tokens:
+        await handler.on_llm_new_token(token)
+        if gap:
+            await asyncio.sleep(gap)
+    await handler.on_llm_end(None, run_id=run_id)
+
+
+def test_coalescing_sends_first_token_alone_then_batches():
+    tokens = [f"tok{i} " for i in range(40)]
+
+    async def run():
+        websocket = RecordingWebSocket()
+        handler = StreamingLLMCallbackHandler(websocket, coalesce=True, coalesce_ms=10_000, coalesce_chars=30)
+        await stream_tokens(handler, tokens)
+        return [message["message"] for message in websocket.messages], handler
+
+    frames, handler = asyncio.run(run())
+    assert frames[0] == tokens[0]
+    assert "".join(frames) == "".join(tokens)
+    assert all(len(frame) >= 30 for frame in frames[1:-1])
+    assert handler.tokens == 40
+    assert handler.frames == len(frames) < 40
+
+
+def test_coalescing_flushes_on_the_timer():
+    async def run():
+        websocket = RecordingWebSocket()
+        handler = StreamingLLMCallbackHandler(websocket, coalesce=True, coalesce_ms=5, coalesce_chars=10_000)
+        await stream_tokens(handler, ["a", "b", "c", "d"], gap=0.02)
+        return [message["message"] for message in websocket.messages]
+
+    frames = asyncio.run(run())
+    # every gap outlasts the timer, so nothing waits for the character threshold
+    assert frames == ["a", "b", "c", "d"]
+
+
+def test_without_coalescing_every_token_is_a_frame():
+    async def run():
+        websocket = RecordingWebSocket()
+        handler = StreamingLLMCallbackHandler(websocket, coalesce=False)
+        await stream_tokens(handler, ["a", "b", "c"])
+        return websocket.messages
+
+    messages = asyncio.run(run())
+    assert [message["message"] for message in messages] == ["a", "b", "c"]
+    assert {message["type"] for message in messages} == {retreival.MESSAGE_TYPE_STREAM}
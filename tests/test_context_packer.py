@@ -0,0 +1,62 @@
+from langchain_core.documents import Document
+
+from domains.retreival.context_packer import MIN_OVERLAP_CHARS, overlap_length, pack_context, strip_overlap
+
+TEXT = " ".join(f"word{i}" for i in range(400))
+
+
+def chunk(chunk_id: str, text: str, file_name: str = "report.pdf", page: int = 0) -> Document:
+    return Document(
+        page_content=text,
+        metadata={"chunk_id": chunk_id, "file_name": file_name, "title": "Report", "page": page},
+    )
+
+
+def test_overlap_length():
+    assert overlap_length(TEXT[:1200], TEXT[1000:2200]) == 200
+    assert overlap_length(TEXT[:1200], TEXT[1300:2200]) == 0
+    # shorter shared text is not treated as splitter overlap
+    assert overlap_length("x" * 10 + "tail", "tail" + "y" * 100) == 0
+    assert overlap_length("a" * MIN_OVERLAP_CHARS, "a" * MIN_OVERLAP_CHARS) == MIN_OVERLAP_CHARS
+
+
+def test_strip_overlap():
+    assert strip_overlap(TEXT[100:200], [TEXT[:1200]]) is None
+    assert strip_overlap(TEXT[1000:2200], [TEXT[:1200]]) == TEXT[1200:2200].strip()
+    assert strip_overlap(TEXT[1000:2200], [TEXT[2000:3000]]) == TEXT[1000:2000].strip()
+
+
+def test_pack_context_dedups_filters_and_orders(byte_encoding):
+    first, second = TEXT[:1200], TEXT[1000:2200]
+    packed = pack_context(
+        [
+            (chunk("b", second, page=1), 0.85),
+            (chunk("low", "below the minimum score"), 0.3),
+            (chunk("a", first), 0.9),
+            (chunk("a", first), 0.8),
+            (chunk("other", TEXT[:1200], file_name="other.pdf"), 0.7),
+        ],
+        minimum_score=0.5,
+        max_tokens=100_000,
+    )
+
+    assert [document.metadata["chunk_id"] for document, _ in packed.documents] == ["a", "b", "other"]
+    assert (packed.below_score, packed.duplicates, packed.over_budget) == (1, 1, 0)
+    sections = packed.text.split("\n\n")
+    assert sections[0] == f"[1] Report, p.1\n{first}"
+    # the 200 characters shared with chunk a are cut from chunk b
+    assert sections[1] == f"[2] Report, p.2\n{TEXT[1200:2200].strip()}"
+    # the same text from another file is kept
+    assert sections[2].endswith(TEXT[:1200])
+    assert packed.tokens_saved > 0
+
+
+def test_pack_context_respects_token_budget(byte_encoding):
+    documents = [(chunk(str(i), TEXT[i * 1000:i * 1000 + 500], file_name=f"{i}.pdf"), 1.0 - i / 10) for i in range(3)]
+    one_section = len(byte_encoding.encode_ordinary(f"[0] Report, p.1\n{documents[0][0].page_content}"))
+
+    packed = pack_context(documents, max_tokens=one_section + 10)
+
+    assert len(packed.documents) == 1
+    assert packed.over_budget == 2
+    assert packed.tokens <= one_section + 10
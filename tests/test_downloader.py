@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from domains.injestion.downloader import DownloadCache, DownloadError, Downloader
+
+BODY = b"%PDF-1.7 refund policy " * 100
+
+
+def sha256(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def md5_etag(body: bytes) -> str:
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+@asynccontextmanager
+async def serve(responses):
+    """Serve /file.pdf from `responses`, one (body, headers) per request; the last one repeats."""
+    served = []
+
+    async def handler(request):
+        body, headers = responses[min(len(served), len(responses) - 1)]
+        served.append(request.query_string)
+        response = web.StreamResponse(headers=headers)
+        response.content_length = int(headers.get("X-Content-Length", len(body)))
+        await response.prepare(request)
+        await response.write(body)
+        if response.content_length != len(body):
+            request.transport.close()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/file.pdf", handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield str(server.make_url("/file.pdf?X-Amz-Signature=abc")), served
+    finally:
+        await server.close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record retry backoffs instead of waiting them out."""
+    delays, sleep = [], asyncio.sleep
+
+    async def record(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", record)
+    return delays
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    return Downloader(DownloadCache(str(tmp_path / "downloads"), max_bytes=10 ** 6), chunk_size=256, timeout=10)
+
+
+def fill(cache, body, key):
+    partial = cache.partial_path()
+    with open(partial, "wb") as file:
+        file.write(body)
+    cache.store(partial, sha256(body), len(body), key)
+
+
+@pytest.mark.parametrize("first", [
+    (BODY[:100], {"X-Content-Length": str(len(BODY))}),
+    (b"tampered" + BODY[8:], {"ETag": md5_etag(BODY)}),
+], ids=["content-length", "md5-etag"])
+def test_mismatched_body_is_retried(downloader, sleeps, first):
+    async def run():
+        async with serve([first, (BODY, {"ETag": md5_etag(BODY)})]) as (url, served):
+            return await downloader.fetch(url), len(served)
+
+    assert asyncio.run(run()) == (sha256(BODY), 2)
+    assert 1 in sleeps
+    assert os.listdir(downloader.cache.partial_dir) == []
+
+
+def test_body_that_never_matches_fails_after_all_retries(downloader, sleeps):
+    async def run():
+        async with serve([(b"tampered", {"ETag": md5_etag(BODY)})]) as (url, served):
+            with pytest.raises(DownloadError):
+                await downloader.fetch(url)
+            return len(served)
+
+    assert asyncio.run(run()) == 3
+    assert [delay for delay in sleeps if delay] == [1, 2]
+
+
+def test_cache_hit_does_not_read_the_body(downloader, monkeypatch):
+    # same URL path and ETag, different body and signature: the cached object is served
+    responses = [(BODY, {"ETag": '"v1-etag"'}), (b"not read", {"ETag": '"v1-etag"'})]
+
+    async def run():
+        async with serve(responses) as (url, served):
+            first = await downloader.fetch(url)
+            monkeypatch.setattr(downloader.cache, "partial_path", lambda: pytest.fail("body was read"))
+            second = await downloader.fetch(url.replace("abc", "def"))
+            return first, second, len(served)
+
+    assert asyncio.run(run()) == (sha256(BODY), sha256(BODY), 2)
+
+
+def test_eviction_drops_least_recently_used_but_spares_keep(tmp_path):
+    cache = DownloadCache(str(tmp_path / "downloads"), max_bytes=10)
+    a, b, c = b"aaaa", b"bbbb", b"cccc"
+    fill(cache, a, "a")
+    fill(cache, b, "b")
+    assert cache.lookup("a") == sha256(a)
+
+    fill(cache, c, "c")
+    assert (cache.lookup("a"), cache.lookup("b"), cache.lookup("c")) == (sha256(a), None, sha256(c))
+
+    # larger than the whole cache: everything else goes, the new object stays
+    big = b"x" * 20
+    fill(cache, big, None)
+    assert os.listdir(cache.objects_dir) == [sha256(big)]
+    assert cache.lookup("a") is None
+
+    # objects without an ETag are indexed by content, so they are evicted in turn
+    fill(cache, a, "a")
+    assert os.listdir(cache.objects_dir) == [sha256(a)]
+
+
+def test_fetch_into_fetches_again_if_evicted_before_the_link(downloader, monkeypatch):
+    link, evictions = downloader.cache.link, []
+
+    def evict_first(sha, path):
+        if not evictions:
+            evictions.append(sha)
+            os.remove(downloader.cache.object_path(sha))
+        return link(sha, path)
+
+    monkeypatch.setattr(downloader.cache, "link", evict_first)
+
+    async def run():
+        async with serve([(BODY, {"ETag": md5_etag(BODY)})]) as (url, served):
+            with downloader.cache.lease() as lease_dir:
+                path = await downloader.fetch_into(url, lease_dir)
+                with open(path, "rb") as file:
+                    return file.read(), len(served)
+
+    assert asyncio.run(run()) == (BODY, 2)
+    assert evictions == [sha256(BODY)]
+
+
+def test_lease_directory_is_removed_but_the_object_stays(downloader):
+    async def run():
+        async with serve([(BODY, {"ETag": md5_etag(BODY)})]) as (url, _):
+            async with downloader.open(url) as path:
+                assert os.path.basename(path) == "file.pdf"
+                with open(path, "rb") as file:
+                    assert file.read() == BODY
+                lease_dir = os.path.dirname(path)
+            with pytest.raises(RuntimeError):
+                async with downloader.open(url):
+                    raise RuntimeError("parser failed")
+        return lease_dir
+
+    lease_dir = asyncio.run(run())
+    assert not os.path.exists(lease_dir)
+    assert os.listdir(downloader.cache.leases_dir) == []
+    assert os.listdir(downloader.cache.objects_dir) == [sha256(BODY)]
@@ -0,0 +1,60 @@
+import multiprocessing
+
+from langchain_core.embeddings import Embeddings
+
+from domains.injestion import embedding_cache
+from domains.injestion.embedding_cache import CachedEmbeddings, EmbeddingCacheStore
+
+
+class LengthEmbeddings(Embeddings):
+    def embed_documents(self, texts):
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def ingest(path):
+    """Runs in a separate process, which exits without reading its stats."""
+    embeddings = embedding_cache.wrap_with_cache(LengthEmbeddings, "child-model", path, 16, stats_flush_every=1000)
+    embeddings.embed_documents(["a", "bb"])
+    embeddings.embed_documents(["a"])
+
+
+def test_lookups_are_flushed_every_n_not_on_each_call(tmp_path):
+    store = EmbeddingCacheStore(str(tmp_path / "cache.sqlite3"))
+    embeddings = CachedEmbeddings(LengthEmbeddings(), "m", store, stats_flush_every=5, stats_flush_seconds=3600)
+
+    for text in ["a", "b", "c", "a"]:
+        embeddings.embed_query(text)
+    assert store.read_stats() == {}
+
+    embeddings.embed_documents(["d"])
+    assert store.read_stats()["m"]["misses"] == 4
+
+    stats = embeddings.stats()
+    assert (stats["misses"], stats["query_lru_hits"], stats["hits"]) == (4, 1, 1)
+
+
+def test_lookups_are_flushed_once_the_interval_passed(tmp_path):
+    store = EmbeddingCacheStore(str(tmp_path / "cache.sqlite3"))
+    embeddings = CachedEmbeddings(LengthEmbeddings(), "m", store, stats_flush_every=1000, stats_flush_seconds=0)
+
+    embeddings.embed_query("a")
+
+    assert store.read_stats()["m"]["misses"] == 1
+
+
+def test_stats_include_other_processes_and_unflushed_local_counters(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    process = multiprocessing.get_context("spawn").Process(target=ingest, args=(path,))
+    process.start()
+    process.join()
+    local = embedding_cache.wrap_with_cache(LengthEmbeddings, "api-model", path, 16, stats_flush_every=1000)
+    local.embed_query("a")
+    local.embed_query("a")
+
+    stats = {entry["model"]: entry for entry in embedding_cache.get_embedding_cache_stats(path)}
+
+    assert (stats["child-model"]["misses"], stats["child-model"]["store_hits"]) == (2, 1)
+    assert (stats["api-model"]["misses"], stats["api-model"]["query_lru_hits"]) == (1, 1)
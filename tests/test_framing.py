@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from domains import retreival
+from domains.retreival.chat_response import ChatResponse
+from domains.retreival.framing import FrameSendError, FrameSender, encode_frame, open_frame_sender, send_frame
+
+
+class RecordingWebSocket:
+    def __init__(self, fail_after: int = None, delay: float = 0.0):
+        self.messages = []
+        self.fail_after = fail_after
+        self.delay = delay
+        self.state = type("State", (), {})()
+
+    async def send_text(self, text: str) -> None:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail_after is not None and len(self.messages) >= self.fail_after:
+            raise ConnectionError("client went away")
+        self.messages.append(json.loads(text))
+
+
+@pytest.mark.parametrize("message", ["", "plain", 'quotes " and \\ backslashes', "ünïcode ✓\nnew line"])
+@pytest.mark.parametrize("message_type, content_type", [
+    (retreival.MESSAGE_TYPE_STREAM, retreival.CONTENT_TYPE_TEXT_PLAIN),
+    (retreival.MESSAGE_TYPE_START, None),
+    (retreival.MESSAGE_TYPE_END, retreival.CONTENT_TYPE_ANSWER),
+])
+def test_encode_frame_matches_chat_response(message, message_type, content_type):
+    frame = encode_frame(message, message_type, content_type)
+    expected = ChatResponse(message=message, type=message_type, content_type=content_type).model_dump()
+
+    assert json.loads(frame) == expected
+    assert list(json.loads(frame)) == list(expected)
+
+
+def test_encode_frame_rejects_unknown_types():
+    with pytest.raises(ValueError):
+        encode_frame("x", "unknown")
+
+
+def test_frame_sender_keeps_order_and_applies_backpressure():
+    async def run():
+        websocket = RecordingWebSocket(delay=0.001)
+        sender = FrameSender(websocket, max_frames=2)
+        sender.start()
+        for i in range(10):
+            await sender.send(encode_frame(str(i)))
+        await sender.close()
+        return websocket.messages, sender
+
+    messages, sender = asyncio.run(run())
+    assert [message["message"] for message in messages] == [str(i) for i in range(10)]
+    assert sender.frames_sent == 10
+    assert sender.send_waits > 0
+
+
+def test_frame_sender_reports_a_failed_connection():
+    async def run():
+        websocket = RecordingWebSocket(fail_after=1)
+        async with open_frame_sender(websocket) as sender:
+            await send_frame(websocket, encode_frame("first"))
+            await send_frame(websocket, encode_frame("second"))
+            await sender.flush()
+            with pytest.raises(FrameSendError):
+                await send_frame(websocket, encode_frame("third"))
+        return websocket.messages
+
+    assert [message["message"] for message in asyncio.run(run())] == ["first"]
@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.documents import Document
+
+from domains.retreival.fusion import RRF_K, document_key, reciprocal_rank_fusion, weighted_score_fusion
+
+
+def chunk(chunk_id: str) -> Document:
+    return Document(page_content=f"text of {chunk_id}", metadata={"chunk_id": chunk_id})
+
+
+def ids(fused):
+    return [document.metadata["chunk_id"] for document, _ in fused]
+
+
+def test_document_key_prefers_chunk_id_then_id_then_content():
+    assert document_key(Document(page_content="x", id="doc", metadata={"chunk_id": "c"})) == "c"
+    assert document_key(Document(page_content="x", id="doc")) == "doc"
+    assert document_key(Document(page_content="x")) == document_key(Document(page_content="x"))
+    assert document_key(Document(page_content="x")) != document_key(Document(page_content="y"))
+
+
+def test_rrf_sums_reciprocal_ranks_across_lists():
+    fused = reciprocal_rank_fusion([
+        [chunk("a"), chunk("b"), chunk("c")],
+        [(chunk("b"), 0.9), (chunk("d"), 0.8)],
+    ])
+
+    scores = dict(zip(ids(fused), (score for _, score in fused)))
+    assert ids(fused)[0] == "b"
+    assert scores["b"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert scores["a"] == pytest.approx(1 / (RRF_K + 1))
+    assert scores["d"] == pytest.approx(1 / (RRF_K + 2))
+    assert set(scores) == {"a", "b", "c", "d"}
+
+
+def test_rrf_ignores_scores_and_respects_limit():
+    fused = reciprocal_rank_fusion(
+        [[(chunk("a"), 0.1), (chunk("b"), 100.0)], [(chunk("a"), 0.0)]],
+        limit=1,
+    )
+    assert ids(fused) == ["a"]
+
+
+def test_weighted_fusion_normalises_each_list():
+    dense = [(chunk("a"), 0.9), (chunk("b"), 0.8), (chunk("c"), 0.7)]
+    keyword = [(chunk("c"), 12.0), (chunk("d"), 2.0)]
+
+    fused = weighted_score_fusion([dense, keyword], [0.5, 0.5])
+    scores = dict(zip(ids(fused), (score for _, score in fused)))
+
+    # c is last among the dense hits (0) but first among the keyword hits (1)
+    assert scores == pytest.approx({"a": 0.5, "b": 0.25, "c": 0.5, "d": 0.0})
+    assert ids(fused)[-1] == "d"
+
+
+def test_weighted_fusion_treats_flat_and_empty_lists():
+    flat = [(chunk("a"), 0.3), (chunk("b"), 0.3)]
+    fused = weighted_score_fusion([flat, []], [0.7, 0.3])
+    assert [score for _, score in fused] == pytest.approx([0.7, 0.7])
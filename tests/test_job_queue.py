@@ -0,0 +1,170 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import aiosqlite
+import pytest
+
+from domains.injestion import job_queue
+from domains.injestion.job_queue import IngestionJobQueue, owner_is_dead
+from domains.injestion.models import InjestRequestDto, JobState
+
+REQUEST = {
+    "response_data_api_path": "status",
+    "pre_signed_url": "https://example.com/file.pdf",
+    "file_name": "file.pdf",
+    "original_file_name": "file.pdf",
+    "file_type": "pdf",
+    "process_type": "pdf",
+    "params": {},
+}
+
+
+def request(request_id: int) -> InjestRequestDto:
+    return InjestRequestDto.model_validate({"request_id": request_id, **REQUEST})
+
+
+@pytest.fixture
+def make_queue(tmp_path, monkeypatch):
+    """Queues over one database whose jobs run `job` in threads instead of worker processes."""
+    def make(job, **kwargs):
+        monkeypatch.setattr(job_queue, "run_ingestion_job", job)
+        queue = IngestionJobQueue(path=str(tmp_path / "jobs.sqlite3"), poll_interval=0.02, **kwargs)
+        queue._new_pool = lambda: ThreadPoolExecutor(max_workers=queue.workers)
+        return queue
+    return make
+
+
+def completed(payload: str) -> dict:
+    return {"status": "COMPLETED"}
+
+
+def worker_died(payload: str) -> dict:
+    raise BrokenProcessPool("a child process terminated abruptly")
+
+
+async def wait_until_settled(queue, request_ids, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = [await queue.get(request_id) for request_id in request_ids]
+        if all(job.state in (JobState.COMPLETED, JobState.FAILED) for job in jobs):
+            return jobs
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"jobs did not finish: {jobs}")
+
+
+def test_owner_is_dead():
+    host = socket.gethostname()
+    assert not owner_is_dead(f"{host}:{os.getpid()}:boot")
+    assert owner_is_dead(f"{host}:999999999:boot")
+    # pids on other hosts cannot be checked
+    assert not owner_is_dead("another-host:999999999:boot")
+    assert not owner_is_dead(None)
+
+
+def test_jobs_complete_and_hooks_run(make_queue):
+    async def run():
+        queue = make_queue(completed, workers=2)
+        finished = []
+
+        async def hook(request, result):
+            finished.append(request.request_id)
+
+        queue.completion_hooks.append(hook)
+        await queue.start()
+        try:
+            for request_id in range(4):
+                await queue.enqueue(request(request_id))
+            jobs = await wait_until_settled(queue, range(4))
+        finally:
+            await queue.stop()
+        return jobs, finished
+
+    jobs, finished = asyncio.run(run())
+    assert [job.state for job in jobs] == [JobState.COMPLETED] * 4
+    assert sorted(finished) == [0, 1, 2, 3]
+
+
+def test_job_that_keeps_killing_workers_is_failed(make_queue):
+    async def run():
+        queue = make_queue(worker_died, workers=1, max_attempts=3)
+        await queue.start()
+        try:
+            await queue.enqueue(request(1))
+            [job] = await wait_until_settled(queue, [1])
+        finally:
+            await queue.stop()
+        return job
+
+    job = asyncio.run(run())
+    assert job.state == JobState.FAILED
+    assert job.attempts == 3
+    assert "died on each of 3 attempts" in job.error_detail
+
+
+def test_start_recovers_only_jobs_whose_owner_is_gone(make_queue, tmp_path):
+    host, now = socket.gethostname(), time.time()
+    running = {
+        10: (f"{host}:{os.getpid()}:live", now),  # this process, fresh heartbeat
+        11: (f"{host}:999999999:dead", now),  # pid no longer exists
+        12: ("another-host:1:boot", now - 3600),  # heartbeat went stale
+        13: ("another-host:1:boot", now),  # another host, still beating
+    }
+
+    async def run():
+        # create the schema, then plant RUNNING jobs as other server processes left them
+        queue = make_queue(completed, workers=1)
+        await queue.start()
+        await queue.stop()
+        async with aiosqlite.connect(queue.path) as db:
+            for request_id, (owner, heartbeat_at) in running.items():
+                await db.execute(
+                    "INSERT INTO ingestion_jobs (request_id, payload, state, attempts, owner, heartbeat_at,"
+                    " created_at, updated_at) VALUES (?, ?, 'RUNNING', 1, ?, ?, ?, ?)",
+                    (request_id, request(request_id).model_dump_json(), owner, heartbeat_at, now, now),
+                )
+            await db.commit()
+
+        queue = make_queue(completed, workers=1)
+        await queue.start()
+        try:
+            await wait_until_settled(queue, [11, 12])
+            return {request_id: (await queue.get(request_id)).state for request_id in running}
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(run()) == {
+        10: JobState.RUNNING,
+        11: JobState.COMPLETED,
+        12: JobState.COMPLETED,
+        13: JobState.RUNNING,
+    }
+
+
+def test_admission_control_counts_queued_and_running_jobs(make_queue):
+    release = threading.Event()
+
+    def blocked(payload: str) -> dict:
+        release.wait(5)
+        return completed(payload)
+
+    async def run():
+        queue = make_queue(blocked, workers=1, max_backlog=2)
+        await queue.start()
+        try:
+            await queue.enqueue(request(1))
+            await queue.enqueue(request(2))
+            with pytest.raises(job_queue.QueueFullError):
+                await queue.enqueue(request(3))
+            release.set()
+            await wait_until_settled(queue, [1, 2])
+            await queue.enqueue(request(3))
+        finally:
+            release.set()
+            await queue.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,48 @@
+import numpy as np
+
+from domains.injestion.local_vector_store import normalise_vectors
+from domains.retreival.mmr import maximal_marginal_relevance
+
+
+def brute_force_mmr(query, candidates, k, lambda_mult):
+    """The textbook double loop the vectorised version replaces; the most relevant candidate goes first."""
+    query = normalise_vectors(query)[0]
+    candidates = normalise_vectors(candidates)
+    selected = [int(np.argmax(candidates @ query))]
+    while len(selected) < min(k, len(candidates)):
+        best, best_score = None, -np.inf
+        for i, candidate in enumerate(candidates):
+            if i in selected:
+                continue
+            redundancy = max((candidate @ candidates[j] for j in selected), default=0.0)
+            score = lambda_mult * (candidate @ query) - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+    return selected
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(7)
+    for lambda_mult in (0.0, 0.3, 0.5, 1.0):
+        query = rng.standard_normal(16)
+        candidates = rng.standard_normal((40, 16))
+        assert maximal_marginal_relevance(query, candidates, 8, lambda_mult) == \
+            brute_force_mmr(query, candidates, 8, lambda_mult)
+
+
+def test_skips_near_duplicates():
+    query = np.array([1.0, 0.0, 0.0])
+    candidates = np.array([
+        [1.0, 0.05, 0.0],
+        [1.0, 0.06, 0.0],  # near copy of the first
+        [0.7, 0.0, 0.7],
+    ])
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=0.5) == [0, 2]
+    assert maximal_marginal_relevance(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+
+
+def test_edge_cases():
+    assert maximal_marginal_relevance([1.0, 0.0], [], 3) == []
+    assert maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0]], 0) == []
+    assert sorted(maximal_marginal_relevance([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], 5)) == [0, 1]
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from domains.retreival.query_rewrite import NO_RETRIEVAL, QueryKind, QueryRewriteCache, classify_query
+
+CLASSIFIED = [
+    ("hi", QueryKind.DIRECT_ANSWER),
+    ("Hello there!", QueryKind.DIRECT_ANSWER),
+    ("ok thanks", QueryKind.DIRECT_ANSWER),
+    ("Great, thank you so much!", QueryKind.DIRECT_ANSWER),
+    ("got it, bye", QueryKind.DIRECT_ANSWER),
+    ("perfect", QueryKind.DIRECT_ANSWER),
+    ("   ", QueryKind.DIRECT_ANSWER),
+    ("refund policy", QueryKind.KEYWORDS),
+    ("A-1234 invoice status", QueryKind.KEYWORDS),
+    ("support@example.com", QueryKind.KEYWORDS),
+    ("thanks, what is the refund window?", QueryKind.NEEDS_REWRITE),
+    ("ok so how do I return a gift card", QueryKind.NEEDS_REWRITE),
+    ("refund policy?", QueryKind.NEEDS_REWRITE),
+    ("what is the shipping cost to germany", QueryKind.NEEDS_REWRITE),
+    ("refund policy for damaged electronics bought online last year", QueryKind.NEEDS_REWRITE),
+]
+
+
+@pytest.mark.parametrize("question, kind", CLASSIFIED, ids=[question for question, _ in CLASSIFIED])
+def test_classify_query(question, kind):
+    assert classify_query(question) == kind
+
+
+class FakeRewriter:
+    def __init__(self, answer="refund window"):
+        self.answer = answer
+        self.calls = []
+
+    async def __call__(self, question):
+        self.calls.append(question)
+        return self.answer
+
+
+def rewrite_all(cache, rewriter, requests):
+    async def run():
+        return [await cache.rewrite(question, rewriter, model_key) for question, model_key in requests]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("requests, llm_calls, cache_hits", [
+    ([("What is the refund window?", "a"), ("what is the refund window", "a")], 1, 1),
+    ([("What is the refund window?", "a"), ("What is the refund window?", "b")], 2, 0),
+    ([("What is the refund window?", "a"), ("What is the shipping cost?", "a")], 2, 0),
+    ([("ok thanks", "a"), ("refund policy", "a")], 0, 0),
+], ids=["normalised-hit", "other-model-misses", "other-question-misses", "fast-path"])
+def test_cache_hits_and_misses(requests, llm_calls, cache_hits):
+    cache, rewriter = QueryRewriteCache(max_size=16, ttl_seconds=60), FakeRewriter()
+
+    rewrite_all(cache, rewriter, requests)
+
+    stats = cache.stats()
+    assert (len(rewriter.calls), stats["llm_calls"], stats["cache_hits"]) == (llm_calls, llm_calls, cache_hits)
+    assert stats["requests"] == len(requests)
+
+
+def test_fast_path_answers_locally():
+    cache, rewriter = QueryRewriteCache(max_size=16, ttl_seconds=60), FakeRewriter()
+
+    assert rewrite_all(cache, rewriter, [("ok thanks", "a"), (" refund policy ", "a")]) == \
+        [NO_RETRIEVAL, "refund policy"]
+    assert (cache.direct_answers, cache.keyword_passthrough) == (1, 1)
+
+
+def test_failed_rewrites_are_not_cached():
+    cache, rewriter = QueryRewriteCache(max_size=16, ttl_seconds=60), FakeRewriter(answer=None)
+
+    rewrite_all(cache, rewriter, [("What is the refund window?", "a")] * 2)
+
+    assert len(rewriter.calls) == 2
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from domains.retreival import semantic_cache
+from domains.retreival.semantic_cache import SemanticAnswerCache
+
+REFUND = [1.0, 0.0, 0.0]
+# cosine similarity 0.8 with REFUND
+REFUND_PARAPHRASE = [0.8, 0.6, 0.0]
+SHIPPING = [0.0, 0.0, 1.0]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now[0])
+    return now
+
+
+def cache(threshold=0.9, max_entries=10, ttl_seconds=60):
+    answers = SemanticAnswerCache(threshold=threshold, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    answers.store("docs", "en", "What is the refund window?", REFUND, "30 days.", ["c1"])
+    return answers
+
+
+def test_similarity_threshold_is_inclusive():
+    similarity = cache(threshold=0.0).lookup("docs", "en", REFUND_PARAPHRASE).similarity
+    assert similarity == pytest.approx(0.8)
+
+    assert cache(threshold=similarity).lookup("docs", "en", REFUND_PARAPHRASE).answer == "30 days."
+    assert cache(threshold=np.nextafter(similarity, 1)).lookup("docs", "en", REFUND_PARAPHRASE) is None
+
+
+def test_hit_returns_the_closest_answer_and_counts():
+    answers = cache()
+    answers.store("docs", "en", "How long is shipping?", SHIPPING, "3-5 days.", ["c2"])
+
+    hit = answers.lookup("docs", "en", [0.1, 0.0, 2.0])
+
+    assert (hit.question, hit.answer, hit.chunk_ids) == ("How long is shipping?", "3-5 days.", ["c2"])
+    assert answers.lookup("docs", "en", [0.0, 1.0, 0.0]) is None
+    assert (answers.stats()["hits"], answers.stats()["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    answers = cache(ttl_seconds=60)
+    clock[0] += 30
+    answers.store("docs", "en", "How long is shipping?", SHIPPING, "3-5 days.", ["c2"])
+
+    clock[0] += 30
+    assert answers.lookup("docs", "en", REFUND) is not None
+    clock[0] += 1
+    assert answers.lookup("docs", "en", REFUND) is None
+    assert answers.lookup("docs", "en", SHIPPING) is not None
+    clock[0] += 30
+    assert answers.lookup("docs", "en", SHIPPING) is None
+    assert answers.stats()["entries"] == 0
+
+
+def test_namespaces_and_languages_are_isolated():
+    answers = cache()
+
+    assert answers.lookup("other", "en", REFUND) is None
+    assert answers.lookup("docs", "de", REFUND) is None
+    assert answers.lookup("docs", "en", REFUND) is not None
+
+
+def test_invalidate_drops_every_language_of_one_namespace():
+    answers = cache()
+    answers.store("docs", "de", "Wie lange ist das Rückgaberecht?", REFUND, "30 Tage.", ["c1"])
+    answers.store("other", "en", "What is the refund window?", REFUND, "14 days.", ["c9"])
+
+    assert answers.invalidate("docs") == 2
+
+    assert answers.lookup("docs", "en", REFUND) is None
+    assert answers.lookup("docs", "de", REFUND) is None
+    assert answers.lookup("other", "en", REFUND).answer == "14 days."
+    assert answers.stats()["invalidations"] == 1
+
+
+def test_oldest_entries_are_dropped_beyond_max_entries():
+    answers = cache(max_entries=2)
+    answers.store("docs", "en", "How long is shipping?", SHIPPING, "3-5 days.", ["c2"])
+    answers.store("docs", "en", "Do you ship abroad?", [0.0, 1.0, 0.0], "Yes.", ["c3"])
+
+    assert answers.lookup("docs", "en", REFUND) is None
+    assert answers.stats()["entries"] == 2
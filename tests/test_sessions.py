@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from domains.retreival.initialize_memory import memory_pool
+from domains.retreival.models import Message
+from domains.retreival.sessions import SessionManager
+from domains.settings import config_settings
+
+CHAT_CONTEXT = [
+    Message(type=config_settings.CHAT_CONTEXT_HUMAN_MESSAGE_KEY, content="What is the refund window?"),
+    Message(type=config_settings.CHAT_CONTEXT_AI_MESSAGE_KEY, content="30 days from delivery."),
+]
+
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(ttl_seconds=60, max_sessions=3)
+    yield manager
+    asyncio.run(manager.stop())
+
+
+def history(session):
+    return [message.content for message in session.memory.chat_memory.messages]
+
+
+def test_new_session_is_seeded_once_from_chat_context(manager):
+    session = manager.open(chat_context=CHAT_CONTEXT, namespace="docs", language="de")
+
+    assert history(session) == ["What is the refund window?", "30 days from delivery."]
+    assert (session.namespace, session.language, session.connections) == ("docs", "de", 1)
+    assert manager.stats()["created"] == 1
+
+
+def test_resumed_session_keeps_its_turns_and_ignores_new_chat_context(manager):
+    session = manager.open(chat_context=CHAT_CONTEXT)
+    session.record_turn("And for gift cards?", "Gift cards cannot be refunded.")
+    manager.detach(session)
+
+    resumed = manager.open(session.session_id, chat_context=[Message(type="human", content="ignored")])
+
+    assert resumed is session
+    assert history(resumed)[-2:] == ["And for gift cards?", "Gift cards cannot be refunded."]
+    assert resumed.turns == 1
+    assert manager.stats()["resumed"] == 1
+
+
+def test_unknown_session_id_starts_a_session_under_a_server_id(manager):
+    session = manager.open("client-chosen-id")
+    assert session.session_id != "client-chosen-id"
+    assert not session.has_history
+    assert manager.get("client-chosen-id") is None
+
+
+def test_idle_sessions_expire_but_attached_ones_do_not(manager):
+    manager.ttl_seconds = 0.01
+    attached, detached = manager.open(), manager.open()
+    manager.detach(detached)
+    time.sleep(0.02)
+
+    assert manager.evict_expired() == 1
+    assert manager.get(attached.session_id) is attached
+    assert manager.get(detached.session_id) is None
+
+
+def test_overflow_evicts_least_recently_used_detached_session(manager):
+    sessions = [manager.open() for _ in range(3)]
+    for session in sessions:
+        manager.detach(session)
+    manager.open(sessions[0].session_id)
+    manager.detach(sessions[0])
+
+    manager.open()
+
+    assert len(manager) == 3
+    assert manager.get(sessions[1].session_id) is None
+    assert manager.get(sessions[0].session_id) is sessions[0]
+    assert manager.stats()["evicted"] == 1
+
+
+def test_evicted_memory_goes_back_to_the_pool_cleared(manager):
+    session = manager.open(chat_context=CHAT_CONTEXT)
+    memory = session.memory
+    manager.close(session.session_id)
+    manager.detach(session)
+
+    assert not memory.chat_memory.messages
+    reused = memory_pool.take([])
+    try:
+        assert reused is memory
+    finally:
+        memory_pool.release(reused)
+
+
+def test_ending_a_session_shared_by_two_connections_keeps_its_memory_private(manager):
+    first = manager.open(chat_context=CHAT_CONTEXT)
+    second = manager.open(first.session_id)
+    assert second is first
+
+    # the first connection sends end_session and detaches; the second is still attached
+    manager.close(first.session_id)
+    manager.detach(first)
+    second.record_turn("And for gift cards?", "Gift cards cannot be refunded.")
+    third = manager.open()
+
+    assert third.memory is not second.memory
+    assert not third.has_history
+    assert history(second)[-2:] == ["And for gift cards?", "Gift cards cannot be refunded."]
+    assert manager.get(first.session_id) is None
+
+    manager.detach(second)
+    assert not second.memory.chat_memory.messages
+
+
+def test_sweeper_evicts_in_the_background(monkeypatch):
+    monkeypatch.setattr(config_settings, "SESSION_SWEEP_INTERVAL_SECONDS", 0.01)
+
+    async def run():
+        manager = SessionManager(ttl_seconds=0.01, max_sessions=10)
+        await manager.start()
+        manager.detach(manager.open())
+        await asyncio.sleep(0.1)
+        live = len(manager)
+        await manager.stop()
+        return live, manager.evicted
+
+    assert asyncio.run(run()) == (0, 1)
@@ -0,0 +1,123 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from domains.models import RequestStatus, RequestStatusEnum
+from domains.status_util import StatusCallbackClient
+
+
+def status(request_id: int, value: RequestStatusEnum = RequestStatusEnum.COMPLETED) -> RequestStatus:
+    return RequestStatus(request_id=request_id, status=value)
+
+
+@asynccontextmanager
+async def serve(codes):
+    """A status API answering with `codes` in turn (the last one repeats); yields the received bodies."""
+    received = []
+
+    async def handler(request):
+        code = codes[min(len(received), len(codes) - 1)]
+        received.append(await request.json())
+        return web.Response(status=code, text="ok" if code == 200 else "nope")
+
+    app = web.Application()
+    app.router.add_post("/status", handler)
+    server = TestServer(app)
+    await server.start_server()
+    try:
+        yield str(server.make_url("")).rstrip("/"), received
+    finally:
+        await server.close()
+
+
+def client(base_url, **kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("max_attempts", 3)
+    return StatusCallbackClient(base_url=base_url, pool_size=4, **kwargs)
+
+
+def test_newer_status_replaces_an_unsent_one():
+    async def run():
+        async with serve([200]) as (url, received):
+            status_client = client(url)
+            await status_client.submit("status", status(1, RequestStatusEnum.PROCESSING))
+            await status_client.submit("status", status(2, RequestStatusEnum.PROCESSING))
+            await status_client.submit("status", status(1, RequestStatusEnum.COMPLETED))
+            await status_client.start()
+            await status_client.stop()
+            return received, status_client.stats
+
+    received, stats = asyncio.run(run())
+    assert sorted((body["request_id"], body["status"]) for body in received) == \
+        [(1, "COMPLETED"), (2, "PROCESSING")]
+    assert (stats["submitted"], stats["coalesced"], stats["sent"]) == (3, 1, 2)
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    status_client = StatusCallbackClient(base_url="http://status", backoff_base=0.5, backoff_max=4)
+    monkeypatch.setattr("domains.status_util.random.uniform", lambda low, high: (low, high))
+
+    assert [status_client._backoff(attempts) for attempts in range(1, 6)] == \
+        [(0, 1.0), (0, 2.0), (0, 4), (0, 4), (0, 4)]
+
+
+@pytest.mark.parametrize("codes, posts, outcome", [
+    ([503, 200], 2, {"sent": 1, "retried": 1, "dropped": 0}),
+    ([429, 200], 2, {"sent": 1, "retried": 1, "dropped": 0}),
+    ([404], 1, {"sent": 0, "retried": 0, "dropped": 1}),
+    ([400], 1, {"sent": 0, "retried": 0, "dropped": 1}),
+    ([500], 3, {"sent": 0, "retried": 2, "dropped": 1}),
+], ids=["503", "429", "404", "400", "gives-up"])
+def test_server_errors_are_retried_and_client_errors_dropped(codes, posts, outcome):
+    async def run():
+        async with serve(codes) as (url, received):
+            status_client = client(url)
+            await status_client.start()
+            await status_client.submit("status", status(1))
+            await status_client.stop()
+            return len(received), status_client.stats
+
+    received, stats = asyncio.run(run())
+    assert received == posts
+    assert {key: stats[key] for key in outcome} == outcome
+
+
+def test_unreachable_api_is_retried():
+    async def run():
+        status_client = client("http://127.0.0.1:9")
+        await status_client.start()
+        await status_client.submit("status", status(1))
+        await status_client.stop()
+        return status_client.stats
+
+    stats = asyncio.run(run())
+    assert (stats["retried"], stats["dropped"]) == (2, 1)
+
+
+def test_stop_flushes_queued_updates():
+    async def run():
+        async with serve([200]) as (url, received):
+            status_client = client(url)
+            await status_client.start()
+            for request_id in range(20):
+                await status_client.submit("status", status(request_id))
+            await status_client.stop()
+            return sorted(body["request_id"] for body in received)
+
+    assert asyncio.run(run()) == list(range(20))
+
+
+def test_stop_gives_up_on_updates_still_backing_off():
+    async def run():
+        async with serve([503]) as (url, received):
+            status_client = client(url, max_attempts=5)
+            status_client._backoff = lambda attempts: 60
+            await status_client.start()
+            await status_client.submit("status", status(1))
+            await asyncio.wait_for(status_client.stop(flush_timeout=0.2), timeout=5)
+            return len(received), status_client._session
+
+    assert asyncio.run(run()) == (1, None)
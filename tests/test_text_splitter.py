@@ -0,0 +1,53 @@
+import pytest
+from langchain_core.documents import Document
+
+from domains.injestion.text_splitter import TokenOffsetTextSplitter
+
+TEXTS = [
+    "The refund window is 30 days from delivery. " * 20,
+    "héllo wörld, ünïcode ✓ text — with multi-byte characters " * 10,
+    "short",
+]
+
+
+@pytest.mark.parametrize("text", [TEXTS[0], TEXTS[2]], ids=["ascii", "short"])
+def test_chunks_match_token_windows(byte_encoding, text):
+    splitter = TokenOffsetTextSplitter(chunk_size=20, chunk_overlap=5)
+    tokens = byte_encoding.encode_ordinary(text)
+
+    chunks = splitter.split_text(text)
+
+    # every chunk is exactly the decoded token window it stands for (with multi-byte
+    # characters a window may end mid-character, so only ASCII text decodes exactly)
+    expected = [
+        byte_encoding.decode(tokens[start:start + 20])
+        for start in range(0, len(tokens), 15)
+        if start == 0 or start + 5 < len(tokens)
+    ]
+    assert chunks == expected
+
+
+@pytest.mark.parametrize("text", TEXTS, ids=["ascii", "multi-byte", "short"])
+def test_offsets_cover_text_with_overlap(byte_encoding, text):
+    spans = TokenOffsetTextSplitter(chunk_size=20, chunk_overlap=5).split_offsets(text)
+
+    assert spans[0][0] == 0
+    assert spans[-1][1] == len(text)
+    for (start, end), (next_start, next_end) in zip(spans, spans[1:]):
+        assert start < next_start < end <= next_end
+
+
+def test_split_documents_keeps_metadata(byte_encoding):
+    splitter = TokenOffsetTextSplitter(chunk_size=20, chunk_overlap=5)
+    chunks = splitter.split_documents([Document(page_content=TEXTS[0], metadata={"page": 3})])
+
+    assert len(chunks) > 1
+    assert all(chunk.metadata == {"page": 3} for chunk in chunks)
+    chunks[0].metadata["page"] = 4
+    assert chunks[1].metadata == {"page": 3}
+
+
+def test_edge_cases(byte_encoding):
+    assert TokenOffsetTextSplitter(10, 2).split_text("") == []
+    with pytest.raises(ValueError):
+        TokenOffsetTextSplitter(10, 10)
@@ -0,0 +1,194 @@
+import multiprocessing
+import threading
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from domains.injestion.hnsw_vector_store import HnswNamespaceIndex
+from domains.injestion.local_vector_store import NamespaceMatrix, top_k_scores
+from domains.settings import config_settings
+
+DIMENSION = 8
+STORES = {"numpy": NamespaceMatrix, "hnsw": HnswNamespaceIndex}
+
+
+def documents(ids):
+    return [Document(page_content=f"text of {_id}", metadata={"chunk_id": _id}) for _id in ids]
+
+
+def vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+
+
+def append(store_name, path, ids, seed):
+    """Runs in a separate process: open the store from disk, append and commit."""
+    store = STORES[store_name](path)
+    store.add(ids, vectors(len(ids), seed), documents(ids))
+    store.persist()
+
+
+def stored_ids(store):
+    if isinstance(store, HnswNamespaceIndex):
+        return sorted(store._labels_by_id)
+    return sorted(store.document(row).metadata["chunk_id"] for row in range(store.count))
+
+
+def test_top_k_scores_orders_each_row():
+    scores = np.array([[0.1, 0.9, 0.5, 0.7], [0.4, 0.3, 0.2, 0.1]])
+    rows, best = top_k_scores(scores, 2)
+    assert rows.tolist() == [[1, 3], [0, 1]]
+    np.testing.assert_allclose(best, [[0.9, 0.7], [0.4, 0.3]])
+
+
+@pytest.mark.parametrize("store_name", STORES)
+def test_search_finds_each_vector_and_its_document(tmp_path, store_name):
+    store = STORES[store_name](str(tmp_path / "ns"))
+    ids = [f"c{i}" for i in range(50)]
+    matrix = vectors(50)
+    store.add(ids, matrix, documents(ids))
+    store.persist()
+
+    rows, scores = store.search(matrix[[3, 17]], 1)
+
+    assert [store.document(int(row)).metadata["chunk_id"] for row in rows[:, 0]] == ["c3", "c17"]
+    assert scores[:, 0] == pytest.approx([1.0, 1.0], abs=1e-4)
+
+
+@pytest.mark.parametrize("store_name", STORES)
+def test_stale_instance_keeps_other_writers_rows(tmp_path, store_name):
+    path = str(tmp_path / "ns")
+    append(store_name, path, ["a"], 1)
+    stale = STORES[store_name](path)
+    append(store_name, path, ["b", "c"], 2)
+
+    stale.add(["d"], vectors(1, 3), documents(["d"]))
+    stale.persist()
+
+    assert stored_ids(STORES[store_name](path)) == ["a", "b", "c", "d"]
+
+
+@pytest.mark.parametrize("store_name", STORES)
+def test_reader_sees_appends_from_other_processes(tmp_path, store_name):
+    path = str(tmp_path / "ns")
+    append(store_name, path, ["a"], 1)
+    reader = STORES[store_name](path)
+    reader.search(vectors(1), 1)
+
+    process = multiprocessing.get_context("spawn").Process(target=append, args=(store_name, path, ["b"], 2))
+    process.start()
+    process.join()
+
+    rows, _ = reader.search(vectors(1, 2), 1)
+    assert reader.document(int(rows[0, 0])).metadata["chunk_id"] == "b"
+
+
+@pytest.mark.parametrize("store_name", STORES)
+def test_concurrent_appends_from_several_processes(tmp_path, store_name):
+    path = str(tmp_path / "ns")
+    context = multiprocessing.get_context("spawn")
+    expected = []
+    processes = []
+    for worker in range(4):
+        ids = [f"w{worker}-{i}" for i in range(5)]
+        expected.extend(ids)
+        processes.append(context.Process(target=append, args=(store_name, path, ids, worker)))
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    assert stored_ids(STORES[store_name](path)) == sorted(expected)
+
+
+def test_numpy_store_reads_records_lazily_by_offset(tmp_path):
+    path = str(tmp_path / "ns")
+    append("numpy", path, ["a", "b", "c"], 1)
+    append("numpy", path, ["d"], 2)
+
+    store = NamespaceMatrix(path)
+
+    assert [store.document(row).page_content for row in range(store.count)] == \
+        ["text of a", "text of b", "text of c", "text of d"]
+
+
+def test_hnsw_merges_deletes_and_searches_past_tombstones(tmp_path):
+    path = str(tmp_path / "ns")
+    append("hnsw", path, ["a", "b"], 1)
+    stale = HnswNamespaceIndex(path)
+    append("hnsw", path, ["c"], 2)
+
+    stale.delete(["a"])
+    stale.persist()
+    assert stored_ids(HnswNamespaceIndex(path)) == ["b", "c"]
+
+    store = HnswNamespaceIndex(str(tmp_path / "tombstones"))
+    ids = [str(i) for i in range(200)]
+    store.add(ids, vectors(200), documents(ids))
+    store.delete(ids[:197])
+    store.wait_for_compaction()
+
+    labels, _ = store.search(vectors(3, 9), 10)
+    found = {store.document(int(label)).metadata["chunk_id"] for label in labels.ravel() if label >= 0}
+    assert found <= {"197", "198", "199"}
+    assert len(found) == 3
+
+
+def test_hnsw_persist_appends_records_and_rewrites_only_after_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_settings, "HNSW_COMPACTION_RATIO", 0.5)
+    path = tmp_path / "ns"
+    store = HnswNamespaceIndex(str(path))
+    store.add(["a", "b", "c"], vectors(3), documents(["a", "b", "c"]))
+    store.persist()
+    [docs_file] = path.glob("docs.*.jsonl")
+    written = docs_file.read_bytes()
+
+    store.delete(["a"])
+    store.add(["d"], vectors(1, 1), documents(["d"]))
+    store.persist()
+    assert docs_file.read_bytes().startswith(written)
+    assert stored_ids(HnswNamespaceIndex(str(path))) == ["b", "c", "d"]
+
+    # re-adding ids tombstones their old labels; past the ratio add() starts a compaction
+    store.add(["b", "c", "d"], vectors(3, 2), documents(["b", "c", "d"]))
+    store.wait_for_compaction()
+    assert not store._deleted
+    store.persist()
+
+    [rewritten] = path.glob("docs.*.jsonl")
+    assert rewritten != docs_file
+    assert len(rewritten.read_bytes().splitlines()) == 3
+    reopened = HnswNamespaceIndex(str(path))
+    assert stored_ids(reopened) == ["b", "c", "d"]
+    rows, _ = reopened.search(vectors(3, 2)[[1]], 1)
+    assert reopened.document(int(rows[0, 0])).metadata["chunk_id"] == "c"
+
+
+def test_hnsw_searches_while_another_thread_adds(tmp_path, monkeypatch):
+    # small enough that the adds resize the graph under the running searches
+    monkeypatch.setattr(config_settings, "HNSW_INITIAL_CAPACITY", 64)
+    store = HnswNamespaceIndex(str(tmp_path / "ns"))
+    store.add(["seed"], vectors(1, 99), documents(["seed"]))
+    errors = []
+
+    def search():
+        try:
+            for _ in range(50):
+                rows, scores = store.search(vectors(4, 7), 5)
+                assert rows.shape == scores.shape
+                assert all(store.document(int(row)) is not None for row in rows.ravel())
+        except Exception as e:  # surfaced by the assertion below
+            errors.append(e)
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for searcher in searchers:
+        searcher.start()
+    for batch in range(20):
+        ids = [f"b{batch}-{i}" for i in range(50)]
+        store.add(ids, vectors(50, batch), documents(ids))
+    for searcher in searchers:
+        searcher.join()
+
+    assert errors == []
+    assert store.count == 1001